@@ -11,7 +11,7 @@ import {
     Bar,
     Legend,
 } from 'recharts';
-import api from '../services/api';
+import api, { downloadPriceExport } from '../services/api';
 
 interface Crop {
     _id: string;
@@ -89,20 +89,12 @@ const BuyerDashboardPage: React.FC = () => {
         fetchTrends();
     }, [selectedCrop]);
 
+    // CSV export of the full approved history for the current filters
     const exportReport = () => {
-        const headers = 'Crop,Market,Price (KSh),Unit,Date,Confidence\n';
-        const rows = prices
-            .map((p) =>
-                `${p.cropId?.name},${p.marketId?.name},${p.price},${p.cropId?.unit},${new Date(p.date).toLocaleDateString()},${Math.round(p.confidenceScore * 100)}%`
-            )
-            .join('\n');
-        const blob = new Blob([headers + rows], { type: 'text/csv' });
-        const url = URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `sokoprice-buyer-report-${new Date().toISOString().slice(0, 10)}.csv`;
-        a.click();
-        URL.revokeObjectURL(url);
+        const params: Record<string, string> = { approved: 'true' };
+        if (selectedCrop) params.cropId = selectedCrop;
+        if (selectedMarket) params.marketId = selectedMarket;
+        downloadPriceExport(params, `sokoprice-buyer-report-${new Date().toISOString().slice(0, 10)}.csv`);
     };
 
     // Build chart data from trends
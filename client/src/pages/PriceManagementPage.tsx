@@ -168,6 +168,21 @@ const PriceManagementPage: React.FC = () => {
         }
     };
 
+    // Moderate every pending price on the current page in one request
+    const handleBulk = async (action: 'approve' | 'reject') => {
+        const ids = prices.filter((p) => !p.approved).map((p) => p._id);
+        if (ids.length === 0) return;
+        if (action === 'reject' && !confirm(`Reject ${ids.length} pending prices?`)) return;
+        try {
+            await api.patch('/prices/bulk', { action, ids });
+            fetchPrices();
+        } catch (error) {
+            console.error(`Failed to bulk ${action} prices:`, error);
+        }
+    };
+
+    const pendingCount = prices.filter((p) => !p.approved).length;
+
     const getConfidenceClass = (score: number) => {
         if (score >= 0.7) return 'high';
         if (score >= 0.4) return 'medium';
@@ -358,6 +373,24 @@ const PriceManagementPage: React.FC = () => {
                 >
                     ✅ Approved
                 </button>
+                {pendingCount > 0 && (
+                    <>
+                        <button
+                            className="btn btn-primary btn-sm"
+                            onClick={() => handleBulk('approve')}
+                            id="bulk-approve"
+                        >
+                            ✓ Approve {pendingCount} pending
+                        </button>
+                        <button
+                            className="btn btn-danger btn-sm"
+                            onClick={() => handleBulk('reject')}
+                            id="bulk-reject"
+                        >
+                            ✕ Reject {pendingCount} pending
+                        </button>
+                    </>
+                )}
             </nav>
 
             {loading ? (
@@ -35,4 +35,15 @@ api.interceptors.response.use(
     }
 );
 
+// Download a full-history price export. The endpoint is public, so the browser
+// fetches it itself and streams it to disk instead of buffering it in memory.
+// Cross-origin the server's Content-Disposition name wins over `filename`.
+export const downloadPriceExport = (params: Record<string, string>, filename: string) => {
+    const query = new URLSearchParams({ format: 'csv', ...params });
+    const a = document.createElement('a');
+    a.href = `${API_BASE}/prices/export?${query}`;
+    a.download = filename;
+    a.click();
+};
+
 export default api;
@@ -1,4 +1,4 @@
-import mongoose from 'mongoose';
+import mongoose, { ClientSession } from 'mongoose';
 import { env } from './env';
 
 export const connectDB = async (): Promise<void> => {
@@ -10,3 +10,34 @@ export const connectDB = async (): Promise<void> => {
         process.exit(1);
     }
 };
+
+// Standalone servers (e.g. the docker-compose mongo) reject transactions with
+// IllegalOperation (20); remember that so we only pay for the failed attempt once.
+let transactionsSupported = true;
+
+const isTransactionUnsupported = (error: any): boolean =>
+    error?.code === 20 || /replica set|Transaction numbers/i.test(error?.message || '');
+
+// Run fn inside a transaction when the deployment supports it (Atlas, replica sets),
+// otherwise run it without a session.
+export const withTransaction = async <T>(
+    fn: (session: ClientSession | null) => Promise<T>
+): Promise<T> => {
+    if (!transactionsSupported) return fn(null);
+
+    const session = await mongoose.startSession();
+    try {
+        let result: T | undefined;
+        await session.withTransaction(async () => {
+            result = await fn(session);
+        });
+        return result as T;
+    } catch (error) {
+        if (!isTransactionUnsupported(error)) throw error;
+        transactionsSupported = false;
+        console.warn('⚠️ MongoDB transactions unavailable, continuing without them');
+        return fn(null);
+    } finally {
+        await session.endSession();
+    }
+};
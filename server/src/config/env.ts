@@ -1,8 +1,16 @@
+import os from 'os';
 import dotenv from 'dotenv';
 dotenv.config();
 
+// 'auto' (or 0) sizes the API cluster to the available cores
+const parseConcurrency = (value: string): number => {
+    const n = value === 'auto' ? 0 : parseInt(value, 10);
+    return n > 0 ? n : os.availableParallelism();
+};
+
 interface EnvConfig {
     PORT: number;
+    WEB_CONCURRENCY: number;
     NODE_ENV: string;
     MONGODB_URI: string;
     JWT_SECRET: string;
@@ -10,15 +18,31 @@ interface EnvConfig {
     AT_API_KEY: string;
     AT_USERNAME: string;
     AT_SENDER_ID: string;
+    AT_SMS_URL: string;
+    AT_TIMEOUT_MS: number;
     USSD_SERVICE_CODE: string;
     CLIENT_URL: string;
     ADMIN_EMAIL: string;
     ADMIN_PASSWORD: string;
     ADMIN_PHONE: string;
+    PRICE_CHANGE_STREAM: boolean;
+    SMS_RATE_PER_SEC: number;
+    SMS_CONCURRENCY: number;
+    SMS_MAX_ATTEMPTS: number;
+    SMS_MAX_RECIPIENTS: number;
+    USER_CACHE_TTL_SEC: number;
+    USER_CACHE_MAX: number;
+    RATE_LIMIT_STORE: 'mongo' | 'memory';
+    API_RATE_LIMIT_MAX: number;
+    USSD_IP_RATE_LIMIT_MAX: number;
+    METRICS_TOKEN: string;
+    QUERY_REPEAT_WARN: number;
+    QUERY_EXPLAIN_MS: number;
 }
 
 export const env: EnvConfig = {
     PORT: parseInt(process.env.PORT || '5000', 10),
+    WEB_CONCURRENCY: parseConcurrency(process.env.WEB_CONCURRENCY || '1'),
     NODE_ENV: process.env.NODE_ENV || 'development',
     MONGODB_URI: process.env.MONGODB_URI || 'mongodb://localhost:27017/sokoprice',
     JWT_SECRET: process.env.JWT_SECRET || 'default-dev-secret',
@@ -26,9 +50,29 @@ export const env: EnvConfig = {
     AT_API_KEY: process.env.AT_API_KEY || '',
     AT_USERNAME: process.env.AT_USERNAME || 'sandbox',
     AT_SENDER_ID: process.env.AT_SENDER_ID || 'SokoPrice',
+    AT_SMS_URL: process.env.AT_SMS_URL || '',
+    // A hung provider call is abandoned (and retried) after this long
+    AT_TIMEOUT_MS: parseInt(process.env.AT_TIMEOUT_MS || '15000', 10),
     USSD_SERVICE_CODE: process.env.USSD_SERVICE_CODE || '*789#',
     CLIENT_URL: process.env.CLIENT_URL || 'http://localhost:5173',
     ADMIN_EMAIL: process.env.ADMIN_EMAIL || 'admin@sokoprice.co.ke',
     ADMIN_PASSWORD: process.env.ADMIN_PASSWORD || 'Admin@123456',
     ADMIN_PHONE: process.env.ADMIN_PHONE || '+254700000000',
+    PRICE_CHANGE_STREAM: process.env.PRICE_CHANGE_STREAM === 'true',
+    SMS_RATE_PER_SEC: parseInt(process.env.SMS_RATE_PER_SEC || '10', 10),
+    SMS_CONCURRENCY: parseInt(process.env.SMS_CONCURRENCY || '5', 10),
+    SMS_MAX_ATTEMPTS: parseInt(process.env.SMS_MAX_ATTEMPTS || '5', 10),
+    SMS_MAX_RECIPIENTS: parseInt(process.env.SMS_MAX_RECIPIENTS || '1000', 10),
+    USER_CACHE_TTL_SEC: parseInt(process.env.USER_CACHE_TTL_SEC || '60', 10),
+    USER_CACHE_MAX: parseInt(process.env.USER_CACHE_MAX || '10000', 10),
+    RATE_LIMIT_STORE: process.env.RATE_LIMIT_STORE === 'memory' ? 'memory' : 'mongo',
+    // Per-IP requests per 15 minutes; raise it for load tests against a local server
+    API_RATE_LIMIT_MAX: parseInt(process.env.API_RATE_LIMIT_MAX || '100', 10),
+    // Per-IP USSD requests per minute, across all phones; a carrier gateway
+    // sends every subscriber's traffic from a few addresses
+    USSD_IP_RATE_LIMIT_MAX: parseInt(process.env.USSD_IP_RATE_LIMIT_MAX || '1200', 10),
+    METRICS_TOKEN: process.env.METRICS_TOKEN || '',
+    QUERY_REPEAT_WARN: parseInt(process.env.QUERY_REPEAT_WARN || '10', 10),
+    // Dev only: log explain() for query shapes slower than this; 0 disables
+    QUERY_EXPLAIN_MS: parseInt(process.env.QUERY_EXPLAIN_MS || '0', 10),
 };
@@ -1,16 +1,21 @@
 import { Request, Response } from 'express';
 import Alert from '../models/Alert';
+import { indexAlert, unindexAlert } from '../services/alertIndex';
+import { phoneForms, sanitizePhone } from '../middleware/validate';
 
 export const getAlerts = async (req: any, res: Response): Promise<void> => {
     try {
         const filter: any = {};
-        if (req.query.phoneNumber) filter.phoneNumber = req.query.phoneNumber;
+        // Alerts created before numbers were normalized are stored as typed
+        // until `npm run rebuild -- alerts` has run
+        if (req.query.phoneNumber) filter.phoneNumber = { $in: phoneForms(String(req.query.phoneNumber)) };
         if (req.query.active !== undefined) filter.active = req.query.active === 'true';
 
         const alerts = await Alert.find(filter)
             .populate('cropId', 'name')
             .populate('marketId', 'name')
-            .sort({ createdAt: -1 });
+            .sort({ createdAt: -1 })
+            .lean();
 
         res.json(alerts);
     } catch (error: any) {
@@ -22,13 +27,15 @@ export const createAlert = async (req: Request, res: Response): Promise<void> =>
     try {
         const { phoneNumber, cropId, marketId, targetPrice, direction } = req.body;
 
+        // Stored in +254 form, the way Africa's Talking reports recipients
         const alert = await Alert.create({
-            phoneNumber,
+            phoneNumber: phoneNumber ? sanitizePhone(String(phoneNumber)) : phoneNumber,
             cropId,
             marketId,
             targetPrice,
             direction: direction || 'above',
         });
+        indexAlert(alert);
 
         await alert.populate('cropId', 'name');
         await alert.populate('marketId', 'name');
@@ -50,6 +57,7 @@ export const deactivateAlert = async (req: Request, res: Response): Promise<void
             res.status(404).json({ message: 'Alert not found' });
             return;
         }
+        unindexAlert(alert._id);
         res.json({ message: 'Alert deactivated', alert });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -63,6 +71,7 @@ export const deleteAlert = async (req: Request, res: Response): Promise<void> =>
             res.status(404).json({ message: 'Alert not found' });
             return;
         }
+        unindexAlert(alert._id);
         res.json({ message: 'Alert deleted' });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
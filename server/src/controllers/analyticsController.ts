@@ -1,9 +1,14 @@
 import { Request, Response } from 'express';
+import mongoose from 'mongoose';
 import Price from '../models/Price';
 import User from '../models/User';
 import Source from '../models/Source';
 import Market from '../models/Market';
 import Crop from '../models/Crop';
+import PriceDailyRollup from '../models/PriceDailyRollup';
+import { getLatestPriceEntry } from '../services/latestPriceService';
+import { dayKey } from '../services/rollupService';
+import { getCropById, getMarketById, listMarkets, CachedMarket } from '../services/referenceCache';
 
 export const getOverviewStats = async (_req: Request, res: Response): Promise<void> => {
     try {
@@ -45,47 +50,31 @@ export const getPriceTrends = async (req: Request, res: Response): Promise<void>
         const since = new Date();
         since.setDate(since.getDate() - Number(days));
 
-        const match: any = {
-            approved: true,
-            date: { $gte: since },
-        };
-        if (cropId) match.cropId = cropId;
-        if (marketId) match.marketId = marketId;
+        if (
+            (cropId && !mongoose.Types.ObjectId.isValid(String(cropId))) ||
+            (marketId && !mongoose.Types.ObjectId.isValid(String(marketId)))
+        ) {
+            res.json([]);
+            return;
+        }
 
-        const trends = await Price.aggregate([
-            { $match: match },
-            {
-                $group: {
-                    _id: {
-                        date: { $dateToString: { format: '%Y-%m-%d', date: '$date' } },
-                        cropId: '$cropId',
-                        marketId: '$marketId',
-                    },
-                    avgPrice: { $avg: '$price' },
-                    minPrice: { $min: '$price' },
-                    maxPrice: { $max: '$price' },
-                    count: { $sum: 1 },
-                },
-            },
-            { $sort: { '_id.date': 1 } },
-        ]);
+        const match: any = { day: { $gte: dayKey(since) } };
+        if (cropId) match.cropId = String(cropId);
+        if (marketId) match.marketId = String(marketId);
+
+        // Read pre-aggregated daily buckets instead of re-grouping raw prices
+        const rollups = await PriceDailyRollup.find(match).sort({ day: 1 }).lean();
 
-        // Populate crop and market names
-        const populated = await Promise.all(
-            trends.map(async (t) => {
-                const crop = await Crop.findById(t._id.cropId).select('name');
-                const market = await Market.findById(t._id.marketId).select('name');
-                return {
-                    date: t._id.date,
-                    crop: crop?.name || 'Unknown',
-                    market: market?.name || 'Unknown',
-                    avgPrice: Math.round(t.avgPrice),
-                    minPrice: t.minPrice,
-                    maxPrice: t.maxPrice,
-                    submissions: t.count,
-                };
-            })
-        );
+        // Resolve crop and market names from the reference cache
+        const populated = rollups.map((r) => ({
+            date: r.day,
+            crop: getCropById(r.cropId)?.name || 'Unknown',
+            market: getMarketById(r.marketId)?.name || 'Unknown',
+            avgPrice: Math.round(r.sum / r.count),
+            minPrice: r.min,
+            maxPrice: r.max,
+            submissions: r.count,
+        }));
 
         res.json(populated);
     } catch (error: any) {
@@ -93,34 +82,46 @@ export const getPriceTrends = async (req: Request, res: Response): Promise<void>
     }
 };
 
+// Latest price per active market for one crop, read from the latest-price mirror
+const compareMarkets = (cropId: any, markets: CachedMarket[]) =>
+    markets
+        .map((market) => {
+            const latestPrice = getLatestPriceEntry(cropId, market._id);
+
+            return {
+                market: market.name,
+                county: market.county,
+                price: latestPrice?.price || null,
+                date: latestPrice?.date || null,
+                confidence: latestPrice?.confidenceScore || null,
+            };
+        })
+        .filter((c) => c.price !== null);
+
 export const getMarketComparison = async (req: Request, res: Response): Promise<void> => {
     try {
-        const { cropId } = req.query;
-        if (!cropId) {
+        const { cropId, cropIds } = req.query;
+        if (!cropId && !cropIds) {
             res.status(400).json({ message: 'cropId is required' });
             return;
         }
 
-        const markets = await Market.find({ active: true });
-        const comparisons = await Promise.all(
-            markets.map(async (market) => {
-                const latestPrice = await Price.findOne({
-                    cropId,
-                    marketId: market._id,
-                    approved: true,
-                }).sort({ date: -1 });
+        const markets = listMarkets().filter((m) => m.active);
 
-                return {
-                    market: market.name,
-                    county: market.county,
-                    price: latestPrice?.price || null,
-                    date: latestPrice?.date || null,
-                    confidence: latestPrice?.confidenceScore || null,
-                };
-            })
-        );
+        // ?cropIds=a,b,c returns the whole crop × market matrix in one call
+        if (cropIds) {
+            const ids = String(cropIds).split(',').map((id) => id.trim()).filter(Boolean);
+            res.json(
+                ids.map((id) => ({
+                    cropId: id,
+                    crop: getCropById(id)?.name || 'Unknown',
+                    markets: compareMarkets(id, markets),
+                }))
+            );
+            return;
+        }
 
-        res.json(comparisons.filter((c) => c.price !== null));
+        res.json(compareMarkets(cropId, markets));
     } catch (error: any) {
         res.status(500).json({ message: error.message });
     }
@@ -1,6 +1,7 @@
 import { Request, Response } from 'express';
 import User from '../models/User';
 import { generateToken } from '../middleware/auth';
+import { cacheUser, revokeUserTokens } from '../services/userCache';
 
 export const register = async (req: Request, res: Response): Promise<void> => {
     try {
@@ -9,7 +10,8 @@ export const register = async (req: Request, res: Response): Promise<void> => {
         const existingUser = await User.findOne({ email });
         if (existingUser) {
             // Return existing user's token instead of error (idempotent registration)
-            const token = generateToken((existingUser._id as any).toString());
+            const token = generateToken(existingUser);
+            cacheUser(existingUser);
             res.status(200).json({
                 token,
                 user: {
@@ -32,7 +34,8 @@ export const register = async (req: Request, res: Response): Promise<void> => {
             role: role || 'Farmer',
         });
 
-        const token = generateToken((user._id as any).toString());
+        const token = generateToken(user);
+        cacheUser(user);
 
         res.status(201).json({
             token,
@@ -71,7 +74,8 @@ export const login = async (req: Request, res: Response): Promise<void> => {
             return;
         }
 
-        const token = generateToken((user._id as any).toString());
+        const token = generateToken(user);
+        cacheUser(user);
 
         res.json({
             token,
@@ -89,20 +93,31 @@ export const login = async (req: Request, res: Response): Promise<void> => {
     }
 };
 
+// `protect` already loaded the user (from the user cache)
 export const getMe = async (req: any, res: Response): Promise<void> => {
     try {
-        const user = await User.findById(req.user._id);
+        const user = req.user;
         res.json({
             user: {
-                id: user?._id,
-                name: user?.name,
-                email: user?.email,
-                role: user?.role,
-                language: user?.language,
-                phoneNumber: user?.phoneNumber,
+                id: user._id,
+                name: user.name,
+                email: user.email,
+                role: user.role,
+                language: user.language,
+                phoneNumber: user.phoneNumber,
             },
         });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
     }
 };
+
+// Sign out everywhere: every token issued so far stops working
+export const logoutAll = async (req: any, res: Response): Promise<void> => {
+    try {
+        await revokeUserTokens(req.user._id);
+        res.json({ message: 'All sessions signed out' });
+    } catch (error: any) {
+        res.status(500).json({ message: error.message });
+    }
+};
@@ -1,10 +1,13 @@
 import { Request, Response } from 'express';
 import Crop from '../models/Crop';
+import { cacheCrop, evictCrop } from '../services/referenceCache';
+import { cropFields, serializeCrops, serializeCrop } from '../services/serializers';
+import { sendJson } from '../utils/serializer';
 
 export const getCrops = async (_req: Request, res: Response): Promise<void> => {
     try {
-        const crops = await Crop.find().sort({ name: 1 });
-        res.json(crops);
+        const crops = await Crop.find().select(cropFields).sort({ name: 1 }).lean();
+        sendJson(res, serializeCrops(crops));
     } catch (error: any) {
         res.status(500).json({ message: error.message });
     }
@@ -12,12 +15,12 @@ export const getCrops = async (_req: Request, res: Response): Promise<void> => {
 
 export const getCrop = async (req: Request, res: Response): Promise<void> => {
     try {
-        const crop = await Crop.findById(req.params.id);
+        const crop = await Crop.findById(req.params.id).select(cropFields).lean();
         if (!crop) {
             res.status(404).json({ message: 'Crop not found' });
             return;
         }
-        res.json(crop);
+        sendJson(res, serializeCrop(crop));
     } catch (error: any) {
         res.status(500).json({ message: error.message });
     }
@@ -26,6 +29,7 @@ export const getCrop = async (req: Request, res: Response): Promise<void> => {
 export const createCrop = async (req: Request, res: Response): Promise<void> => {
     try {
         const crop = await Crop.create(req.body);
+        cacheCrop(crop);
         res.status(201).json(crop);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -42,6 +46,7 @@ export const updateCrop = async (req: Request, res: Response): Promise<void> =>
             res.status(404).json({ message: 'Crop not found' });
             return;
         }
+        cacheCrop(crop);
         res.json(crop);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -55,6 +60,7 @@ export const deleteCrop = async (req: Request, res: Response): Promise<void> =>
             res.status(404).json({ message: 'Crop not found' });
             return;
         }
+        evictCrop(crop._id);
         res.json({ message: 'Crop deleted' });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
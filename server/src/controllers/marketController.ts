@@ -1,9 +1,10 @@
 import { Request, Response } from 'express';
 import Market from '../models/Market';
+import { cacheMarket, evictMarket } from '../services/referenceCache';
 
 export const getMarkets = async (_req: Request, res: Response): Promise<void> => {
     try {
-        const markets = await Market.find({ active: true }).sort({ name: 1 });
+        const markets = await Market.find({ active: true }).sort({ name: 1 }).lean();
         res.json(markets);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -12,7 +13,7 @@ export const getMarkets = async (_req: Request, res: Response): Promise<void> =>
 
 export const getMarket = async (req: Request, res: Response): Promise<void> => {
     try {
-        const market = await Market.findById(req.params.id);
+        const market = await Market.findById(req.params.id).lean();
         if (!market) {
             res.status(404).json({ message: 'Market not found' });
             return;
@@ -26,6 +27,7 @@ export const getMarket = async (req: Request, res: Response): Promise<void> => {
 export const createMarket = async (req: Request, res: Response): Promise<void> => {
     try {
         const market = await Market.create(req.body);
+        cacheMarket(market);
         res.status(201).json(market);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -42,6 +44,7 @@ export const updateMarket = async (req: Request, res: Response): Promise<void> =
             res.status(404).json({ message: 'Market not found' });
             return;
         }
+        cacheMarket(market);
         res.json(market);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -55,6 +58,7 @@ export const deleteMarket = async (req: Request, res: Response): Promise<void> =
             res.status(404).json({ message: 'Market not found' });
             return;
         }
+        evictMarket(market._id);
         res.json({ message: 'Market deleted' });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -1,23 +1,84 @@
 import { Request, Response } from 'express';
 import mongoose from 'mongoose';
+import { pipeline } from 'stream';
 import Price from '../models/Price';
 import Source from '../models/Source';
-import Crop from '../models/Crop';
-import Market from '../models/Market';
-import { calculateConfidence, updateSourceReliability } from '../services/confidenceService';
+import { withTransaction } from '../config/db';
+import {
+    calculateConfidence,
+    updateSourceReliability,
+    addToConfidenceBuckets,
+    removeFromConfidenceBuckets,
+} from '../services/confidenceService';
+import {
+    getLatestPriceEntry,
+    recordApprovedPrice,
+    recordRemovedPrice,
+    applyLatestPriceUpdate,
+} from '../services/latestPriceService';
+import { addToRollup, removeFromRollup } from '../services/rollupService';
+import { recordSubmission, recordApproval, recordRemoval } from '../services/sourceStatsService';
+import { ingestPrices, IngestFormat } from '../services/priceIngestService';
+import { moderatePrices } from '../services/priceModerationService';
+import { createPriceExportStream, exportFields, ExportFormat } from '../services/priceExportService';
+import { bumpDataVersion } from '../services/dataVersion';
+import {
+    priceFields,
+    priceStatus,
+    cropCode,
+    serializePriceCursorPage,
+    serializePricePage,
+    serializePriceHistory,
+} from '../services/serializers';
+import { sendJson } from '../utils/serializer';
+import { emitPriceApproved } from '../services/priceEvents';
+import {
+    findCropByName,
+    findMarketByName,
+    findSourceByName,
+    getCropById,
+    getMarketById,
+    listCrops,
+    listMarkets,
+    listSources,
+} from '../services/referenceCache';
 
 const isValidObjectId = (id: any): boolean => mongoose.Types.ObjectId.isValid(id);
 
+// Keyset cursors encode the (date, _id) of the last row returned
+const encodeCursor = (date: Date, id: any): string =>
+    Buffer.from(`${date.getTime()}:${id}`).toString('base64url');
+
+const decodeCursor = (cursor: string): { date: Date; id: string } | null => {
+    const [ms, id] = Buffer.from(cursor, 'base64url').toString().split(':');
+    const date = new Date(Number(ms));
+    if (!id || isNaN(date.getTime()) || !isValidObjectId(id)) return null;
+    return { date, id };
+};
+
+// Exact counts scan the matching index range; without a filter the collection
+// metadata count is good enough and O(1).
+const countPrices = (filter: any, exact: boolean): Promise<number> =>
+    exact || Object.keys(filter).length > 0
+        ? Price.countDocuments(filter)
+        : Price.estimatedDocumentCount();
+
 export const getPrices = async (req: Request, res: Response): Promise<void> => {
     try {
-        const { cropId, marketId, approved, limit = 50, page = 1 } = req.query;
+        const { cropId, marketId, approved, limit = 50, page = 1, cursor, includeTotal } = req.query;
         const filter: any = {};
 
+        // ?cursor= (empty for the first page) switches to keyset pagination on (date, _id)
+        const cursorMode = cursor !== undefined;
+        const empty = cursorMode
+            ? { prices: [], nextCursor: null, total: 0 }
+            : { prices: [], total: 0, page: 1, pages: 0 };
+
         // Validate ObjectId fields — return empty results for invalid IDs instead of crashing
         if (cropId) {
             const id = Array.isArray(cropId) ? cropId[0] : cropId;
             if (!isValidObjectId(id)) {
-                res.json({ prices: [], total: 0, page: 1, pages: 0 });
+                res.json(empty);
                 return;
             }
             filter.cropId = id;
@@ -25,29 +86,125 @@ export const getPrices = async (req: Request, res: Response): Promise<void> => {
         if (marketId) {
             const id = Array.isArray(marketId) ? marketId[0] : marketId;
             if (!isValidObjectId(id)) {
-                res.json({ prices: [], total: 0, page: 1, pages: 0 });
+                res.json(empty);
                 return;
             }
             filter.marketId = id;
         }
         if (approved !== undefined) filter.approved = approved === 'true';
 
+        const exactTotal = includeTotal === 'true';
+
+        if (cursorMode) {
+            const pageSize = Number(limit);
+            const query: any = { ...filter };
+
+            if (cursor) {
+                const after = decodeCursor(String(cursor));
+                if (!after) {
+                    res.status(400).json({ message: 'Invalid cursor' });
+                    return;
+                }
+                query.$or = [
+                    { date: { $lt: after.date } },
+                    { date: after.date, _id: { $lt: new mongoose.Types.ObjectId(after.id) } },
+                ];
+            }
+
+            // Lean rows; crop, market and source refs come from the reference cache
+            const [rows, total] = await Promise.all([
+                Price.find(query)
+                    .select(priceFields)
+                    .sort({ date: -1, _id: -1 })
+                    .limit(pageSize + 1)
+                    .lean(),
+                exactTotal || Object.keys(filter).length === 0
+                    ? countPrices(filter, exactTotal)
+                    : Promise.resolve(undefined),
+            ]);
+
+            const prices = rows.slice(0, pageSize);
+            const last = prices[prices.length - 1];
+
+            sendJson(res, serializePriceCursorPage({
+                prices,
+                nextCursor: rows.length > pageSize && last ? encodeCursor(last.date, last._id) : null,
+                total,
+            }));
+            return;
+        }
+
         const skip = (Number(page) - 1) * Number(limit);
-        const total = await Price.countDocuments(filter);
+        const total = await countPrices(filter, exactTotal);
 
         const prices = await Price.find(filter)
-            .populate('cropId', 'name unit')
-            .populate('marketId', 'name county')
-            .populate('sourceId', 'name role reliabilityScore')
-            .sort({ date: -1 })
+            .select(priceFields)
+            .sort({ date: -1, _id: -1 })
             .skip(skip)
-            .limit(Number(limit));
+            .limit(Number(limit))
+            .lean();
 
-        res.json({
+        sendJson(res, serializePricePage({
             prices,
             total,
             page: Number(page),
             pages: Math.ceil(total / Number(limit)),
+        }));
+    } catch (error: any) {
+        res.status(500).json({ message: error.message });
+    }
+};
+
+// Full-history export: streams every matching price from a lean cursor, so
+// memory stays flat however many rows match.
+// ?format=csv|ndjson&cropId=&marketId=&approved=&from=&to=
+export const exportPrices = async (req: Request, res: Response): Promise<void> => {
+    try {
+        const { format = 'csv', cropId, marketId, approved, from, to } = req.query;
+
+        if (format !== 'csv' && format !== 'ndjson') {
+            res.status(400).json({ message: "format must be 'csv' or 'ndjson'" });
+            return;
+        }
+
+        const filter: any = {};
+        for (const [field, value] of [['cropId', cropId], ['marketId', marketId]] as const) {
+            if (value === undefined) continue;
+            if (!isValidObjectId(value)) {
+                res.status(400).json({ message: `Invalid ${field}` });
+                return;
+            }
+            filter[field] = value;
+        }
+        if (approved !== undefined) filter.approved = approved === 'true';
+
+        const range: any = {};
+        for (const [op, value] of [['$gte', from], ['$lte', to]] as const) {
+            if (value === undefined) continue;
+            const date = new Date(String(value));
+            if (isNaN(date.getTime())) {
+                res.status(400).json({ message: `Invalid date: ${value}` });
+                return;
+            }
+            range[op] = date;
+        }
+        if (Object.keys(range).length > 0) filter.date = range;
+
+        const cursor = Price.find(filter)
+            .select(exportFields)
+            .sort({ date: -1, _id: -1 })
+            .lean()
+            .cursor({ batchSize: 1000 });
+
+        const stamp = new Date().toISOString().slice(0, 10);
+        res.setHeader('Content-Type', format === 'csv' ? 'text/csv; charset=utf-8' : 'application/x-ndjson');
+        res.setHeader('Content-Disposition', `attachment; filename="sokoprice-prices-${stamp}.${format}"`);
+
+        pipeline(cursor, createPriceExportStream(format as ExportFormat), res, (error) => {
+            // Headers are gone by now; a failed or aborted export just ends the socket
+            if (error && error.code !== 'ERR_STREAM_PREMATURE_CLOSE') {
+                console.error('❌ Price export failed:', error.message);
+            }
         });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -58,27 +215,38 @@ export const getLatestPrice = async (req: Request, res: Response): Promise<void>
     try {
         const { cropId, marketId } = req.params;
 
-        const price = await Price.findOne({
-            cropId,
-            marketId,
-            approved: true,
-        })
-            .populate('cropId', 'name unit nameSwahili')
-            .populate('marketId', 'name county')
-            .sort({ date: -1 });
+        const latest = getLatestPriceEntry(cropId, marketId);
+        const price = latest ? await Price.findById(latest.priceId).select(priceFields).lean() : null;
 
         if (!price) {
             res.status(404).json({ message: 'No price data available' });
             return;
         }
 
-        const confidence = await calculateConfidence(cropId, marketId);
+        const crop = getCropById(price.cropId);
+        const market = getMarketById(price.marketId);
 
+        // Confidence is persisted at approval and refreshed by the recompute job
         res.json({
-            price,
-            confidence: confidence.score,
-            weightedAverage: confidence.weightedAverage,
-            submissionCount: confidence.submissionCount,
+            price: {
+                ...price,
+                cropId: crop
+                    ? {
+                        _id: crop._id,
+                        name: crop.name,
+                        unit: crop.unit,
+                        nameSwahili: crop.nameSwahili,
+                        code: cropCode(crop.name),
+                        id: String(crop._id),
+                    }
+                    : null,
+                marketId: market ? { _id: market._id, name: market.name, county: market.county } : null,
+                status: priceStatus(price.approved),
+                id: String(price._id),
+            },
+            confidence: price.confidenceScore,
+            weightedAverage: price.weightedAverage ?? price.price,
+            submissionCount: price.submissionCount ?? 0,
         });
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -111,59 +279,38 @@ export const createPrice = async (req: Request, res: Response): Promise<void> =>
         let resolvedMarketId = extractId(marketId);
         let resolvedSourceId = extractId(sourceId);
 
-        // If cropId is not a valid ObjectId, try to find by name
+        // If cropId/marketId/sourceId is not a valid ObjectId, resolve it by name
+        // (case-insensitive) from the reference cache, falling back to the first entry
         if (resolvedCropId && !isValidObjectId(resolvedCropId)) {
-            const crop = await Crop.findOne({ name: { $regex: new RegExp(`^${resolvedCropId}$`, 'i') } });
-            if (crop) {
-                resolvedCropId = (crop._id as any).toString();
-            } else {
-                // Fallback: use first available crop
-                const firstCrop = await Crop.findOne();
-                if (firstCrop) resolvedCropId = (firstCrop._id as any).toString();
-                else { res.status(400).json({ message: 'No crops available' }); return; }
-            }
+            const crop = findCropByName(resolvedCropId) || listCrops()[0];
+            if (!crop) { res.status(400).json({ message: 'No crops available' }); return; }
+            resolvedCropId = crop._id.toString();
         }
-
-        // If marketId is not a valid ObjectId, try to find by name
         if (resolvedMarketId && !isValidObjectId(resolvedMarketId)) {
-            const market = await Market.findOne({ name: { $regex: new RegExp(`^${resolvedMarketId}$`, 'i') } });
-            if (market) {
-                resolvedMarketId = (market._id as any).toString();
-            } else {
-                // Fallback: use first available market
-                const firstMarket = await Market.findOne();
-                if (firstMarket) resolvedMarketId = (firstMarket._id as any).toString();
-                else { res.status(400).json({ message: 'No markets available' }); return; }
-            }
+            const market = findMarketByName(resolvedMarketId) || listMarkets()[0];
+            if (!market) { res.status(400).json({ message: 'No markets available' }); return; }
+            resolvedMarketId = market._id.toString();
         }
-
-        // If sourceId is not a valid ObjectId, try to find by name
         if (resolvedSourceId && !isValidObjectId(resolvedSourceId)) {
-            const source = await Source.findOne({ name: { $regex: new RegExp(`^${resolvedSourceId}$`, 'i') } });
-            if (source) {
-                resolvedSourceId = (source._id as any).toString();
-            } else {
-                // Fallback: use first available source
-                const firstSource = await Source.findOne();
-                if (firstSource) resolvedSourceId = (firstSource._id as any).toString();
-                else { res.status(400).json({ message: 'No sources available' }); return; }
-            }
+            const source = findSourceByName(resolvedSourceId) || listSources()[0];
+            if (!source) { res.status(400).json({ message: 'No sources available' }); return; }
+            resolvedSourceId = source._id.toString();
         }
 
-        // If no cropId/marketId provided, use first available
+        // If no cropId/marketId/sourceId provided, use first available
         if (!resolvedCropId) {
-            const firstCrop = await Crop.findOne();
-            if (firstCrop) resolvedCropId = (firstCrop._id as any).toString();
+            const firstCrop = listCrops()[0];
+            if (firstCrop) resolvedCropId = firstCrop._id.toString();
             else { res.status(400).json({ message: 'No crops available' }); return; }
         }
         if (!resolvedMarketId) {
-            const firstMarket = await Market.findOne();
-            if (firstMarket) resolvedMarketId = (firstMarket._id as any).toString();
+            const firstMarket = listMarkets()[0];
+            if (firstMarket) resolvedMarketId = firstMarket._id.toString();
             else { res.status(400).json({ message: 'No markets available' }); return; }
         }
         if (!resolvedSourceId) {
-            const firstSource = await Source.findOne();
-            if (firstSource) resolvedSourceId = (firstSource._id as any).toString();
+            const firstSource = listSources()[0];
+            if (firstSource) resolvedSourceId = firstSource._id.toString();
             else { res.status(400).json({ message: 'No sources available' }); return; }
         }
 
@@ -181,6 +328,8 @@ export const createPrice = async (req: Request, res: Response): Promise<void> =>
             notes,
             approved: false, // Requires admin approval
         });
+        await Promise.all([addToConfidenceBuckets(price), recordSubmission(price)]);
+        bumpDataVersion('prices');
 
         res.status(201).json(price);
     } catch (error: any) {
@@ -188,6 +337,30 @@ export const createPrice = async (req: Request, res: Response): Promise<void> =>
     }
 };
 
+// Bulk ingestion: the request body is streamed as NDJSON (application/x-ndjson)
+// or CSV with a header row (text/csv), one price per line. ?sourceId= sets the
+// source for rows that don't name one.
+export const bulkCreatePrices = async (req: Request, res: Response): Promise<void> => {
+    try {
+        const format: IngestFormat | null = req.is('text/csv')
+            ? 'csv'
+            : req.is(['application/x-ndjson', 'application/jsonl', 'text/plain'])
+                ? 'ndjson'
+                : null;
+        if (!format) {
+            res.status(415).json({ message: 'Send application/x-ndjson or text/csv' });
+            return;
+        }
+
+        const defaultSourceId = req.query.sourceId as string | undefined;
+        const report = await ingestPrices(req, format, defaultSourceId);
+
+        res.status(report.inserted > 0 ? 201 : 400).json(report);
+    } catch (error: any) {
+        res.status(500).json({ message: error.message });
+    }
+};
+
 export const approvePrice = async (req: Request, res: Response): Promise<void> => {
     try {
         if (!isValidObjectId(req.params.id)) {
@@ -195,19 +368,45 @@ export const approvePrice = async (req: Request, res: Response): Promise<void> =
             return;
         }
 
-        const price = await Price.findByIdAndUpdate(
-            req.params.id,
-            { approved: true },
-            { new: true }
-        )
-            .populate('cropId', 'name unit')
-            .populate('marketId', 'name county')
-            .populate('sourceId', 'name role');
+        const result = await withTransaction(async (session) => {
+            const approved = await Price.findById(req.params.id).session(session);
+            if (!approved) return null;
+
+            // Re-approving must not double-count the price in the daily rollups
+            const newlyApproved = !approved.approved;
+            approved.approved = true;
+
+            // Persist the score so every surface reads the same number
+            const confidence = await calculateConfidence(
+                String(approved.cropId),
+                String(approved.marketId)
+            );
+            approved.confidenceScore = confidence.score;
+            approved.weightedAverage = confidence.weightedAverage;
+            approved.submissionCount = confidence.submissionCount;
+            await approved.save();
+
+            const update = await recordApprovedPrice(approved, session);
+            if (newlyApproved) {
+                await addToRollup(approved, session);
+                await recordApproval(approved, session);
+            }
+            return { approved, update };
+        });
 
-        if (!price) {
+        if (!result) {
             res.status(404).json({ message: 'Price not found' });
             return;
         }
+        applyLatestPriceUpdate(result.update);
+        bumpDataVersion('prices');
+        if (result.update?.entry) emitPriceApproved(result.update.entry);
+
+        const price = await result.approved.populate([
+            { path: 'cropId', select: 'name unit' },
+            { path: 'marketId', select: 'name county' },
+            { path: 'sourceId', select: 'name role' },
+        ]);
 
         // Update source reliability after approval
         await updateSourceReliability((price.sourceId as any)._id.toString());
@@ -225,11 +424,26 @@ export const rejectPrice = async (req: Request, res: Response): Promise<void> =>
             return;
         }
 
-        const price = await Price.findByIdAndDelete(req.params.id);
-        if (!price) {
+        const result = await withTransaction(async (session) => {
+            const removed = await Price.findByIdAndDelete(req.params.id).session(session);
+            if (!removed) return null;
+
+            await removeFromConfidenceBuckets(removed, session);
+            await recordRemoval(removed, session);
+            if (!removed.approved) return { removed, update: null };
+
+            const update = await recordRemovedPrice(removed, session);
+            await removeFromRollup(removed, session);
+            return { removed, update };
+        });
+
+        if (!result) {
             res.status(404).json({ message: 'Price not found' });
             return;
         }
+        applyLatestPriceUpdate(result.update);
+        bumpDataVersion('prices');
+        const price = result.removed;
 
         await updateSourceReliability(price.sourceId as unknown as string);
 
@@ -239,6 +453,38 @@ export const rejectPrice = async (req: Request, res: Response): Promise<void> =>
     }
 };
 
+const BULK_MODERATION_MAX = 5000;
+
+// Approve or reject many prices in one request: { action, ids }
+export const bulkModeratePrices = async (req: Request, res: Response): Promise<void> => {
+    try {
+        const { action, ids } = req.body;
+
+        if (action !== 'approve' && action !== 'reject') {
+            res.status(400).json({ message: "action must be 'approve' or 'reject'" });
+            return;
+        }
+        if (!Array.isArray(ids) || ids.length === 0) {
+            res.status(400).json({ message: 'ids must be a non-empty array' });
+            return;
+        }
+        if (ids.length > BULK_MODERATION_MAX) {
+            res.status(400).json({ message: `At most ${BULK_MODERATION_MAX} ids per request` });
+            return;
+        }
+        const invalid = ids.filter((id) => !isValidObjectId(id));
+        if (invalid.length > 0) {
+            res.status(400).json({ message: 'Invalid price ID(s)', invalid });
+            return;
+        }
+
+        const report = await moderatePrices(action, ids.map(String));
+        res.json(report);
+    } catch (error: any) {
+        res.status(500).json({ message: error.message });
+    }
+};
+
 export const getPriceHistory = async (req: Request, res: Response): Promise<void> => {
     try {
         const { cropId, marketId } = req.params;
@@ -253,11 +499,11 @@ export const getPriceHistory = async (req: Request, res: Response): Promise<void
             approved: true,
             date: { $gte: since },
         })
-            .populate('cropId', 'name unit')
-            .populate('marketId', 'name county')
-            .sort({ date: 1 });
+            .select(priceFields)
+            .sort({ date: 1 })
+            .lean();
 
-        res.json(prices);
+        sendJson(res, serializePriceHistory(prices));
     } catch (error: any) {
         res.status(500).json({ message: error.message });
     }
@@ -1,9 +1,10 @@
 import { Request, Response } from 'express';
 import Source from '../models/Source';
+import { cacheSource } from '../services/referenceCache';
 
 export const getSources = async (_req: Request, res: Response): Promise<void> => {
     try {
-        const sources = await Source.find().sort({ name: 1 });
+        const sources = await Source.find().sort({ name: 1 }).lean();
         res.json(sources);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -12,7 +13,7 @@ export const getSources = async (_req: Request, res: Response): Promise<void> =>
 
 export const getSource = async (req: Request, res: Response): Promise<void> => {
     try {
-        const source = await Source.findById(req.params.id);
+        const source = await Source.findById(req.params.id).lean();
         if (!source) {
             res.status(404).json({ message: 'Source not found' });
             return;
@@ -26,6 +27,7 @@ export const getSource = async (req: Request, res: Response): Promise<void> => {
 export const createSource = async (req: Request, res: Response): Promise<void> => {
     try {
         const source = await Source.create(req.body);
+        cacheSource(source);
         res.status(201).json(source);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -42,6 +44,7 @@ export const updateSource = async (req: Request, res: Response): Promise<void> =
             res.status(404).json({ message: 'Source not found' });
             return;
         }
+        cacheSource(source);
         res.json(source);
     } catch (error: any) {
         res.status(500).json({ message: error.message });
@@ -50,7 +53,7 @@ export const updateSource = async (req: Request, res: Response): Promise<void> =
 
 export const getSourceByPhone = async (req: Request, res: Response): Promise<void> => {
     try {
-        const source = await Source.findOne({ phoneNumber: req.params.phone });
+        const source = await Source.findOne({ phoneNumber: req.params.phone }).lean();
         if (!source) {
             res.status(404).json({ message: 'Source not found' });
             return;
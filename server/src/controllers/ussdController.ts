@@ -1,14 +1,25 @@
 import { Request, Response } from 'express';
-import Crop from '../models/Crop';
-import Market from '../models/Market';
 import Price from '../models/Price';
 import Source from '../models/Source';
+import UssdPreference from '../models/UssdPreference';
 import { t, getConfidenceLabel, formatPrice, formatDate } from '../utils/i18n';
-import { sendPriceSMS } from '../services/smsService';
+import { enqueuePriceSMS } from '../services/smsQueue';
+import { addToConfidenceBuckets } from '../services/confidenceService';
+import { recordSubmission } from '../services/sourceStatsService';
+import { bumpDataVersion } from '../services/dataVersion';
+import { getLatestPriceEntry } from '../services/latestPriceService';
+import { getCropByName, findMarketByPartialName, cacheSource } from '../services/referenceCache';
 import { sanitizePhone } from '../middleware/validate';
 
-// Language store (in production, use Redis or DB)
-const userLanguages: Map<string, 'en' | 'sw'> = new Map();
+// Language choices are read from the database on every request: a session's
+// requests are spread across workers, so nothing set here may live in memory
+const getLanguage = async (phone: string): Promise<'en' | 'sw'> => {
+    const preference = await UssdPreference.findById(phone).select('language').lean();
+    return preference?.language || 'en';
+};
+
+const setLanguage = (phone: string, language: 'en' | 'sw') =>
+    UssdPreference.updateOne({ _id: phone }, { $set: { language, updatedAt: new Date() } }, { upsert: true });
 
 // Crop mapping for USSD menu
 const cropIndexes = ['Maize', 'Beans', 'Rice', 'Potatoes', 'Wheat', 'Tomatoes'];
@@ -26,7 +37,7 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
         }
 
         const phone = sanitizePhone(phoneNumber || '');
-        const lang = userLanguages.get(phone) || 'en';
+        const lang = await getLanguage(phone);
         const parts = (text || '').split('*').filter((p: string) => p !== '');
 
         let response = '';
@@ -56,17 +67,11 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
                     const cropName = cropIndexes[cropIdx];
                     const marketName = marketIndexes[marketIdx];
 
-                    const crop = await Crop.findOne({ name: cropName });
-                    const market = await Market.findOne({
-                        name: { $regex: new RegExp(marketName, 'i') },
-                    });
+                    const crop = getCropByName(cropName);
+                    const market = findMarketByPartialName(marketName);
 
                     if (crop && market) {
-                        const latestPrice = await Price.findOne({
-                            cropId: crop._id,
-                            marketId: market._id,
-                            approved: true,
-                        }).sort({ date: -1 });
+                        const latestPrice = getLatestPriceEntry(crop._id, market._id);
 
                         if (latestPrice) {
                             const confidenceLabel = getConfidenceLabel(
@@ -101,30 +106,25 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
                     const cropName = cropIndexes[cropIdx];
                     const marketName = marketIndexes[marketIdx];
 
-                    const crop = await Crop.findOne({ name: cropName });
-                    const market = await Market.findOne({
-                        name: { $regex: new RegExp(marketName, 'i') },
-                    });
+                    const crop = getCropByName(cropName);
+                    const market = findMarketByPartialName(marketName);
 
                     if (crop && market) {
-                        const latestPrice = await Price.findOne({
-                            cropId: crop._id,
-                            marketId: market._id,
-                            approved: true,
-                        }).sort({ date: -1 });
+                        const latestPrice = getLatestPriceEntry(crop._id, market._id);
 
                         if (latestPrice) {
                             const confidenceLabel = getConfidenceLabel(
                                 latestPrice.confidenceScore,
                                 lang
                             );
-                            await sendPriceSMS(
+                            await enqueuePriceSMS(
                                 phone,
                                 crop.name,
                                 market.name,
                                 latestPrice.price,
                                 crop.unit,
-                                confidenceLabel
+                                confidenceLabel,
+                                sessionId ? `ussd:${sessionId}:${latestPrice.priceId}` : undefined
                             );
                             response = `END ${t('smsSent', lang)}`;
                         } else {
@@ -179,10 +179,8 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
                     const cropName = cropIndexes[cropIdx];
                     const marketName = marketIndexes[marketIdx];
 
-                    const crop = await Crop.findOne({ name: cropName });
-                    const market = await Market.findOne({
-                        name: { $regex: new RegExp(marketName, 'i') },
-                    });
+                    const crop = getCropByName(cropName);
+                    const market = findMarketByPartialName(marketName);
 
                     // Find or create source by phone number
                     let source = await Source.findOne({ phoneNumber: phone });
@@ -192,16 +190,19 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
                             phoneNumber: phone,
                             role: 'Trader',
                         });
+                        cacheSource(source);
                     }
 
                     if (crop && market) {
-                        await Price.create({
+                        const price = await Price.create({
                             cropId: crop._id,
                             marketId: market._id,
                             price: priceValue,
                             sourceId: source._id,
                             approved: false,
                         });
+                        await Promise.all([addToConfidenceBuckets(price), recordSubmission(price)]);
+                        bumpDataVersion('prices');
 
                         source.submissionCount += 1;
                         source.lastSubmission = new Date();
@@ -221,10 +222,10 @@ export const handleUSSD = async (req: Request, res: Response): Promise<void> =>
                 response = `CON ${t('selectLanguage', lang)}`;
             } else if (parts.length === 2) {
                 if (parts[1] === '1') {
-                    userLanguages.set(phone, 'en');
+                    await setLanguage(phone, 'en');
                     response = `END ${t('languageSet', 'en')}`;
                 } else if (parts[1] === '2') {
-                    userLanguages.set(phone, 'sw');
+                    await setLanguage(phone, 'sw');
                     response = `END ${t('languageSet', 'sw')}`;
                 } else {
                     response = `END ${t('invalidInput', lang)}`;
@@ -0,0 +1,105 @@
+import http from 'http';
+import { AddressInfo } from 'net';
+import { sanitizePhone } from '../middleware/validate';
+
+// Minimal stand-in for Africa's Talking's SMS endpoint, for exercising the SMS
+// worker locally without sending real messages.
+//   npm run fake-at
+//   AT_SMS_URL=http://localhost:5055/version1/messaging npm run dev
+// FAKE_AT_FAILURE_RATE (0..1) makes a share of requests fail with HTTP 500 and
+// FAKE_AT_REJECT lists numbers answered with 403 InvalidPhoneNumber;
+// FAKE_AT_DELAY_MS holds every response back that long. Like the
+// real API, recipients are reported in +254 form whatever form they were sent in.
+// startFakeAfricasTalking() runs the same server in-process for the SMS checks.
+
+export interface FakeAtOptions {
+    failureRate: number;
+    rejected: Set<string>;
+    delayMs: number;
+}
+
+export interface FakeAt {
+    url: string;
+    options: FakeAtOptions;
+    stats: { requests: number; delivered: number };
+    close: () => Promise<void>;
+}
+
+export const startFakeAfricasTalking = (port: number, options: FakeAtOptions): Promise<FakeAt> => {
+    const stats = { requests: 0, delivered: 0 };
+
+    const server = http.createServer((req, res) => {
+        if (req.method !== 'POST' || !req.url?.startsWith('/version1/messaging')) {
+            res.writeHead(404).end();
+            return;
+        }
+
+        let body = '';
+        req.on('data', (chunk) => {
+            body += chunk;
+        });
+        const respond = () => {
+            stats.requests++;
+            if (Math.random() < options.failureRate) {
+                res.writeHead(500, { 'Content-Type': 'application/json' });
+                res.end(JSON.stringify({ error: 'Simulated gateway failure' }));
+                return;
+            }
+
+            const params = new URLSearchParams(body);
+            const numbers = (params.get('to') || '').split(',').filter(Boolean).map(sanitizePhone);
+            const recipients = numbers.map((number, i) => {
+                if (options.rejected.has(number)) {
+                    return { number, statusCode: 403, status: 'InvalidPhoneNumber', cost: '0', messageId: 'None' };
+                }
+                stats.delivered++;
+                return {
+                    number,
+                    statusCode: 101,
+                    status: 'Success',
+                    cost: 'KES 0.8000',
+                    messageId: `ATXid_fake_${stats.requests}_${i}`,
+                };
+            });
+
+            const sent = recipients.filter((r) => r.statusCode === 101).length;
+            res.writeHead(201, { 'Content-Type': 'application/json' });
+            res.end(
+                JSON.stringify({
+                    SMSMessageData: {
+                        Message: `Sent to ${sent}/${numbers.length}`,
+                        Recipients: recipients,
+                    },
+                })
+            );
+        };
+        req.on('end', () => setTimeout(respond, options.delayMs));
+    });
+
+    return new Promise((resolve) => {
+        server.listen(port, () => {
+            const { port: bound } = server.address() as AddressInfo;
+            resolve({
+                url: `http://localhost:${bound}/version1/messaging`,
+                options,
+                stats,
+                close: () => new Promise((done) => server.close(() => done())),
+            });
+        });
+    });
+};
+
+if (require.main === module) {
+    startFakeAfricasTalking(parseInt(process.env.FAKE_AT_PORT || '5055', 10), {
+        failureRate: parseFloat(process.env.FAKE_AT_FAILURE_RATE || '0'),
+        rejected: new Set((process.env.FAKE_AT_REJECT || '').split(',').filter(Boolean).map(sanitizePhone)),
+        delayMs: parseInt(process.env.FAKE_AT_DELAY_MS || '0', 10),
+    }).then((fake) => {
+        console.log(`📡 Fake Africa's Talking listening on ${fake.url}`);
+        setInterval(() => {
+            if (fake.stats.requests > 0) {
+                console.log(`📡 ${fake.stats.requests} requests, ${fake.stats.delivered} messages delivered`);
+            }
+        }, 10 * 1000);
+    });
+}
@@ -0,0 +1,165 @@
+import { performance } from 'perf_hooks';
+import { Types } from 'mongoose';
+import Price from '../models/Price';
+import Crop from '../models/Crop';
+import Market from '../models/Market';
+import Source from '../models/Source';
+import { primeReferenceData } from '../services/referenceCache';
+import { serializePricePage, serializePriceHistory, serializeCrops, cropCode, priceStatus } from '../services/serializers';
+
+// Micro-benchmark for the read-path serializers; no database needed.
+//   npm run bench:serializers [-- <iterations>]
+// For 1,000-row responses it compares the old path (hydrated documents with
+// populated refs, serialized through toJSON by res.json) with lean rows sent
+// through JSON.stringify and with the compiled serializers, and checks that
+// all three produce the same JSON.
+
+const ROWS = 1000;
+const iterations = parseInt(process.argv[2] || '200', 10);
+
+const crops = Array.from({ length: 12 }, (_, i) => ({
+    _id: new Types.ObjectId(),
+    name: `Crop ${i}`,
+    nameSwahili: `Zao ${i}`,
+    unit: '90kg bag',
+    category: 'cereals',
+    createdAt: new Date(),
+    updatedAt: new Date(),
+}));
+const markets = Array.from({ length: 8 }, (_, i) => ({
+    _id: new Types.ObjectId(),
+    name: `Market ${i}`,
+    county: 'Nairobi',
+    region: 'Central',
+    active: true,
+}));
+const sources = Array.from({ length: 50 }, (_, i) => ({
+    _id: new Types.ObjectId(),
+    name: `Source ${i}`,
+    phoneNumber: `+2547000000${i}`,
+    role: 'Trader',
+    reliabilityScore: 0.5 + (i % 5) / 10,
+    status: 'active',
+}));
+primeReferenceData({ crops, markets, sources });
+
+const byId = <T extends { _id: Types.ObjectId }>(docs: T[]): Map<string, T> =>
+    new Map(docs.map((doc) => [String(doc._id), doc]));
+const cropById = byId(crops);
+const marketById = byId(markets);
+const sourceById = byId(sources);
+
+const rows = Array.from({ length: ROWS }, (_, i) => ({
+    _id: new Types.ObjectId(),
+    cropId: crops[i % crops.length]._id,
+    marketId: markets[i % markets.length]._id,
+    price: 3000 + (i % 700),
+    date: new Date(Date.now() - i * 60000),
+    confidenceScore: 0.75,
+    weightedAverage: 3350,
+    submissionCount: 4,
+    approved: i % 3 !== 0,
+    sourceId: sources[i % sources.length]._id,
+    notes: i % 10 === 0 ? 'Market day "rush"' : undefined,
+    createdAt: new Date(),
+    updatedAt: new Date(),
+}));
+
+const pick = (doc: any, fields: string[]) =>
+    Object.fromEntries([['_id', doc._id], ...fields.map((f) => [f, doc[f]])]);
+
+// Old path: what populate() + res.json produced
+const hydrated = () =>
+    rows.map((row) =>
+        Price.hydrate(
+            {
+                ...row,
+                cropId: Crop.hydrate(pick(cropById.get(String(row.cropId)), ['name', 'unit'])),
+                marketId: Market.hydrate(pick(marketById.get(String(row.marketId)), ['name', 'county'])),
+                sourceId: Source.hydrate(
+                    pick(sourceById.get(String(row.sourceId)), ['name', 'role', 'reliabilityScore'])
+                ),
+            },
+            null,
+            { hydratedPopulatedDocs: true }
+        )
+    );
+
+// Lean rows with refs and virtuals attached by hand, then generic JSON.stringify
+const leanView = (row: any) => {
+    const crop: any = cropById.get(String(row.cropId));
+    const market: any = marketById.get(String(row.marketId));
+    const source: any = sourceById.get(String(row.sourceId));
+    return {
+        ...row,
+        cropId: { _id: crop._id, name: crop.name, unit: crop.unit, code: cropCode(crop.name), id: String(crop._id) },
+        marketId: { _id: market._id, name: market.name, county: market.county },
+        sourceId: { _id: source._id, name: source.name, role: source.role, reliabilityScore: source.reliabilityScore },
+        status: priceStatus(row.approved),
+        id: String(row._id),
+    };
+};
+
+const page = (prices: any[]) => ({ prices, total: 123456, page: 1, pages: 124 });
+
+const measure = (label: string, fn: () => string): number => {
+    for (let i = 0; i < Math.min(20, iterations); i++) fn();
+    const start = performance.now();
+    let bytes = 0;
+    for (let i = 0; i < iterations; i++) bytes += fn().length;
+    const perRun = (performance.now() - start) / iterations;
+    console.log(
+        `  ${label.padEnd(44)} ${perRun.toFixed(3).padStart(8)} ms / 1,000 rows  (${Math.round(bytes / iterations / 1024)} KB)`
+    );
+    return perRun;
+};
+
+// Key order differs between the paths, so compare canonical forms
+const canonical = (json: string): string =>
+    JSON.stringify(JSON.parse(json), (_key, value) =>
+        value && typeof value === 'object' && !Array.isArray(value)
+            ? Object.fromEntries(Object.entries(value).sort(([a], [b]) => a.localeCompare(b)))
+            : value
+    );
+
+const check = (label: string, expected: string, actual: string): void => {
+    if (canonical(expected) !== canonical(actual)) {
+        console.error(`❌ ${label}: serializer output differs from toJSON output`);
+        process.exit(1);
+    }
+};
+
+const run = () => {
+    console.log(`📊 Serializer benchmark, ${ROWS} rows x ${iterations} iterations`);
+
+    check('GET /api/prices', JSON.stringify(page(hydrated())), serializePricePage(page(rows)));
+    // History responses leave sourceId unpopulated
+    check(
+        'GET /api/prices/history',
+        JSON.stringify(rows.map((row) => ({ ...leanView(row), sourceId: row.sourceId }))),
+        serializePriceHistory(rows)
+    );
+    const cropRows = Array.from({ length: ROWS }, (_, i) => ({ ...crops[i % crops.length], _id: new Types.ObjectId() }));
+    check(
+        'GET /api/crops',
+        JSON.stringify(cropRows.map((c) => Crop.hydrate(c))),
+        serializeCrops(cropRows)
+    );
+
+    console.log('GET /api/prices');
+    const baseline = measure('hydrate + populate docs + JSON.stringify', () => JSON.stringify(page(hydrated())));
+    const lean = measure('lean + JSON.stringify', () => JSON.stringify(page(rows.map(leanView))));
+    const compiled = measure('lean + compiled serializer', () => serializePricePage(page(rows)));
+    console.log(
+        `  → ${(baseline / compiled).toFixed(1)}x faster than hydrated documents, ${(lean / compiled).toFixed(1)}x faster than lean + JSON.stringify`
+    );
+
+    console.log('GET /api/crops');
+    const cropBaseline = measure('hydrate + JSON.stringify', () =>
+        JSON.stringify(cropRows.map((c) => Crop.hydrate(c)))
+    );
+    const cropCompiled = measure('lean + compiled serializer', () => serializeCrops(cropRows));
+    console.log(`  → ${(cropBaseline / cropCompiled).toFixed(1)}x faster than hydrated documents`);
+};
+
+run();
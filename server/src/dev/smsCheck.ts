@@ -0,0 +1,159 @@
+import mongoose from 'mongoose';
+import { env } from '../config/env';
+import { startFakeAfricasTalking, FakeAt } from './fakeAfricasTalking';
+import { sendSMSBatch } from '../services/smsService';
+import { enqueueBulkSMS, enqueueSMS, runSmsWorkerOnce } from '../services/smsQueue';
+import OutboundMessage from '../models/OutboundMessage';
+
+// End-to-end checks of the SMS path against the in-process fake AT server.
+//   npm run check:sms
+// The worker checks use a scratch database next to MONGODB_URI's, dropped
+// afterwards, so real queued messages are never claimed. Exits non-zero on
+// the first failed check.
+
+const SCRATCH_DB = 'sokoprice_sms_check';
+
+const check = (label: string, ok: boolean, detail?: unknown): void => {
+    if (!ok) {
+        console.error(`❌ ${label}`, detail ?? '');
+        process.exit(1);
+    }
+    console.log(`  ✓ ${label}`);
+};
+
+const jobsFor = (message: string) => OutboundMessage.find({ message }).lean();
+
+// Retries are scheduled with backoff; make them due now
+const makeDue = (message: string) =>
+    OutboundMessage.updateMany({ message, status: 'pending' }, { $set: { nextAttemptAt: new Date() } });
+
+// AT answers in +254 form; recipients stored as 07.. or 254.. must still match
+const checkBatchMatching = async (fake: FakeAt): Promise<void> => {
+    console.log('sendSMSBatch');
+    const recipients = ['0712000001', '254712000002', '+254712000003', '0712000001'];
+    const results = await sendSMSBatch(recipients, 'batch check');
+    check('every recipient is matched and sent', results.every((r) => r.success), results);
+    check(
+        'each recipient gets its own message id',
+        new Set(results.map((r) => r.messageId)).size === recipients.length,
+        results
+    );
+
+    fake.options.rejected.add('+254712000002');
+    const [sent, rejected] = await sendSMSBatch(['0712000001', '0712000002'], 'reject check');
+    fake.options.rejected.clear();
+    check('a rejected number fails permanently', !rejected.success && rejected.retryable === false, rejected);
+    check('its batch mate is still sent', sent.success, sent);
+};
+
+const checkSend = async (fake: FakeAt): Promise<void> => {
+    console.log('worker: send');
+    const message = 'worker send check';
+    await enqueueBulkSMS([
+        { to: '0712000011', message },
+        { to: '254712000012', message },
+        { to: '+254712000013', message },
+    ]);
+    const before = fake.stats.requests;
+    await runSmsWorkerOnce();
+    const jobs = await jobsFor(message);
+    check('identical bodies go out in one provider call', fake.stats.requests - before === 1, fake.stats);
+    check(
+        'every job is sent with its provider id',
+        jobs.length === 3 && jobs.every((j) => j.status === 'sent' && j.providerMessageId),
+        jobs
+    );
+    check('recipients are stored normalized', jobs.every((j) => j.to.startsWith('+254')), jobs);
+};
+
+const checkRetry = async (fake: FakeAt): Promise<void> => {
+    console.log('worker: retry');
+    const message = 'worker retry check';
+    await enqueueSMS('0712000021', message);
+
+    fake.options.failureRate = 1;
+    await runSmsWorkerOnce();
+    let [job] = await jobsFor(message);
+    check(
+        'a gateway error leaves the job pending with a backoff',
+        job.status === 'pending' && job.attempts === 1 && !!job.lastError && job.nextAttemptAt > new Date(),
+        job
+    );
+
+    fake.options.failureRate = 0;
+    await makeDue(message);
+    await runSmsWorkerOnce();
+    [job] = await jobsFor(message);
+    check('the retry is sent', job.status === 'sent' && job.attempts === 2, job);
+};
+
+const checkTimeout = async (fake: FakeAt): Promise<void> => {
+    console.log('worker: timeout');
+    const message = 'worker timeout check';
+    await enqueueSMS('0712000031', message);
+
+    fake.options.delayMs = env.AT_TIMEOUT_MS * 4;
+    const startedAt = Date.now();
+    await runSmsWorkerOnce();
+    fake.options.delayMs = 0;
+    const [job] = await jobsFor(message);
+    check('a hung provider call is abandoned', Date.now() - startedAt < env.AT_TIMEOUT_MS * 3, Date.now() - startedAt);
+    check('and retried later', job.status === 'pending' && job.attempts === 1, job);
+    await OutboundMessage.deleteMany({ message });
+};
+
+const checkDeadLetter = async (fake: FakeAt): Promise<void> => {
+    console.log('worker: dead letter');
+    const message = 'worker dead letter check';
+    await enqueueSMS('0712000041', message);
+
+    fake.options.failureRate = 1;
+    for (let attempt = 0; attempt < env.SMS_MAX_ATTEMPTS; attempt++) {
+        await makeDue(message);
+        await runSmsWorkerOnce();
+    }
+    fake.options.failureRate = 0;
+    let [job] = await jobsFor(message);
+    check(
+        'a job that exhausts its attempts is dead-lettered',
+        job.status === 'dead' && job.attempts === env.SMS_MAX_ATTEMPTS,
+        job
+    );
+
+    const rejectedMessage = 'worker rejected check';
+    fake.options.rejected.add('+254712000042');
+    await enqueueSMS('0712000042', rejectedMessage);
+    await runSmsWorkerOnce();
+    fake.options.rejected.clear();
+    [job] = await jobsFor(rejectedMessage);
+    check('a permanent failure is dead-lettered at once', job.status === 'dead' && job.attempts === 1, job);
+};
+
+const run = async (): Promise<void> => {
+    const fake = await startFakeAfricasTalking(0, { failureRate: 0, rejected: new Set(), delayMs: 0 });
+    env.AT_SMS_URL = fake.url;
+    env.AT_TIMEOUT_MS = 500;
+    env.SMS_MAX_ATTEMPTS = 3;
+
+    await mongoose.connect(env.MONGODB_URI, { dbName: SCRATCH_DB });
+    await mongoose.connection.dropDatabase();
+    try {
+        await checkBatchMatching(fake);
+        await checkSend(fake);
+        await checkRetry(fake);
+        await checkTimeout(fake);
+        await checkDeadLetter(fake);
+    } finally {
+        await mongoose.connection.dropDatabase();
+        await mongoose.disconnect();
+        await fake.close();
+    }
+    console.log('✅ SMS checks passed');
+};
+
+run()
+    .then(() => process.exit(0))
+    .catch((error) => {
+        console.error('❌ SMS checks failed:', error);
+        process.exit(1);
+    });
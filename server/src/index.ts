@@ -1,10 +1,29 @@
+import cluster from 'cluster';
 import express from 'express';
 import cors from 'cors';
 import helmet from 'helmet';
+// First: registers the Mongoose metrics plugin before any model is compiled
+import { httpMetrics, metricsHandler, serveClusterMetrics } from './services/metrics';
+import { queryTrace } from './services/queryTrace';
 import { connectDB } from './config/db';
 import { env } from './config/env';
 import { apiLimiter } from './middleware/rateLimiter';
-import { startAlertScheduler } from './services/alertService';
+import { startAlertScheduler, startAlertListener } from './services/alertService';
+import { startPriceChangeStream } from './services/priceEvents';
+import { startSmsWorker, stopSmsWorker } from './services/smsQueue';
+import { loadLatestPrices } from './services/latestPriceService';
+import { loadReferenceData } from './services/referenceCache';
+import { ensureRollups } from './services/rollupService';
+import { loadAlertIndex } from './services/alertIndex';
+import {
+    ensureConfidenceBuckets,
+    startConfidenceJob,
+    refreshAllConfidenceScores,
+} from './services/confidenceService';
+import { ensureSourceStats } from './services/sourceStatsService';
+import { isLeader, onLeadershipChange, startLeaderElection, stopLeaderElection } from './services/leaderLease';
+import { startCacheSync } from './services/cacheSync';
+import { serveClusterUserEvictions } from './services/userCache';
 
 // Route imports
 import authRoutes from './routes/authRoutes';
@@ -26,12 +45,21 @@ app.use(helmet());
 app.use(cors({
     origin: env.NODE_ENV === 'development' ? true : [env.CLIENT_URL, 'https://soko-price.vercel.app'],
     credentials: true,
+    exposedHeaders: ['X-Query-Count', 'Server-Timing'],
 }));
 
+// Request metrics cover everything below, rate-limited responses included
+app.use(httpMetrics);
+// Per-request Mongo accounting (X-Query-Count, Server-Timing, N+1 warnings)
+app.use(queryTrace);
+
 // Body parsing
 app.use(express.json());
 app.use(express.urlencoded({ extended: true }));
 
+// Prometheus scrape endpoint, outside the API rate limit
+app.get('/api/metrics', metricsHandler);
+
 // Rate limiting
 app.use('/api/', apiLimiter);
 
@@ -41,6 +69,8 @@ app.get('/api/health', (_req, res) => {
         status: 'ok',
         service: 'SokoPrice API',
         version: '1.0.0',
+        pid: process.pid,
+        schedulerLeader: isLeader(),
         timestamp: new Date().toISOString(),
     });
 });
@@ -71,6 +101,15 @@ app.use((err: any, _req: express.Request, res: express.Response, _next: express.
 // Start server
 const startServer = async () => {
     await connectDB();
+    // Record shared data versions before loading so writes from other workers
+    // made during startup still trigger a reload
+    startCacheSync();
+    await loadReferenceData();
+    await loadLatestPrices();
+    await ensureRollups();
+    await ensureConfidenceBuckets();
+    await ensureSourceStats();
+    await loadAlertIndex();
 
     app.listen(env.PORT, () => {
         console.log(`
@@ -79,14 +118,68 @@ const startServer = async () => {
    Port: ${env.PORT}
    Environment: ${env.NODE_ENV}
    USSD Code: ${env.USSD_SERVICE_CODE}
+   PID: ${process.pid}
 🌾 ============================================
     `);
     });
 
-    // Start alert scheduler
+    // Alerts fire on price events; the scheduler remains as a reconciliation sweep
+    startAlertListener();
+    if (env.PRICE_CHANGE_STREAM) startPriceChangeStream();
     startAlertScheduler();
+    startConfidenceJob();
+
+    // Scheduled jobs, SMS delivery and the full confidence refresh run on the
+    // elected leader only; a follower takes over if the leader goes away
+    onLeadershipChange((leader) => {
+        if (leader) {
+            startSmsWorker();
+            refreshAllConfidenceScores();
+        } else {
+            stopSmsWorker();
+        }
+    });
+    startLeaderElection();
+
+    // Hand the lease over straight away instead of waiting for it to lapse
+    process.on('SIGTERM', () => {
+        stopLeaderElection()
+            .catch((error) => console.error('❌ Lease release failed:', error))
+            .finally(() => process.exit(0));
+    });
+};
+
+// Cluster mode (WEB_CONCURRENCY > 1): the primary only supervises workers,
+// which share the port and each run the full API
+const startCluster = () => {
+    let shuttingDown = false;
+    console.log(`🧵 Starting ${env.WEB_CONCURRENCY} API workers`);
+    serveClusterMetrics();
+    serveClusterUserEvictions();
+    for (let i = 0; i < env.WEB_CONCURRENCY; i++) cluster.fork();
+
+    cluster.on('exit', (worker, code, signal) => {
+        if (shuttingDown) {
+            if (Object.keys(cluster.workers || {}).length === 0) process.exit(0);
+            return;
+        }
+        console.warn(`⚠️ Worker ${worker.process.pid} exited (${signal || code}), restarting`);
+        // Back off a little so a worker that dies at boot doesn't spin
+        setTimeout(() => cluster.fork(), 1000);
+    });
+
+    for (const signal of ['SIGTERM', 'SIGINT'] as const) {
+        process.on(signal, () => {
+            shuttingDown = true;
+            for (const worker of Object.values(cluster.workers || {})) worker?.kill('SIGTERM');
+        });
+    }
 };
 
-startServer().catch(console.error);
+if (env.WEB_CONCURRENCY > 1 && cluster.isPrimary) {
+    startCluster();
+} else {
+    startServer().catch(console.error);
+}
 
 export default app;
@@ -1,10 +1,18 @@
 import { Request, Response, NextFunction } from 'express';
 import jwt from 'jsonwebtoken';
-import User, { IUser } from '../models/User';
+import { IUser } from '../models/User';
 import { env } from '../config/env';
+import { AuthUser, getAuthUser } from '../services/userCache';
 
 export interface AuthRequest extends Request {
-    user?: IUser;
+    user?: AuthUser;
+}
+
+// Identity and role travel in the token; tv is the user's tokenVersion at issue
+interface TokenClaims {
+    id: string;
+    role?: IUser['role'];
+    tv?: number;
 }
 
 export const protect = async (
@@ -27,14 +35,21 @@ export const protect = async (
             return;
         }
 
-        const decoded = jwt.verify(token, env.JWT_SECRET) as { id: string };
-        const user = await User.findById(decoded.id);
+        const decoded = jwt.verify(token, env.JWT_SECRET) as TokenClaims;
+        // Served from the user cache in the steady state
+        const user = await getAuthUser(decoded.id);
 
         if (!user) {
             res.status(401).json({ message: 'Not authorized - user not found' });
             return;
         }
 
+        // Tokens issued before the last revocation (or before a role change) are dead
+        if ((decoded.tv ?? 0) !== user.tokenVersion || (decoded.role && decoded.role !== user.role)) {
+            res.status(401).json({ message: 'Not authorized - token revoked' });
+            return;
+        }
+
         req.user = user;
         next();
     } catch (error) {
@@ -52,8 +67,13 @@ export const authorize = (...roles: string[]) => {
     };
 };
 
-export const generateToken = (userId: string): string => {
-    return jwt.sign({ id: userId }, env.JWT_SECRET, {
+export const generateToken = (user: Pick<IUser, '_id' | 'role' | 'tokenVersion'>): string => {
+    const claims: TokenClaims = {
+        id: String(user._id),
+        role: user.role,
+        tv: user.tokenVersion ?? 0,
+    };
+    return jwt.sign(claims, env.JWT_SECRET, {
         expiresIn: env.JWT_EXPIRES_IN,
     } as jwt.SignOptions);
 };
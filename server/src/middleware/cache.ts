@@ -0,0 +1,80 @@
+import { Request, Response, NextFunction } from 'express';
+import { DataScope } from '../services/dataVersion';
+import { catchUp } from '../services/cacheSync';
+
+interface CacheOptions {
+    sMaxAge: number; // seconds, shared caches (CDN) only
+    staleWhileRevalidate: number; // seconds
+    // Responses computed over a window ending "now" (e.g. trends) also change
+    // at each UTC midnight
+    daily?: boolean;
+}
+
+// Crops and markets change rarely; prices are revalidated more often
+export const REFERENCE_CACHE: CacheOptions = { sMaxAge: 300, staleWhileRevalidate: 3600 };
+
+const matchesETag = (header: string, etag: string): boolean =>
+    header.split(',').some((tag) => {
+        const t = tag.trim();
+        return t === '*' || t === etag || t.replace(/^W\//, '') === etag.replace(/^W\//, '');
+    });
+
+// Conditional GET for public data that only changes when its scopes' data
+// versions do. 304s are answered before the handler runs, so a revalidation
+// never touches the collections behind the route. The in-process caches behind
+// the scopes are caught up first, so the ETag never runs ahead of the data
+// served under it. Browsers must revalidate every time (no-cache), so a client
+// refetching right after its own write sees it; only shared caches may hold
+// responses, and only successful ones.
+export const cacheable = (
+    scopes: DataScope[],
+    options: CacheOptions = { sMaxAge: 30, staleWhileRevalidate: 300 }
+) => {
+    return async (req: Request, res: Response, next: NextFunction): Promise<void> => {
+        try {
+            const states = await catchUp(scopes);
+            const tags = scopes.map((scope, i) => `${scope[0]}${states[i].version}`);
+            let modified = Math.max(...states.map((s) => s.updatedAt.getTime()));
+            if (options.daily) {
+                const today = new Date().toISOString().slice(0, 10);
+                tags.push(today);
+                modified = Math.max(modified, Date.parse(`${today}T00:00:00.000Z`));
+            }
+            const etag = `W/"${tags.join('-')}"`;
+            const lastModified = new Date(modified);
+            const headers = {
+                ETag: etag,
+                'Last-Modified': lastModified.toUTCString(),
+                'Cache-Control':
+                    `public, no-cache, s-maxage=${options.sMaxAge}, ` +
+                    `stale-while-revalidate=${options.staleWhileRevalidate}`,
+            };
+
+            const ifNoneMatch = req.headers['if-none-match'];
+            const ifModifiedSince = req.headers['if-modified-since'];
+            const notModified = ifNoneMatch
+                ? matchesETag(ifNoneMatch, etag)
+                : !!ifModifiedSince &&
+                  Math.floor(lastModified.getTime() / 1000) <= Math.floor(Date.parse(ifModifiedSince) / 1000);
+
+            if (notModified) {
+                res.set(headers).status(304).end();
+                return;
+            }
+
+            // Stamped as the response goes out, once its status is known; a 400
+            // or 500 must not be stored or revalidated as the data itself
+            const writeHead = res.writeHead;
+            res.writeHead = function (this: Response, ...args: any[]) {
+                const status = typeof args[0] === 'number' ? args[0] : res.statusCode;
+                if (!res.headersSent && status >= 200 && status < 300) res.set(headers);
+                return (writeHead as any).apply(this, args);
+            } as any;
+            next();
+        } catch (error) {
+            // Never fail a public read because validators couldn't be computed
+            console.error('❌ Cache validators unavailable:', error);
+            next();
+        }
+    };
+};
@@ -0,0 +1,126 @@
+import type { Store, Options, ClientRateLimitInfo, IncrementResponse } from 'express-rate-limit';
+import RateLimitCounter from '../models/RateLimitCounter';
+
+// express-rate-limit store backed by fixed-window counters in Mongo, so limits
+// hold across cluster workers and instances. Decisions are made locally from
+// the last known shared count plus this process's unflushed hits; every
+// FLUSH_MS the hits are pushed with one bulkWrite and the shared counts read
+// back with one find, so the limiter adds no round-trip to any request. Other
+// processes' hits are seen at most one flush late, which bounds the overshoot.
+
+const FLUSH_MS = 1000;
+
+interface WindowCount {
+    windowStart: number;
+    // Shared count as of the last flush, our own flushed hits included
+    shared: number;
+    // Hits taken locally and not yet written
+    pending: number;
+    // Hits being written by the current flush
+    flushing: number;
+}
+
+export const createMongoStore = (prefix: string): Store => {
+    let windowMs = 60 * 1000;
+    const counts: Map<string, WindowCount> = new Map();
+    let flushRunning = false;
+
+    const windowOf = (now: number): number => now - (now % windowMs);
+    const counterId = (key: string, windowStart: number): string => `${prefix}:${key}:${windowStart}`;
+
+    const current = (key: string): WindowCount => {
+        const windowStart = windowOf(Date.now());
+        let count = counts.get(key);
+        if (!count || count.windowStart !== windowStart) {
+            count = { windowStart, shared: 0, pending: 0, flushing: 0 };
+            counts.set(key, count);
+        }
+        return count;
+    };
+
+    const info = (count: WindowCount): ClientRateLimitInfo => ({
+        totalHits: count.shared + count.flushing + count.pending,
+        resetTime: new Date(count.windowStart + windowMs),
+    });
+
+    const flush = async (): Promise<void> => {
+        if (flushRunning) return;
+        flushRunning = true;
+        const now = Date.now();
+        const batch: [string, WindowCount][] = [];
+        for (const [key, count] of counts) {
+            if (count.pending !== 0) {
+                count.flushing = count.pending;
+                count.pending = 0;
+                batch.push([key, count]);
+            } else if (count.windowStart + windowMs <= now) {
+                // Window over and nothing left to write: forget it locally too
+                counts.delete(key);
+            }
+        }
+
+        try {
+            if (batch.length === 0) return;
+            const ids = batch.map(([key, count]) => counterId(key, count.windowStart));
+            await RateLimitCounter.bulkWrite(
+                batch.map(([key, count]) => ({
+                    updateOne: {
+                        filter: { _id: counterId(key, count.windowStart) },
+                        update: {
+                            $inc: { hits: count.flushing },
+                            $setOnInsert: { expiresAt: new Date(count.windowStart + windowMs) },
+                        },
+                        upsert: true,
+                    },
+                })),
+                { ordered: false }
+            );
+            const docs = await RateLimitCounter.find({ _id: { $in: ids } }).select('hits').lean();
+            const hits = new Map(docs.map((doc) => [doc._id, doc.hits]));
+            for (const [key, count] of batch) {
+                count.shared = hits.get(counterId(key, count.windowStart)) ?? count.shared + count.flushing;
+                count.flushing = 0;
+            }
+        } catch (error) {
+            console.error(`❌ Rate limit flush failed (${prefix}):`, error);
+            // Keep the hits and retry them with the next flush
+            for (const [, count] of batch) {
+                count.pending += count.flushing;
+                count.flushing = 0;
+            }
+        } finally {
+            flushRunning = false;
+        }
+    };
+
+    return {
+        localKeys: false,
+        prefix,
+
+        init(options: Options): void {
+            windowMs = options.windowMs;
+            setInterval(flush, FLUSH_MS).unref();
+        },
+
+        async get(key: string): Promise<ClientRateLimitInfo | undefined> {
+            const count = counts.get(key);
+            return count && count.windowStart === windowOf(Date.now()) ? info(count) : undefined;
+        },
+
+        async increment(key: string): Promise<IncrementResponse> {
+            const count = current(key);
+            count.pending++;
+            return info(count);
+        },
+
+        async decrement(key: string): Promise<void> {
+            current(key).pending--;
+        },
+
+        async resetKey(key: string): Promise<void> {
+            const count = counts.get(key);
+            counts.delete(key);
+            if (count) await RateLimitCounter.deleteOne({ _id: counterId(key, count.windowStart) });
+        },
+    };
+};
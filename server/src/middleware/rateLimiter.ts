@@ -1,11 +1,40 @@
-import rateLimit from 'express-rate-limit';
+import rateLimit, { Store } from 'express-rate-limit';
+import { Request } from 'express';
+import { env } from '../config/env';
+import { createMongoStore } from './rateLimitStore';
+import { sanitizePhone } from './validate';
+
+// Limits are shared across workers and instances through the Mongo store;
+// RATE_LIMIT_STORE=memory falls back to express-rate-limit's per-process store
+const store = (prefix: string): Store | undefined =>
+    env.RATE_LIMIT_STORE === 'memory' ? undefined : createMongoStore(prefix);
 
 export const apiLimiter = rateLimit({
     windowMs: 15 * 60 * 1000, // 15 minutes
-    max: 100,
+    max: env.API_RATE_LIMIT_MAX,
     message: { message: 'Too many requests, please try again later.' },
     standardHeaders: true,
     legacyHeaders: false,
+    // USSD arrives from the carrier gateway's few IPs; it has its own limits below
+    skip: (req) => req.path.startsWith('/ussd'),
+    store: store('api'),
+});
+
+// One subscriber's session traffic, whatever gateway address it arrives from
+const ussdKey = (req: Request): string => {
+    const phone = req.body?.phoneNumber;
+    return phone ? sanitizePhone(String(phone)) : req.ip || 'unknown';
+};
+
+// Coarse per-IP ceiling: the phone number above is client-supplied, so a
+// single address rotating numbers would otherwise never be limited
+export const ussdIpLimiter = rateLimit({
+    windowMs: 60 * 1000, // 1 minute
+    max: env.USSD_IP_RATE_LIMIT_MAX,
+    message: { message: 'Too many USSD requests.' },
+    standardHeaders: true,
+    legacyHeaders: false,
+    store: store('ussd-ip'),
 });
 
 export const ussdLimiter = rateLimit({
@@ -14,6 +43,8 @@ export const ussdLimiter = rateLimit({
     message: { message: 'Too many USSD requests.' },
     standardHeaders: true,
     legacyHeaders: false,
+    keyGenerator: ussdKey,
+    store: store('ussd'),
 });
 
 export const authLimiter = rateLimit({
@@ -22,4 +53,5 @@ export const authLimiter = rateLimit({
     message: { message: 'Too many login attempts, please try again later.' },
     standardHeaders: true,
     legacyHeaders: false,
+    store: store('auth'),
 });
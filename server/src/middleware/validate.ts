@@ -29,3 +29,12 @@ export const sanitizePhone = (phone: string): string => {
     }
     return cleaned;
 };
+
+// Every form a number may have been stored in before it was normalized, for
+// matching records written as typed (07.., 254.., 7..)
+export const phoneForms = (phone: string): string[] => {
+    const normalized = sanitizePhone(phone);
+    if (!normalized.startsWith('+254')) return [normalized];
+    const local = normalized.substring(4);
+    return [normalized, '0' + local, '254' + local, local];
+};
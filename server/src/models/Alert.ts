@@ -52,6 +52,7 @@ const AlertSchema = new Schema<IAlert>(
 
 AlertSchema.index({ phoneNumber: 1 });
 AlertSchema.index({ cropId: 1, marketId: 1 });
-AlertSchema.index({ active: 1 });
+// Daily summaries stream active alerts grouped by phone
+AlertSchema.index({ active: 1, phoneNumber: 1 });
 
 export default mongoose.model<IAlert>('Alert', AlertSchema);
@@ -0,0 +1,26 @@
+import mongoose, { Schema, Document } from 'mongoose';
+
+// Monotonic change counter per data scope, shared by every API process.
+// Bumped after writes; conditional GETs derive ETag/Last-Modified from it.
+export interface IDataVersion extends Omit<Document, '_id'> {
+    _id: string; // scope name
+    version: number;
+    updatedAt: Date;
+}
+
+const DataVersionSchema = new Schema<IDataVersion>({
+    _id: {
+        type: String,
+        required: true,
+    },
+    version: {
+        type: Number,
+        default: 0,
+    },
+    updatedAt: {
+        type: Date,
+        default: Date.now,
+    },
+});
+
+export default mongoose.model<IDataVersion>('DataVersion', DataVersionSchema);
@@ -0,0 +1,57 @@
+import mongoose, { Schema, Document, Types } from 'mongoose';
+
+// Materialized latest approved price per crop × market.
+// Maintained by latestPriceService on approve/reject; never written by clients.
+export interface ILatestPrice extends Document {
+    cropId: Types.ObjectId;
+    marketId: Types.ObjectId;
+    priceId: Types.ObjectId;
+    price: number;
+    date: Date;
+    confidenceScore: number;
+    sourceId: Types.ObjectId;
+    createdAt: Date;
+    updatedAt: Date;
+}
+
+const LatestPriceSchema = new Schema<ILatestPrice>(
+    {
+        cropId: {
+            type: Schema.Types.ObjectId,
+            ref: 'Crop',
+            required: true,
+        },
+        marketId: {
+            type: Schema.Types.ObjectId,
+            ref: 'Market',
+            required: true,
+        },
+        priceId: {
+            type: Schema.Types.ObjectId,
+            ref: 'Price',
+            required: true,
+        },
+        price: {
+            type: Number,
+            required: true,
+        },
+        date: {
+            type: Date,
+            required: true,
+        },
+        confidenceScore: {
+            type: Number,
+            default: 0.5,
+        },
+        sourceId: {
+            type: Schema.Types.ObjectId,
+            ref: 'Source',
+        },
+    },
+    { timestamps: true }
+);
+
+LatestPriceSchema.index({ cropId: 1, marketId: 1 }, { unique: true });
+LatestPriceSchema.index({ priceId: 1 });
+
+export default mongoose.model<ILatestPrice>('LatestPrice', LatestPriceSchema);
@@ -0,0 +1,28 @@
+import mongoose, { Schema, Document } from 'mongoose';
+
+// Named lease held by one process at a time (e.g. the scheduler leader).
+// The holder renews expiresAt on a heartbeat; once it lapses anyone may take it.
+export interface ILease extends Omit<Document, '_id'> {
+    _id: string; // lease name
+    holder: string;
+    expiresAt: Date;
+    heartbeatAt: Date;
+}
+
+const LeaseSchema = new Schema<ILease>({
+    _id: {
+        type: String,
+        required: true,
+    },
+    holder: {
+        type: String,
+        required: true,
+    },
+    expiresAt: {
+        type: Date,
+        required: true,
+    },
+    heartbeatAt: Date,
+});
+
+export default mongoose.model<ILease>('Lease', LeaseSchema);
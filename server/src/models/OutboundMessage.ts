@@ -0,0 +1,68 @@
+import mongoose, { Schema, Document } from 'mongoose';
+
+// Durable outbound SMS job, delivered by the smsQueue worker
+export interface IOutboundMessage extends Document {
+    to: string;
+    message: string;
+    status: 'pending' | 'sending' | 'sent' | 'dead';
+    idempotencyKey?: string;
+    attempts: number;
+    maxAttempts: number;
+    nextAttemptAt: Date;
+    lockedUntil?: Date;
+    claimToken?: string;
+    providerMessageId?: string;
+    lastError?: string;
+    sentAt?: Date;
+    createdAt: Date;
+    updatedAt: Date;
+}
+
+const OutboundMessageSchema = new Schema<IOutboundMessage>(
+    {
+        to: {
+            type: String,
+            required: [true, 'Recipient is required'],
+            trim: true,
+        },
+        message: {
+            type: String,
+            required: [true, 'Message is required'],
+        },
+        status: {
+            type: String,
+            enum: ['pending', 'sending', 'sent', 'dead'],
+            default: 'pending',
+        },
+        idempotencyKey: {
+            type: String,
+        },
+        attempts: {
+            type: Number,
+            default: 0,
+        },
+        maxAttempts: {
+            type: Number,
+            default: 5,
+        },
+        nextAttemptAt: {
+            type: Date,
+            default: Date.now,
+        },
+        lockedUntil: Date,
+        claimToken: String,
+        providerMessageId: String,
+        lastError: String,
+        sentAt: Date,
+    },
+    { timestamps: true }
+);
+
+OutboundMessageSchema.index({ idempotencyKey: 1 }, { unique: true, sparse: true });
+OutboundMessageSchema.index({ status: 1, nextAttemptAt: 1 });
+OutboundMessageSchema.index({ status: 1, lockedUntil: 1 });
+OutboundMessageSchema.index({ claimToken: 1 }, { sparse: true });
+// Delivered messages are kept for 30 days; dead letters stay until handled
+OutboundMessageSchema.index({ sentAt: 1 }, { expireAfterSeconds: 30 * 24 * 60 * 60 });
+
+export default mongoose.model<IOutboundMessage>('OutboundMessage', OutboundMessageSchema);
@@ -6,9 +6,14 @@ export interface IPrice extends Document {
     price: number;
     date: Date;
     confidenceScore: number;
+    // Window statistics behind confidenceScore, persisted at approval
+    weightedAverage?: number;
+    submissionCount?: number;
     approved: boolean;
     sourceId: Types.ObjectId;
     notes?: string;
+    // Set by bulk approval for the duration of its write, see priceModerationService
+    claimToken?: string;
     createdAt: Date;
     updatedAt: Date;
 }
@@ -40,6 +45,8 @@ const PriceSchema = new Schema<IPrice>(
             min: 0,
             max: 1,
         },
+        weightedAverage: Number,
+        submissionCount: Number,
         approved: {
             type: Boolean,
             default: false,
@@ -53,6 +60,10 @@ const PriceSchema = new Schema<IPrice>(
             type: String,
             trim: true,
         },
+        claimToken: {
+            type: String,
+            select: false,
+        },
     },
     { timestamps: true, toJSON: { virtuals: true }, toObject: { virtuals: true } }
 );
@@ -62,8 +73,10 @@ PriceSchema.virtual('status').get(function (this: IPrice) {
     return this.approved ? 'approved' : 'pending';
 });
 
-PriceSchema.index({ cropId: 1, marketId: 1, date: -1 });
-PriceSchema.index({ approved: 1 });
-PriceSchema.index({ date: -1 });
+// (date, _id) suffixes back keyset pagination on GET /api/prices
+PriceSchema.index({ cropId: 1, marketId: 1, date: -1, _id: -1 });
+PriceSchema.index({ approved: 1, date: -1, _id: -1 });
+PriceSchema.index({ date: -1, _id: -1 });
+PriceSchema.index({ sourceId: 1, date: -1 });
 
 export default mongoose.model<IPrice>('Price', PriceSchema);
@@ -0,0 +1,67 @@
+import mongoose, { Schema, Document, Types } from 'mongoose';
+
+// Buckets older than this expire; confidence windows must fit inside it
+export const CONFIDENCE_RETENTION_HOURS = 7 * 24;
+
+// Hourly running sums of submitted prices (approved or not) for a crop × market,
+// from which confidenceService scores a sliding window without reading prices.
+// Maintained incrementally; rebuild with `npm run rebuild confidence`.
+export interface IPriceConfidenceBucket extends Document {
+    cropId: Types.ObjectId;
+    marketId: Types.ObjectId;
+    hour: Date; // start of the UTC hour
+    count: number;
+    sum: number;
+    sumSq: number;
+    // Σ source reliability and Σ price × reliability
+    reliabilitySum: number;
+    weightedSum: number;
+}
+
+const PriceConfidenceBucketSchema = new Schema<IPriceConfidenceBucket>({
+    cropId: {
+        type: Schema.Types.ObjectId,
+        ref: 'Crop',
+        required: true,
+    },
+    marketId: {
+        type: Schema.Types.ObjectId,
+        ref: 'Market',
+        required: true,
+    },
+    hour: {
+        type: Date,
+        required: true,
+    },
+    count: {
+        type: Number,
+        default: 0,
+    },
+    sum: {
+        type: Number,
+        default: 0,
+    },
+    sumSq: {
+        type: Number,
+        default: 0,
+    },
+    reliabilitySum: {
+        type: Number,
+        default: 0,
+    },
+    weightedSum: {
+        type: Number,
+        default: 0,
+    },
+});
+
+PriceConfidenceBucketSchema.index({ cropId: 1, marketId: 1, hour: 1 }, { unique: true });
+PriceConfidenceBucketSchema.index(
+    { hour: 1 },
+    { expireAfterSeconds: CONFIDENCE_RETENTION_HOURS * 60 * 60 }
+);
+
+export default mongoose.model<IPriceConfidenceBucket>(
+    'PriceConfidenceBucket',
+    PriceConfidenceBucketSchema
+);
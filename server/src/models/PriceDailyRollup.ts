@@ -0,0 +1,51 @@
+import mongoose, { Schema, Document, Types } from 'mongoose';
+
+// Per-day aggregate of approved prices for a crop × market.
+// Maintained incrementally by rollupService; rebuild with `npm run rebuild rollups`.
+export interface IPriceDailyRollup extends Document {
+    cropId: Types.ObjectId;
+    marketId: Types.ObjectId;
+    day: string; // YYYY-MM-DD (UTC)
+    count: number;
+    sum: number;
+    sumSq: number;
+    min: number;
+    max: number;
+}
+
+const PriceDailyRollupSchema = new Schema<IPriceDailyRollup>({
+    cropId: {
+        type: Schema.Types.ObjectId,
+        ref: 'Crop',
+        required: true,
+    },
+    marketId: {
+        type: Schema.Types.ObjectId,
+        ref: 'Market',
+        required: true,
+    },
+    day: {
+        type: String,
+        required: true,
+    },
+    count: {
+        type: Number,
+        default: 0,
+    },
+    sum: {
+        type: Number,
+        default: 0,
+    },
+    sumSq: {
+        type: Number,
+        default: 0,
+    },
+    min: Number,
+    max: Number,
+});
+
+PriceDailyRollupSchema.index({ cropId: 1, marketId: 1, day: 1 }, { unique: true });
+PriceDailyRollupSchema.index({ cropId: 1, day: 1 });
+PriceDailyRollupSchema.index({ day: 1 });
+
+export default mongoose.model<IPriceDailyRollup>('PriceDailyRollup', PriceDailyRollupSchema);
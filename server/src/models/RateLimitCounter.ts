@@ -0,0 +1,28 @@
+import mongoose, { Schema, Document } from 'mongoose';
+
+// Fixed-window request counter shared by every API process.
+// _id is "<limiter>:<client key>:<window start ms>"; counters expire with their window.
+export interface IRateLimitCounter extends Omit<Document, '_id'> {
+    _id: string;
+    hits: number;
+    expiresAt: Date;
+}
+
+const RateLimitCounterSchema = new Schema<IRateLimitCounter>({
+    _id: {
+        type: String,
+        required: true,
+    },
+    hits: {
+        type: Number,
+        default: 0,
+    },
+    expiresAt: {
+        type: Date,
+        required: true,
+    },
+});
+
+RateLimitCounterSchema.index({ expiresAt: 1 }, { expireAfterSeconds: 0 });
+
+export default mongoose.model<IRateLimitCounter>('RateLimitCounter', RateLimitCounterSchema);
@@ -54,5 +54,7 @@ const SourceSchema = new Schema<ISource>(
 
 SourceSchema.index({ phoneNumber: 1 });
 SourceSchema.index({ role: 1, status: 1 });
+// Incremental reloads of the sources cache
+SourceSchema.index({ updatedAt: 1 });
 
 export default mongoose.model<ISource>('Source', SourceSchema);
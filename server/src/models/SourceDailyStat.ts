@@ -0,0 +1,38 @@
+import mongoose, { Schema, Document, Types } from 'mongoose';
+
+// Days older than this expire; the reliability window must fit inside it
+export const SOURCE_STAT_RETENTION_DAYS = 31;
+
+// Per-source daily submission counters behind the 30-day approval rate.
+// Maintained with $inc by sourceStatsService; rebuild with `npm run rebuild sources`.
+export interface ISourceDailyStat extends Document {
+    sourceId: Types.ObjectId;
+    day: Date; // UTC midnight of the prices' date
+    total: number;
+    approved: number;
+}
+
+const SourceDailyStatSchema = new Schema<ISourceDailyStat>({
+    sourceId: {
+        type: Schema.Types.ObjectId,
+        ref: 'Source',
+        required: true,
+    },
+    day: {
+        type: Date,
+        required: true,
+    },
+    total: {
+        type: Number,
+        default: 0,
+    },
+    approved: {
+        type: Number,
+        default: 0,
+    },
+});
+
+SourceDailyStatSchema.index({ sourceId: 1, day: 1 }, { unique: true });
+SourceDailyStatSchema.index({ day: 1 }, { expireAfterSeconds: SOURCE_STAT_RETENTION_DAYS * 24 * 60 * 60 });
+
+export default mongoose.model<ISourceDailyStat>('SourceDailyStat', SourceDailyStatSchema);
@@ -9,6 +9,8 @@ export interface IUser extends Document {
     role: 'Farmer' | 'Admin' | 'Buyer';
     language: 'en' | 'sw';
     active: boolean;
+    // Bumped to revoke every token issued before the bump
+    tokenVersion: number;
     createdAt: Date;
     updatedAt: Date;
     comparePassword(candidatePassword: string): Promise<boolean>;
@@ -52,6 +54,10 @@ const UserSchema = new Schema<IUser>(
             type: Boolean,
             default: true,
         },
+        tokenVersion: {
+            type: Number,
+            default: 0,
+        },
     },
     { timestamps: true }
 );
@@ -71,5 +77,6 @@ UserSchema.methods.comparePassword = async function (
 
 UserSchema.index({ email: 1 });
 UserSchema.index({ role: 1 });
+UserSchema.index({ phoneNumber: 1 });
 
 export default mongoose.model<IUser>('User', UserSchema);
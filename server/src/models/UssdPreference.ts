@@ -0,0 +1,27 @@
+import mongoose, { Schema, Document } from 'mongoose';
+
+// Per-phone USSD settings. Kept in the database rather than in the worker
+// that served the menu, since the next request may land on any worker.
+export interface IUssdPreference extends Omit<Document, '_id'> {
+    _id: string; // phone number in +254 form
+    language: 'en' | 'sw';
+    updatedAt: Date;
+}
+
+const UssdPreferenceSchema = new Schema<IUssdPreference>({
+    _id: {
+        type: String,
+        required: true,
+    },
+    language: {
+        type: String,
+        enum: ['en', 'sw'],
+        default: 'en',
+    },
+    updatedAt: {
+        type: Date,
+        default: Date.now,
+    },
+});
+
+export default mongoose.model<IUssdPreference>('UssdPreference', UssdPreferenceSchema);
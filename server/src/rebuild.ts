@@ -0,0 +1,49 @@
+import { connectDB } from './config/db';
+import { rebuildLatestPrices, loadLatestPrices } from './services/latestPriceService';
+import { rebuildRollups } from './services/rollupService';
+import { rebuildSourceStats } from './services/sourceStatsService';
+import { bumpDataVersion } from './services/dataVersion';
+import { rebuildConfidenceBuckets, recomputeConfidenceScores } from './services/confidenceService';
+import { normalizeAlertPhones } from './services/alertService';
+
+// Rebuild derived collections from the raw price history, and backfill data
+// written before a format change ('alerts': phone numbers to +254 form).
+// Usage: npm run rebuild [-- <target> ...]   (no targets = everything)
+const targets: Record<string, () => Promise<string>> = {
+    latest: async () => `${await rebuildLatestPrices()} latest prices`,
+    rollups: async () => `${await rebuildRollups()} daily rollups`,
+    confidence: async () => `${await rebuildConfidenceBuckets()} confidence buckets`,
+    sources: async () => `${await rebuildSourceStats()} source daily stats`,
+    scores: async () => {
+        await loadLatestPrices();
+        return `${await recomputeConfidenceScores()} confidence scores`;
+    },
+    alerts: async () => `${await normalizeAlertPhones()} alert phone numbers`,
+};
+
+const rebuild = async () => {
+    try {
+        await connectDB();
+
+        const requested = process.argv.slice(2);
+        const unknown = requested.filter((name) => !targets[name]);
+        if (unknown.length > 0) {
+            console.error(`❌ Unknown rebuild target(s): ${unknown.join(', ')}`);
+            console.error(`   Available: ${Object.keys(targets).join(', ')}`);
+            process.exit(1);
+        }
+
+        for (const name of requested.length > 0 ? requested : Object.keys(targets)) {
+            console.log(`🔄 Rebuilding ${name}...`);
+            console.log(`✅ Rebuilt ${await targets[name]()}`);
+        }
+
+        await bumpDataVersion('prices', 'alerts');
+        process.exit(0);
+    } catch (error) {
+        console.error('❌ Rebuild failed:', error);
+        process.exit(1);
+    }
+};
+
+rebuild();
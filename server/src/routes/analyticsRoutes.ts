@@ -1,12 +1,17 @@
 import { Router } from 'express';
 import { getOverviewStats, getPriceTrends, getMarketComparison } from '../controllers/analyticsController';
 import { protect } from '../middleware/auth';
+import { cacheable } from '../middleware/cache';
 
 const router = Router();
 
 // Public routes (no auth — for farmer dashboard)
-router.get('/public/trends', getPriceTrends);
-router.get('/public/compare', getMarketComparison);
+router.get(
+    '/public/trends',
+    cacheable(['prices', 'reference'], { sMaxAge: 60, staleWhileRevalidate: 600, daily: true }),
+    getPriceTrends
+);
+router.get('/public/compare', cacheable(['prices', 'reference']), getMarketComparison);
 
 // Protected routes (require auth)
 router.get('/overview', protect, getOverviewStats);
@@ -1,5 +1,5 @@
 import { Router } from 'express';
-import { register, login, getMe } from '../controllers/authController';
+import { register, login, getMe, logoutAll } from '../controllers/authController';
 import { protect } from '../middleware/auth';
 import { authLimiter } from '../middleware/rateLimiter';
 import { validateRequired } from '../middleware/validate';
@@ -21,5 +21,6 @@ router.post(
 );
 
 router.get('/me', protect, getMe);
+router.post('/logout-all', protect, logoutAll);
 
 export default router;
@@ -1,11 +1,12 @@
 import { Router } from 'express';
 import { getCrops, getCrop, createCrop, updateCrop, deleteCrop } from '../controllers/cropController';
 import { protect, authorize } from '../middleware/auth';
+import { cacheable, REFERENCE_CACHE } from '../middleware/cache';
 
 const router = Router();
 
-router.get('/', getCrops);
-router.get('/:id', getCrop);
+router.get('/', cacheable(['reference'], REFERENCE_CACHE), getCrops);
+router.get('/:id', cacheable(['reference'], REFERENCE_CACHE), getCrop);
 router.post('/', protect, authorize('Admin'), createCrop);
 router.put('/:id', protect, authorize('Admin'), updateCrop);
 router.delete('/:id', protect, authorize('Admin'), deleteCrop);
@@ -1,11 +1,12 @@
 import { Router } from 'express';
 import { getMarkets, getMarket, createMarket, updateMarket, deleteMarket } from '../controllers/marketController';
 import { protect, authorize } from '../middleware/auth';
+import { cacheable, REFERENCE_CACHE } from '../middleware/cache';
 
 const router = Router();
 
-router.get('/', getMarkets);
-router.get('/:id', getMarket);
+router.get('/', cacheable(['reference'], REFERENCE_CACHE), getMarkets);
+router.get('/:id', cacheable(['reference'], REFERENCE_CACHE), getMarket);
 router.post('/', protect, authorize('Admin'), createMarket);
 router.put('/:id', protect, authorize('Admin'), updateMarket);
 router.delete('/:id', protect, authorize('Admin'), deleteMarket);
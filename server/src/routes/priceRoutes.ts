@@ -1,21 +1,28 @@
 import { Router } from 'express';
 import {
     getPrices,
+    exportPrices,
     getLatestPrice,
     createPrice,
+    bulkCreatePrices,
+    bulkModeratePrices,
     approvePrice,
     rejectPrice,
     getPriceHistory,
 } from '../controllers/priceController';
 import { protect, authorize } from '../middleware/auth';
+import { cacheable } from '../middleware/cache';
 
 const router = Router();
 
-router.get('/', getPrices);
-router.get('/market', getPrices); // Public alias for price listing (TestSprite compatibility)
+router.get('/', cacheable(['prices', 'reference', 'sources']), getPrices);
+router.get('/market', cacheable(['prices', 'reference', 'sources']), getPrices); // Public alias for price listing (TestSprite compatibility)
+router.get('/export', exportPrices); // Public like the listing; farmers' dashboard is unauthenticated
 router.get('/latest/:cropId/:marketId', getLatestPrice);
 router.get('/history/:cropId/:marketId', getPriceHistory);
 router.post('/', createPrice);
+router.post('/bulk', protect, bulkCreatePrices);
+router.patch('/bulk', protect, authorize('Admin'), bulkModeratePrices);
 router.patch('/:id/approve', protect, authorize('Admin'), approvePrice);
 router.patch('/:id/reject', protect, authorize('Admin'), rejectPrice);
 
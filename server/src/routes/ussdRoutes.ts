@@ -1,9 +1,9 @@
 import { Router } from 'express';
 import { handleUSSD } from '../controllers/ussdController';
-import { ussdLimiter } from '../middleware/rateLimiter';
+import { ussdIpLimiter, ussdLimiter } from '../middleware/rateLimiter';
 
 const router = Router();
 
-router.post('/', ussdLimiter, handleUSSD);
+router.post('/', ussdIpLimiter, ussdLimiter, handleUSSD);
 
 export default router;
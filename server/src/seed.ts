@@ -6,6 +6,11 @@ import Market from './models/Market';
 import Price from './models/Price';
 import Source from './models/Source';
 import User from './models/User';
+import { rebuildLatestPrices } from './services/latestPriceService';
+import { rebuildRollups } from './services/rollupService';
+import { rebuildSourceStats } from './services/sourceStatsService';
+import { bumpDataVersion } from './services/dataVersion';
+import { rebuildConfidenceBuckets, recomputeConfidenceScores } from './services/confidenceService';
 
 const crops = [
     { name: 'Maize', nameSwahili: 'Mahindi', unit: '90kg bag', category: 'cereals' },
@@ -103,6 +108,18 @@ const seed = async () => {
         await Price.insertMany(priceData);
         console.log(`💰 Seeded ${priceData.length} price entries`);
 
+        // Rebuild derived price tables from the seeded history
+        const latestCount = await rebuildLatestPrices();
+        console.log(`📌 Rebuilt ${latestCount} latest prices`);
+        const rollupCount = await rebuildRollups();
+        console.log(`📈 Rebuilt ${rollupCount} daily rollups`);
+        const bucketCount = await rebuildConfidenceBuckets();
+        console.log(`🎯 Rebuilt ${bucketCount} confidence buckets`);
+        const statCount = await rebuildSourceStats();
+        console.log(`👤 Rebuilt ${statCount} source daily stats`);
+        const scoreCount = await recomputeConfidenceScores();
+        console.log(`🎯 Scored ${scoreCount} latest prices`);
+
         // Seed admin user
         await User.create({
             name: 'SokoPrice Admin',
@@ -127,6 +144,9 @@ const seed = async () => {
         console.log(`   Admin: ${env.ADMIN_EMAIL} / ${env.ADMIN_PASSWORD}`);
         console.log('   Buyer: buyer@sokoprice.co.ke / Buyer@123456');
 
+        // Invalidate cached public responses from before the reseed
+        await bumpDataVersion('reference', 'sources', 'prices');
+
         process.exit(0);
     } catch (error) {
         console.error('❌ Seed failed:', error);
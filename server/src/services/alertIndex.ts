@@ -0,0 +1,143 @@
+import { Types } from 'mongoose';
+import Alert from '../models/Alert';
+import { bumpDataVersion } from './dataVersion';
+
+// In-memory threshold index of active alerts. Per crop × market it keeps two
+// arrays sorted by targetPrice, so a new price finds its triggered alerts with
+// one binary search: O(log n + k).
+//   above: triggered when price >= targetPrice → prefix up to upperBound(price)
+//   below: triggered when price <= targetPrice → suffix from lowerBound(price)
+
+export interface IndexedAlert {
+    _id: Types.ObjectId;
+    phoneNumber: string;
+    cropId: Types.ObjectId;
+    marketId: Types.ObjectId;
+    targetPrice: number;
+    direction: 'above' | 'below';
+    lastTriggered?: Date;
+}
+
+interface PairIndex {
+    above: IndexedAlert[];
+    below: IndexedAlert[];
+}
+
+let pairs: Map<string, PairIndex> = new Map();
+let byId: Map<string, IndexedAlert> = new Map();
+
+const keyOf = (cropId: any, marketId: any): string => `${cropId}:${marketId}`;
+
+// First position whose targetPrice is > price
+const upperBound = (alerts: IndexedAlert[], price: number): number => {
+    let lo = 0;
+    let hi = alerts.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (alerts[mid].targetPrice <= price) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+};
+
+// First position whose targetPrice is >= price
+const lowerBound = (alerts: IndexedAlert[], price: number): number => {
+    let lo = 0;
+    let hi = alerts.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (alerts[mid].targetPrice < price) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+};
+
+const toIndexed = (doc: any): IndexedAlert => ({
+    _id: doc._id,
+    phoneNumber: doc.phoneNumber,
+    cropId: doc.cropId?._id || doc.cropId,
+    marketId: doc.marketId?._id || doc.marketId,
+    targetPrice: doc.targetPrice,
+    direction: doc.direction === 'below' ? 'below' : 'above',
+    lastTriggered: doc.lastTriggered,
+});
+
+const insert = (target: Map<string, PairIndex>, ids: Map<string, IndexedAlert>, alert: IndexedAlert): void => {
+    const key = keyOf(alert.cropId, alert.marketId);
+    let pair = target.get(key);
+    if (!pair) {
+        pair = { above: [], below: [] };
+        target.set(key, pair);
+    }
+    const list = pair[alert.direction];
+    list.splice(upperBound(list, alert.targetPrice), 0, alert);
+    ids.set(String(alert._id), alert);
+};
+
+// Replace the whole index from a set of active alerts
+export const buildAlertIndex = (alerts: Iterable<any>): void => {
+    const nextPairs: Map<string, PairIndex> = new Map();
+    const nextIds: Map<string, IndexedAlert> = new Map();
+    for (const alert of alerts) insert(nextPairs, nextIds, toIndexed(alert));
+    pairs = nextPairs;
+    byId = nextIds;
+};
+
+export const loadAlertIndex = async (quiet = false): Promise<void> => {
+    const alerts = await Alert.find({ active: true })
+        .select('phoneNumber cropId marketId targetPrice direction lastTriggered')
+        .lean();
+    buildAlertIndex(alerts);
+    if (!quiet) console.log(`✅ Alert index loaded (${byId.size} alerts, ${pairs.size} pairs)`);
+};
+
+const remove = (id: any): void => {
+    const alert = byId.get(String(id));
+    if (!alert) return;
+    byId.delete(String(id));
+
+    const key = keyOf(alert.cropId, alert.marketId);
+    const pair = pairs.get(key);
+    if (!pair) return;
+    const list = pair[alert.direction];
+    // Equal targets are contiguous; scan that run for the exact alert
+    for (let i = lowerBound(list, alert.targetPrice); i < list.length; i++) {
+        if (list[i] === alert) {
+            list.splice(i, 1);
+            break;
+        }
+        if (list[i].targetPrice !== alert.targetPrice) break;
+    }
+    if (pair.above.length === 0 && pair.below.length === 0) pairs.delete(key);
+};
+
+// Add (or re-add after an update) an alert; inactive alerts are dropped
+// Write-through calls from the alert handlers also bump the shared 'alerts'
+// version so other processes reload their index
+export const indexAlert = (doc: any): void => {
+    remove(doc._id);
+    if (doc.active !== false) insert(pairs, byId, toIndexed(doc));
+    bumpDataVersion('alerts');
+};
+
+export const unindexAlert = (id: any): void => {
+    remove(id);
+    bumpDataVersion('alerts');
+};
+
+// All active alerts on a crop × market whose threshold the price crosses
+export const matchAlerts = (cropId: any, marketId: any, price: number): IndexedAlert[] => {
+    const pair = pairs.get(keyOf(cropId, marketId));
+    if (!pair) return [];
+    return [
+        ...pair.above.slice(0, upperBound(pair.above, price)),
+        ...pair.below.slice(lowerBound(pair.below, price)),
+    ];
+};
+
+export const markAlertsTriggered = (ids: any[], at: Date): void => {
+    for (const id of ids) {
+        const alert = byId.get(String(id));
+        if (alert) alert.lastTriggered = at;
+    }
+};
@@ -1,99 +1,379 @@
 import cron from 'node-cron';
+import { Types } from 'mongoose';
 import Alert from '../models/Alert';
-import Price from '../models/Price';
-import Crop from '../models/Crop';
-import Market from '../models/Market';
-import { sendSMS, sendPriceSMS } from './smsService';
-import { formatPrice } from '../utils/i18n';
-
-// Check all active alerts against latest approved prices
-export const checkAlerts = async (): Promise<void> => {
+import User from '../models/User';
+import { formatPriceSMS } from './smsService';
+import { enqueueBulkSMS, QueuedSMS } from './smsQueue';
+import { getLatestPriceEntry, LatestPriceEntry } from './latestPriceService';
+import { onPriceApproved } from './priceEvents';
+import { isLeader } from './leaderLease';
+import { observeAlertRun } from './metrics';
+import { buildAlertIndex, matchAlerts, markAlertsTriggered } from './alertIndex';
+import { getCropById, getMarketById } from './referenceCache';
+import { dayKey } from './rollupService';
+import { formatPrice, t, Language } from '../utils/i18n';
+import { phoneForms, sanitizePhone } from '../middleware/validate';
+
+const ALERT_COOLDOWN_MS = 60 * 60 * 1000;
+
+export interface AlertRunStats {
+    scanned: number;
+    pairs: number;
+    triggered: number;
+    elapsedMs: number;
+}
+
+interface PendingAlert {
+    _id: Types.ObjectId;
+    phoneNumber: string;
+    cropName: string;
+    marketName: string;
+    unit: string;
+    price: number;
+    priceId: string;
+}
+
+// Alerts on one crop × market whose threshold the pair's latest price crosses
+// and that are outside the cooldown window
+const findTriggered = (alerts: any[], now: number): PendingAlert[] => {
+    const { cropId, marketId } = alerts[0];
+    const latestPrice = getLatestPriceEntry(cropId, marketId);
+    const crop = getCropById(cropId);
+    const market = getMarketById(marketId);
+    if (!latestPrice || !crop || !market) return [];
+
+    const pending: PendingAlert[] = [];
+    for (const alert of alerts) {
+        const shouldTrigger =
+            (alert.direction === 'above' && latestPrice.price >= alert.targetPrice) ||
+            (alert.direction === 'below' && latestPrice.price <= alert.targetPrice);
+
+        // Don't trigger more than once per hour
+        if (
+            shouldTrigger &&
+            (!alert.lastTriggered ||
+                now - new Date(alert.lastTriggered).getTime() > ALERT_COOLDOWN_MS)
+        ) {
+            pending.push({
+                _id: alert._id,
+                phoneNumber: alert.phoneNumber,
+                cropName: crop.name,
+                marketName: market.name,
+                unit: crop.unit,
+                price: latestPrice.price,
+                priceId: latestPrice.priceId,
+            });
+        }
+    }
+    return pending;
+};
+
+// Hand SMS to the outbound queue in one insert, then persist lastTriggered in
+// one bulkWrite. The idempotency key covers an alert × price × cooldown window,
+// so an event-driven check and a sweep racing on the same price send once.
+const dispatchAlerts = async (pending: PendingAlert[]): Promise<number> => {
+    if (pending.length === 0) return 0;
+
+    const triggeredAt = new Date();
+    const window = Math.floor(triggeredAt.getTime() / ALERT_COOLDOWN_MS);
+
+    await enqueueBulkSMS(
+        pending.map((a) => ({
+            to: a.phoneNumber,
+            message: formatPriceSMS(a.cropName, a.marketName, a.price, a.unit, 'Alert'),
+            idempotencyKey: `alert:${a._id}:${a.priceId}:${window}`,
+        }))
+    );
+
+    markAlertsTriggered(pending.map((a) => a._id), triggeredAt);
+    await Alert.bulkWrite(
+        pending.map((a) => ({
+            updateOne: {
+                filter: { _id: a._id },
+                update: { $set: { lastTriggered: triggeredAt } },
+            },
+        })),
+        { ordered: false }
+    );
+    return pending.length;
+};
+
+const alertFields = 'phoneNumber cropId marketId targetPrice direction lastTriggered';
+
+// Check all active alerts against latest approved prices.
+// Alerts are grouped by crop × market so each pair's latest price is resolved
+// once, thresholds are evaluated in memory, SMS are queued in one insert
+// and lastTriggered is persisted with a single bulkWrite. With price events in
+// place this runs as a reconciliation sweep.
+export const checkAlerts = async (): Promise<AlertRunStats> => {
+    const startedAt = Date.now();
+    const stats: AlertRunStats = { scanned: 0, pairs: 0, triggered: 0, elapsedMs: 0 };
+
     try {
-        const activeAlerts = await Alert.find({ active: true })
-            .populate('cropId')
-            .populate('marketId');
-
-        for (const alert of activeAlerts) {
-            const latestPrice = await Price.findOne({
-                cropId: alert.cropId,
-                marketId: alert.marketId,
-                approved: true,
-            }).sort({ date: -1 });
-
-            if (!latestPrice) continue;
-
-            const shouldTrigger =
-                (alert.direction === 'above' && latestPrice.price >= alert.targetPrice) ||
-                (alert.direction === 'below' && latestPrice.price <= alert.targetPrice);
-
-            // Don't trigger more than once per hour
-            if (
-                shouldTrigger &&
-                (!alert.lastTriggered ||
-                    Date.now() - alert.lastTriggered.getTime() > 60 * 60 * 1000)
-            ) {
-                const crop = alert.cropId as any;
-                const market = alert.marketId as any;
-
-                await sendPriceSMS(
-                    alert.phoneNumber,
-                    crop.name,
-                    market.name,
-                    latestPrice.price,
-                    crop.unit,
-                    'Alert'
-                );
-
-                alert.lastTriggered = new Date();
-                await alert.save();
-            }
+        const byPair: Map<string, any[]> = new Map();
+        const cursor = Alert.find({ active: true }).select(alertFields).lean().cursor();
+
+        for await (const alert of cursor) {
+            stats.scanned++;
+            const key = `${alert.cropId}:${alert.marketId}`;
+            const group = byPair.get(key);
+            if (group) group.push(alert);
+            else byPair.set(key, [alert]);
         }
+        stats.pairs = byPair.size;
+
+        // The sweep has read every active alert anyway; use it to reconcile the
+        // threshold index with changes made by other processes.
+        buildAlertIndex([...byPair.values()].flat());
+
+        const now = Date.now();
+        const pending: PendingAlert[] = [];
+        for (const alerts of byPair.values()) pending.push(...findTriggered(alerts, now));
+
+        stats.triggered = await dispatchAlerts(pending);
     } catch (error) {
         console.error('❌ Alert check failed:', error);
     }
+
+    stats.elapsedMs = Date.now() - startedAt;
+    observeAlertRun('sweep', stats.elapsedMs / 1000);
+    console.log(
+        `🔔 Alert check: ${stats.scanned} scanned, ${stats.pairs} pairs, ` +
+        `${stats.triggered} triggered in ${stats.elapsedMs}ms`
+    );
+    return stats;
+};
+
+// Evaluate only the alerts subscribed to a crop × market whose latest price
+// changed, using the threshold index to find the crossed ones in O(log n + k)
+export const checkAlertsForPair = async (entry: LatestPriceEntry): Promise<void> => {
+    const startedAt = Date.now();
+    try {
+        const candidates = matchAlerts(entry.cropId, entry.marketId, entry.price);
+        if (candidates.length === 0) return;
+
+        const triggered = await dispatchAlerts(findTriggered(candidates, Date.now()));
+        if (triggered > 0) {
+            console.log(`🔔 ${triggered} alert(s) triggered by price ${entry.priceId}`);
+        }
+    } catch (error) {
+        console.error('❌ Event alert check failed:', error);
+    } finally {
+        observeAlertRun('pair', (Date.now() - startedAt) / 1000);
+    }
+};
+
+// React to approvals within seconds instead of waiting for the next cron tick.
+// Each process checks its own approvals; approvals seen through the change
+// stream reach every process, so only the scheduler leader checks those.
+export const startAlertListener = (): void => {
+    onPriceApproved((entry, origin) => {
+        if (origin === 'stream' && !isLeader()) return;
+        checkAlertsForPair(entry);
+    });
+};
+
+const SUMMARY_MAX_PAIRS = 5;
+const SUMMARY_BATCH_SIZE = 1000;
+
+export interface SummaryRunStats {
+    subscribers: number;
+    alerts: number;
+    queued: number;
+    elapsedMs: number;
+}
+
+interface Subscriber {
+    phone: string;
+    pairs: { cropId: string; marketId: string }[];
+}
+
+// Render a subscriber's summary from the latest-price mirror and the reference
+// cache, without touching the database. Null when none of their pairs has a price.
+const renderSummary = (subscriber: Subscriber, lang: Language): string | null => {
+    const lines: string[] = [];
+    for (const { cropId, marketId } of subscriber.pairs) {
+        const crop = getCropById(cropId);
+        const market = getMarketById(marketId);
+        const latestPrice = getLatestPriceEntry(cropId, marketId);
+
+        if (crop && market && latestPrice) {
+            const cropName = lang === 'sw' ? crop.nameSwahili || crop.name : crop.name;
+            lines.push(`${cropName}@${market.name}: ${formatPrice(latestPrice.price)}/${crop.unit}`);
+        }
+    }
+    return lines.length > 0 ? `${t('dailySummary', lang)}\n${lines.join('\n')}\n` : null;
 };
 
-// Send daily price summary to subscribed users
-export const sendDailySummaries = async (): Promise<void> => {
+// Resolve languages for a batch of subscribers in one query and queue their
+// summaries in one insert
+const queueSummaries = async (batch: Subscriber[], day: string): Promise<number> => {
+    // Subscriber phones are normalized; users' are stored as typed
+    const users = await User.find({ phoneNumber: { $in: batch.flatMap((s) => phoneForms(s.phone)) } })
+        .select('phoneNumber language')
+        .lean();
+    const languages: Map<string, Language> = new Map();
+    for (const user of users) {
+        if (user.phoneNumber) languages.set(sanitizePhone(user.phoneNumber), user.language);
+    }
+
+    const messages: QueuedSMS[] = [];
+    for (const subscriber of batch) {
+        const message = renderSummary(subscriber, languages.get(subscriber.phone) || 'en');
+        if (message) {
+            messages.push({
+                to: subscriber.phone,
+                message,
+                idempotencyKey: `summary:${subscriber.phone}:${day}`,
+            });
+        }
+    }
+
+    await enqueueBulkSMS(messages);
+    return messages.length;
+};
+
+const addPair = (subscriber: Subscriber, alert: { cropId: Types.ObjectId; marketId: Types.ObjectId }): void => {
+    const cropId = alert.cropId.toString();
+    const marketId = alert.marketId.toString();
+    if (
+        subscriber.pairs.length < SUMMARY_MAX_PAIRS &&
+        !subscriber.pairs.some((p) => p.cropId === cropId && p.marketId === marketId)
+    ) {
+        subscriber.pairs.push({ cropId, marketId });
+    }
+};
+
+// Active alerts stored before phone numbers were normalized (07.., 254..),
+// grouped by normalized phone. Empty once `npm run rebuild -- alerts` has run.
+const loadLegacySubscribers = async (stats: SummaryRunStats): Promise<Map<string, Subscriber>> => {
+    const legacy: Map<string, Subscriber> = new Map();
+    const alerts = await Alert.find({ active: true, phoneNumber: { $not: /^\+/ } })
+        .select('phoneNumber cropId marketId')
+        .lean();
+    for (const alert of alerts) {
+        stats.alerts++;
+        const phone = sanitizePhone(alert.phoneNumber);
+        let subscriber = legacy.get(phone);
+        if (!subscriber) {
+            subscriber = { phone, pairs: [] };
+            legacy.set(phone, subscriber);
+        }
+        addPair(subscriber, alert);
+    }
+    return legacy;
+};
+
+// Send daily price summary to subscribed users.
+// Active alerts are streamed sorted by phone so each subscriber's alerts arrive
+// together; subscribers are queued in batches of SUMMARY_BATCH_SIZE with prices
+// and names read from memory. Summaries with the same pairs and language have
+// identical bodies, which the SMS worker coalesces into multi-recipient calls.
+// Alerts not yet normalized are merged into their subscriber's, so nobody gets
+// two summaries.
+export const sendDailySummaries = async (): Promise<SummaryRunStats> => {
+    const startedAt = Date.now();
+    const stats: SummaryRunStats = { subscribers: 0, alerts: 0, queued: 0, elapsedMs: 0 };
+    const day = dayKey(new Date());
+
     try {
-        const alerts = await Alert.find({ active: true });
-        const phoneNumbers = [...new Set(alerts.map((a) => a.phoneNumber))];
-
-        for (const phone of phoneNumbers) {
-            const userAlerts = alerts.filter((a) => a.phoneNumber === phone);
-            let summary = 'SokoPrice Daily Summary:\n';
-
-            for (const alert of userAlerts.slice(0, 5)) {
-                const crop = await Crop.findById(alert.cropId);
-                const market = await Market.findById(alert.marketId);
-                const latestPrice = await Price.findOne({
-                    cropId: alert.cropId,
-                    marketId: alert.marketId,
-                    approved: true,
-                }).sort({ date: -1 });
-
-                if (crop && market && latestPrice) {
-                    summary += `${crop.name}@${market.name}: ${formatPrice(latestPrice.price)}/${crop.unit}\n`;
-                }
+        const legacy = await loadLegacySubscribers(stats);
+        const cursor = Alert.find({ active: true, phoneNumber: /^\+/ })
+            .sort({ phoneNumber: 1 })
+            .select('phoneNumber cropId marketId')
+            .batchSize(SUMMARY_BATCH_SIZE)
+            .lean()
+            .cursor();
+
+        let batch: Subscriber[] = [];
+        let current: Subscriber | null = null;
+        const add = async (subscriber: Subscriber): Promise<void> => {
+            // Every subscriber already in the batch is complete at this point
+            if (batch.length >= SUMMARY_BATCH_SIZE) {
+                stats.queued += await queueSummaries(batch, day);
+                batch = [];
             }
+            batch.push(subscriber);
+            stats.subscribers++;
+        };
 
-            await sendSMS(phone, summary);
+        for await (const alert of cursor) {
+            stats.alerts++;
+            if (!current || current.phone !== alert.phoneNumber) {
+                current = legacy.get(alert.phoneNumber) || { phone: alert.phoneNumber, pairs: [] };
+                legacy.delete(alert.phoneNumber);
+                await add(current);
+            }
+            addPair(current, alert);
         }
+        // Subscribers whose alerts are all in the old form
+        for (const subscriber of legacy.values()) await add(subscriber);
+
+        if (batch.length > 0) stats.queued += await queueSummaries(batch, day);
     } catch (error) {
         console.error('❌ Daily summary failed:', error);
     }
+
+    stats.elapsedMs = Date.now() - startedAt;
+    observeAlertRun('summary', stats.elapsedMs / 1000);
+    const perSecond = Math.round((stats.subscribers / Math.max(stats.elapsedMs, 1)) * 1000);
+    console.log(
+        `📊 Daily summaries: ${stats.queued} queued for ${stats.subscribers} subscribers ` +
+        `(${stats.alerts} alerts) in ${stats.elapsedMs}ms, ${perSecond} subscribers/s`
+    );
+    return stats;
+};
+
+// Rewrite alert phone numbers stored as typed (07.., 254..) in the +254 form
+// new alerts are stored in. Returns the number of alerts updated.
+export const normalizeAlertPhones = async (): Promise<number> => {
+    let updated = 0;
+    let ops: any[] = [];
+    const flush = async () => {
+        if (ops.length === 0) return;
+        const result = await Alert.bulkWrite(ops, { ordered: false });
+        updated += result.modifiedCount;
+        ops = [];
+    };
+
+    const cursor = Alert.find({ phoneNumber: { $not: /^\+/ } }).select('phoneNumber').lean().cursor();
+    for await (const alert of cursor) {
+        ops.push({
+            updateOne: {
+                filter: { _id: alert._id },
+                update: { $set: { phoneNumber: sanitizePhone(alert.phoneNumber) } },
+            },
+        });
+        if (ops.length >= SUMMARY_BATCH_SIZE) await flush();
+    }
+    await flush();
+    return updated;
 };
 
-// Start scheduled jobs
+// Start scheduled jobs. Every process schedules them, but only the elected
+// scheduler leader runs them, so several workers don't send duplicates.
 export const startAlertScheduler = (): void => {
     // Check alerts every 15 minutes
-    cron.schedule('*/15 * * * *', () => {
+    let alertCheckRunning = false;
+    cron.schedule('*/15 * * * *', async () => {
+        if (!isLeader()) return;
+        // Skip rather than stack runs if the previous check is still going
+        if (alertCheckRunning) {
+            console.warn('⚠️ Previous alert check still running, skipping');
+            return;
+        }
+        alertCheckRunning = true;
         console.log('⏰ Running alert check...');
-        checkAlerts();
+        try {
+            await checkAlerts();
+        } finally {
+            alertCheckRunning = false;
+        }
     });
 
     // Send daily summaries at 7 AM EAT
     cron.schedule('0 7 * * *', () => {
+        if (!isLeader()) return;
         console.log('📊 Sending daily summaries...');
         sendDailySummaries();
     });
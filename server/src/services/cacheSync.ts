@@ -0,0 +1,71 @@
+import { DataScope, DataVersionState, getDataVersion } from './dataVersion';
+import { loadReferenceData, loadSourceData } from './referenceCache';
+import { loadLatestPrices } from './latestPriceService';
+import { loadAlertIndex } from './alertIndex';
+import { isPriceChangeStreamActive } from './priceEvents';
+import { clearUserCache } from './userCache';
+import { untraced } from './queryTrace';
+
+// Keeps the in-process caches (reference data, latest-price mirror, alert
+// index, user cache) in step with writes made by other workers or instances. Each cache is
+// reloaded when its shared data version moves; the latest-price mirror is
+// skipped while the change stream is delivering updates directly. Conditional
+// GETs catch up the scopes they depend on before answering (catchUp), so a
+// response is never tagged with a version newer than the cache it came from.
+
+const SYNC_INTERVAL_MS = 5000;
+
+const reloaders: Record<DataScope, () => Promise<void>> = {
+    reference: () => loadReferenceData(true),
+    sources: () => loadSourceData(),
+    prices: () => (isPriceChangeStreamActive() ? Promise.resolve() : loadLatestPrices(true)),
+    alerts: () => loadAlertIndex(true),
+    // A revocation elsewhere; cached users reload on their next request
+    users: async () => clearUserCache(),
+};
+
+// Version each cache was last loaded at
+const seen: Map<DataScope, number> = new Map();
+const catchingUp: Map<DataScope, Promise<DataVersionState>> = new Map();
+let syncing = false;
+
+const catchUpScope = (scope: DataScope): Promise<DataVersionState> => {
+    let running = catchingUp.get(scope);
+    if (!running) {
+        // Shared by concurrent callers and, like the version refresh, not
+        // counted against the request that happened to trigger it
+        running = untraced(async () => {
+            const state = await getDataVersion(scope);
+            const previous = seen.get(scope);
+            // The first pass only records versions; startup has just loaded everything
+            if (previous !== undefined && previous !== state.version) await reloaders[scope]();
+            // Recorded after a successful reload so a failed one is retried
+            seen.set(scope, state.version);
+            return state;
+        }).finally(() => catchingUp.delete(scope));
+        catchingUp.set(scope, running);
+    }
+    return running;
+};
+
+// Reload whichever of these caches are behind their shared version. Resolves
+// to the versions the caches now reflect (at least), for use as validators.
+export const catchUp = (scopes: DataScope[]): Promise<DataVersionState[]> => Promise.all(scopes.map(catchUpScope));
+
+const sync = async (): Promise<void> => {
+    if (syncing) return;
+    syncing = true;
+    try {
+        for (const scope of Object.keys(reloaders) as DataScope[]) await catchUpScope(scope);
+    } catch (error) {
+        console.error('❌ Cache sync failed:', error);
+    } finally {
+        syncing = false;
+    }
+};
+
+export const startCacheSync = (): void => {
+    sync();
+    setInterval(sync, SYNC_INTERVAL_MS);
+    console.log('✅ Cache sync started');
+};
@@ -1,88 +1,493 @@
-import Price from '../models/Price';
+import Price, { IPrice } from '../models/Price';
 import Source from '../models/Source';
-import { Types } from 'mongoose';
+import PriceConfidenceBucket, { CONFIDENCE_RETENTION_HOURS } from '../models/PriceConfidenceBucket';
+import { ClientSession, Types } from 'mongoose';
+import LatestPrice from '../models/LatestPrice';
+import { cacheSource, getSourceById } from './referenceCache';
+import { getSubmissionCounts } from './sourceStatsService';
+import { bumpDataVersion } from './dataVersion';
+import { getLatestPriceEntry, applyLatestPriceUpdate, LatestPriceUpdate } from './latestPriceService';
 
-interface ConfidenceResult {
+export interface ConfidenceResult {
     score: number;
     weightedAverage: number;
     submissionCount: number;
 }
 
-export const calculateConfidence = async (
-    cropId: string,
-    marketId: string,
-    windowHours: number = 48
-): Promise<ConfidenceResult> => {
-    const since = new Date(Date.now() - windowHours * 60 * 60 * 1000);
+const HOUR_MS = 60 * 60 * 1000;
 
-    const recentPrices = await Price.find({
-        cropId: new Types.ObjectId(cropId),
-        marketId: new Types.ObjectId(marketId),
-        date: { $gte: since },
-    }).populate('sourceId');
+const hourStart = (date: Date): Date => new Date(Math.floor(date.getTime() / HOUR_MS) * HOUR_MS);
+
+// Unknown or zero-reliability sources count as 0.5, as before
+const reliabilityWeight = (sourceId: any): number =>
+    getSourceById(sourceId)?.reliabilityScore || 0.5;
+
+interface BucketTotals {
+    count: number;
+    sum: number;
+    sumSq: number;
+    reliabilitySum: number;
+    weightedSum: number;
+}
+
+const emptyTotals = (): BucketTotals => ({
+    count: 0,
+    sum: 0,
+    sumSq: 0,
+    reliabilitySum: 0,
+    weightedSum: 0,
+});
+
+const addPrice = (totals: BucketTotals, price: number, sourceId: any): void => {
+    const weight = reliabilityWeight(sourceId);
+    totals.count++;
+    totals.sum += price;
+    totals.sumSq += price * price;
+    totals.reliabilitySum += weight;
+    totals.weightedSum += price * weight;
+};
+
+const addTotals = (totals: BucketTotals, bucket: BucketTotals): void => {
+    totals.count += bucket.count;
+    totals.sum += bucket.sum;
+    totals.sumSq += bucket.sumSq;
+    totals.reliabilitySum += bucket.reliabilitySum;
+    totals.weightedSum += bucket.weightedSum;
+};
+
+export const pairKey = (cropId: any, marketId: any): string => `${cropId}:${marketId}`;
+const bucketKey = (cropId: any, marketId: any, hour: Date): string =>
+    `${pairKey(cropId, marketId)}:${hour.getTime()}`;
+
+interface HourBucket {
+    cropId: any;
+    marketId: any;
+    hour: Date;
+    totals: BucketTotals;
+}
+
+const groupIntoBuckets = (
+    prices: Pick<IPrice, 'cropId' | 'marketId' | 'sourceId' | 'price' | 'date'>[]
+): HourBucket[] => {
+    const buckets: Map<string, HourBucket> = new Map();
+    for (const p of prices) {
+        const hour = hourStart(p.date);
+        const key = bucketKey(p.cropId, p.marketId, hour);
+        let bucket = buckets.get(key);
+        if (!bucket) {
+            bucket = { cropId: p.cropId, marketId: p.marketId, hour, totals: emptyTotals() };
+            buckets.set(key, bucket);
+        }
+        addPrice(bucket.totals, p.price, p.sourceId);
+    }
+    return [...buckets.values()];
+};
+
+// $inc folds prices into existing buckets; $set replaces them
+const writeBuckets = async (buckets: HourBucket[], op: '$inc' | '$set'): Promise<void> => {
+    if (buckets.length === 0) return;
+    await PriceConfidenceBucket.bulkWrite(
+        buckets.map((b) => ({
+            updateOne: {
+                filter: { cropId: b.cropId, marketId: b.marketId, hour: b.hour },
+                update: { [op]: b.totals },
+                upsert: true,
+            },
+        })),
+        { ordered: false }
+    );
+};
+
+// Fold a newly submitted price into its hourly confidence bucket. The source's
+// reliability at submission time is its weight until the pair is recomputed.
+export const addToConfidenceBuckets = async (
+    price: IPrice,
+    session: ClientSession | null = null
+): Promise<void> => {
+    const weight = reliabilityWeight(price.sourceId);
+    await PriceConfidenceBucket.updateOne(
+        { cropId: price.cropId, marketId: price.marketId, hour: hourStart(price.date) },
+        {
+            $inc: {
+                count: 1,
+                sum: price.price,
+                sumSq: price.price * price.price,
+                reliabilitySum: weight,
+                weightedSum: price.price * weight,
+            },
+        },
+        { upsert: true }
+    ).session(session);
+};
+
+// Bulk variant for ingestion: one upserting bulkWrite per batch of prices
+export const addManyToConfidenceBuckets = async (
+    prices: Pick<IPrice, 'cropId' | 'marketId' | 'sourceId' | 'price' | 'date'>[]
+): Promise<void> => {
+    await writeBuckets(groupIntoBuckets(prices), '$inc');
+};
+
+// Recompute the hour buckets of removed prices from the prices still in them:
+// one query over the affected (pair, hour) ranges and one bulkWrite
+export const removeManyFromConfidenceBuckets = async (
+    prices: Pick<IPrice, 'cropId' | 'marketId' | 'date'>[],
+    session: ClientSession | null = null
+): Promise<void> => {
+    const affected: Map<string, { cropId: any; marketId: any; hour: Date }> = new Map();
+    for (const p of prices) {
+        const hour = hourStart(p.date);
+        affected.set(bucketKey(p.cropId, p.marketId, hour), { cropId: p.cropId, marketId: p.marketId, hour });
+    }
+    if (affected.size === 0) return;
+
+    const remaining = await Price.find({
+        $or: [...affected.values()].map((a) => ({
+            cropId: a.cropId,
+            marketId: a.marketId,
+            date: { $gte: a.hour, $lt: new Date(a.hour.getTime() + HOUR_MS) },
+        })),
+    })
+        .select('cropId marketId price date sourceId')
+        .lean()
+        .session(session);
+
+    const rebuilt: Map<string, HourBucket> = new Map(
+        groupIntoBuckets(remaining).map((b) => [bucketKey(b.cropId, b.marketId, b.hour), b])
+    );
 
-    if (recentPrices.length === 0) {
+    await PriceConfidenceBucket.bulkWrite(
+        [...affected].map(([key, a]) => {
+            const filter = { cropId: a.cropId, marketId: a.marketId, hour: a.hour };
+            const bucket = rebuilt.get(key);
+            return bucket
+                ? { updateOne: { filter, update: { $set: bucket.totals }, upsert: true } }
+                : { deleteOne: { filter } };
+        }),
+        { ordered: false, session: session ?? undefined }
+    );
+};
+
+export const removeFromConfidenceBuckets = (
+    price: IPrice,
+    session: ClientSession | null = null
+): Promise<void> => removeManyFromConfidenceBuckets([price], session);
+
+// The same count, reliability and variance factors as the original per-price
+// scan, computed from running sums
+const scoreTotals = (totals: BucketTotals): ConfidenceResult => {
+    const n = totals.count;
+    if (n === 0) {
         return { score: 0, weightedAverage: 0, submissionCount: 0 };
     }
 
     // Factor 1: Number of submissions (more = higher confidence)
-    const countScore = Math.min(recentPrices.length / 5, 1) * 0.3;
+    const countScore = Math.min(n / 5, 1) * 0.3;
 
     // Factor 2: Source reliability (average reliability of submitters)
-    let totalReliability = 0;
-    let totalWeight = 0;
-    let weightedPriceSum = 0;
-
-    for (const priceEntry of recentPrices) {
-        const source = priceEntry.sourceId as any;
-        const reliability = source?.reliabilityScore || 0.5;
-        totalReliability += reliability;
-        totalWeight += reliability;
-        weightedPriceSum += priceEntry.price * reliability;
-    }
-
-    const avgReliability = totalReliability / recentPrices.length;
-    const reliabilityScore = avgReliability * 0.4;
+    const reliabilityScore = (totals.reliabilitySum / n) * 0.4;
 
     // Factor 3: Price variance (lower variance = higher confidence)
-    const prices = recentPrices.map((p) => p.price);
-    const mean = prices.reduce((a, b) => a + b, 0) / prices.length;
-    const variance =
-        prices.reduce((sum, p) => sum + Math.pow(p - mean, 2), 0) / prices.length;
+    const mean = totals.sum / n;
+    // E[x²] - mean² can dip just below zero from rounding
+    const variance = Math.max(totals.sumSq / n - mean * mean, 0);
     const coefficientOfVariation = Math.sqrt(variance) / mean;
     const varianceScore = Math.max(1 - coefficientOfVariation, 0) * 0.3;
 
     const score = Math.min(countScore + reliabilityScore + varianceScore, 1);
     const weightedAverage =
-        totalWeight > 0 ? weightedPriceSum / totalWeight : mean;
+        totals.reliabilitySum > 0 ? totals.weightedSum / totals.reliabilitySum : mean;
 
     return {
         score: Math.round(score * 100) / 100,
         weightedAverage: Math.round(weightedAverage),
-        submissionCount: recentPrices.length,
+        submissionCount: n,
     };
 };
 
+export interface Pair {
+    cropId: string;
+    marketId: string;
+}
+
+const windowStart = (windowHours: number): Date =>
+    hourStart(new Date(Date.now() - Math.min(windowHours, CONFIDENCE_RETENTION_HOURS) * HOUR_MS));
+
+// Score a crop × market from the hourly buckets covering the window
+export const calculateConfidence = async (
+    cropId: string,
+    marketId: string,
+    windowHours: number = 48
+): Promise<ConfidenceResult> => {
+    const buckets = await PriceConfidenceBucket.find({
+        cropId: new Types.ObjectId(cropId),
+        marketId: new Types.ObjectId(marketId),
+        hour: { $gte: windowStart(windowHours) },
+    })
+        .select('count sum sumSq reliabilitySum weightedSum')
+        .lean();
+
+    const totals = emptyTotals();
+    for (const bucket of buckets) addTotals(totals, bucket);
+    return scoreTotals(totals);
+};
+
+// Score many pairs from one bucket query (pairs x window hours documents)
+export const calculateConfidenceForPairs = async (
+    pairs: Pair[],
+    windowHours: number = 48
+): Promise<Map<string, ConfidenceResult>> => {
+    const totalsByPair: Map<string, BucketTotals> = new Map(
+        pairs.map((p) => [pairKey(p.cropId, p.marketId), emptyTotals()])
+    );
+    const buckets = await PriceConfidenceBucket.find({
+        cropId: { $in: pairs.map((p) => p.cropId) },
+        marketId: { $in: pairs.map((p) => p.marketId) },
+        hour: { $gte: windowStart(windowHours) },
+    })
+        .select('cropId marketId count sum sumSq reliabilitySum weightedSum')
+        .lean();
+    for (const bucket of buckets) {
+        const totals = totalsByPair.get(pairKey(bucket.cropId, bucket.marketId));
+        if (totals) addTotals(totals, bucket);
+    }
+
+    const results: Map<string, ConfidenceResult> = new Map();
+    for (const [key, totals] of totalsByPair) results.set(key, scoreTotals(totals));
+    return results;
+};
+
+// Backfill the buckets for the retention window from raw prices, weighting each
+// price by its source's current reliability
+export const rebuildConfidenceBuckets = async (): Promise<number> => {
+    // $merge needs the unique (cropId, marketId, hour) index to exist
+    await PriceConfidenceBucket.init();
+    await PriceConfidenceBucket.deleteMany({});
+
+    const since = hourStart(new Date(Date.now() - CONFIDENCE_RETENTION_HOURS * HOUR_MS));
+    await Price.aggregate([
+        { $match: { date: { $gte: since } } },
+        {
+            $lookup: {
+                from: Source.collection.collectionName,
+                localField: 'sourceId',
+                foreignField: '_id',
+                as: 'source',
+            },
+        },
+        {
+            $addFields: {
+                hour: { $subtract: ['$date', { $mod: [{ $toLong: '$date' }, HOUR_MS] }] },
+                reliability: {
+                    $let: {
+                        vars: { r: { $ifNull: [{ $arrayElemAt: ['$source.reliabilityScore', 0] }, 0] } },
+                        in: { $cond: [{ $gt: ['$$r', 0] }, '$$r', 0.5] },
+                    },
+                },
+            },
+        },
+        {
+            $group: {
+                _id: { cropId: '$cropId', marketId: '$marketId', hour: '$hour' },
+                count: { $sum: 1 },
+                sum: { $sum: '$price' },
+                sumSq: { $sum: { $multiply: ['$price', '$price'] } },
+                reliabilitySum: { $sum: '$reliability' },
+                weightedSum: { $sum: { $multiply: ['$price', '$reliability'] } },
+            },
+        },
+        {
+            $project: {
+                _id: 0,
+                cropId: '$_id.cropId',
+                marketId: '$_id.marketId',
+                hour: '$_id.hour',
+                count: 1,
+                sum: 1,
+                sumSq: 1,
+                reliabilitySum: 1,
+                weightedSum: 1,
+            },
+        },
+        {
+            $merge: {
+                into: PriceConfidenceBucket.collection.collectionName,
+                on: ['cropId', 'marketId', 'hour'],
+                whenMatched: 'replace',
+                whenNotMatched: 'insert',
+            },
+        },
+    ]).allowDiskUse(true);
+    return PriceConfidenceBucket.countDocuments();
+};
+
+// Backfill on first start against an existing database
+export const ensureConfidenceBuckets = async (): Promise<void> => {
+    if (await PriceConfidenceBucket.exists({})) return;
+    const since = new Date(Date.now() - CONFIDENCE_RETENTION_HOURS * HOUR_MS);
+    if (!(await Price.exists({ date: { $gte: since } }))) return;
+    const count = await rebuildConfidenceBuckets();
+    console.log(`✅ Confidence buckets rebuilt (${count} buckets)`);
+};
+
+const RECOMPUTE_CHUNK_SIZE = 500;
+
+// Pairs whose window contains prices from a source whose reliability changed
+const dirtyPairs: Set<string> = new Set();
+
+// Re-weight the chunk's buckets with current source reliabilities: one price
+// query and one bucket bulkWrite for the whole chunk
+const reweightBuckets = async (pairs: Pair[], since: Date): Promise<void> => {
+    const wanted = new Set(pairs.map((p) => pairKey(p.cropId, p.marketId)));
+    const prices = await Price.find({
+        cropId: { $in: pairs.map((p) => p.cropId) },
+        marketId: { $in: pairs.map((p) => p.marketId) },
+        date: { $gte: since },
+    })
+        .select('cropId marketId price date sourceId')
+        .lean();
+
+    const inChunk = prices.filter((p) => wanted.has(pairKey(p.cropId, p.marketId)));
+    await writeBuckets(groupIntoBuckets(inChunk), '$set');
+};
+
+// Recompute and persist the confidence of each pair's latest approved price, in
+// chunks: one bucket read, one Price bulkWrite and one LatestPrice bulkWrite
+// per chunk. Defaults to every pair with an approved price.
+export const recomputeConfidenceScores = async (
+    pairs?: Pair[],
+    options: { reweight?: boolean; windowHours?: number } = {}
+): Promise<number> => {
+    const windowHours = options.windowHours ?? 48;
+    const since = windowStart(windowHours);
+    const targets: Pair[] =
+        pairs ??
+        (await LatestPrice.find().select('cropId marketId').lean()).map((l) => ({
+            cropId: String(l.cropId),
+            marketId: String(l.marketId),
+        }));
+
+    let updated = 0;
+    for (let i = 0; i < targets.length; i += RECOMPUTE_CHUNK_SIZE) {
+        const chunk = targets.slice(i, i + RECOMPUTE_CHUNK_SIZE);
+        if (options.reweight) await reweightBuckets(chunk, since);
+
+        const scores = await calculateConfidenceForPairs(chunk, windowHours);
+
+        const priceOps: any[] = [];
+        const latestOps: any[] = [];
+        const updates: LatestPriceUpdate[] = [];
+        for (const pair of chunk) {
+            const latest = getLatestPriceEntry(pair.cropId, pair.marketId);
+            if (!latest) continue;
+
+            const confidence = scores.get(pairKey(pair.cropId, pair.marketId))!;
+            priceOps.push({
+                updateOne: {
+                    filter: { _id: latest.priceId },
+                    update: {
+                        $set: {
+                            confidenceScore: confidence.score,
+                            weightedAverage: confidence.weightedAverage,
+                            submissionCount: confidence.submissionCount,
+                        },
+                    },
+                },
+            });
+            latestOps.push({
+                updateOne: {
+                    filter: { cropId: latest.cropId, marketId: latest.marketId, priceId: latest.priceId },
+                    update: { $set: { confidenceScore: confidence.score } },
+                },
+            });
+            updates.push({
+                cropId: latest.cropId,
+                marketId: latest.marketId,
+                entry: { ...latest, confidenceScore: confidence.score },
+            });
+        }
+
+        if (priceOps.length === 0) continue;
+        await Promise.all([
+            Price.bulkWrite(priceOps, { ordered: false }),
+            LatestPrice.bulkWrite(latestOps, { ordered: false }),
+        ]);
+        updates.forEach(applyLatestPriceUpdate);
+        bumpDataVersion('prices');
+        updated += priceOps.length;
+    }
+    return updated;
+};
+
+// Queue a source's recent crop × market pairs for re-weighting
+const markSourcePairsDirty = async (sourceId: string): Promise<void> => {
+    const since = new Date(Date.now() - CONFIDENCE_RETENTION_HOURS * HOUR_MS);
+    const pairs = await Price.aggregate([
+        { $match: { sourceId: new Types.ObjectId(sourceId), date: { $gte: since } } },
+        { $group: { _id: { cropId: '$cropId', marketId: '$marketId' } } },
+    ]);
+    for (const { _id } of pairs) dirtyPairs.add(pairKey(_id.cropId, _id.marketId));
+};
+
+const CONFIDENCE_JOB_INTERVAL_MS = 60 * 1000;
+let confidenceJobRunning = false;
+
+const flushDirtyPairs = async (): Promise<void> => {
+    if (confidenceJobRunning || dirtyPairs.size === 0) return;
+    confidenceJobRunning = true;
+    const pairs: Pair[] = [...dirtyPairs].map((key) => {
+        const [cropId, marketId] = key.split(':');
+        return { cropId, marketId };
+    });
+    dirtyPairs.clear();
+
+    try {
+        const startedAt = Date.now();
+        const updated = await recomputeConfidenceScores(pairs, { reweight: true });
+        console.log(`🎯 Recomputed confidence for ${updated} pairs in ${Date.now() - startedAt}ms`);
+    } catch (error) {
+        console.error('❌ Confidence recompute failed:', error);
+        for (const p of pairs) dirtyPairs.add(pairKey(p.cropId, p.marketId));
+    } finally {
+        confidenceJobRunning = false;
+    }
+};
+
+// Re-score every pair (covers prices approved before scores were persisted).
+// Run once by the scheduler leader when it is elected.
+export const refreshAllConfidenceScores = (): void => {
+    recomputeConfidenceScores()
+        .then((updated) => console.log(`🎯 Confidence scores refreshed for ${updated} pairs`))
+        .catch((error) => console.error('❌ Confidence recompute failed:', error));
+};
+
+// Background job: re-score pairs affected by reliability changes once a minute.
+// Dirty pairs are tracked by the process that changed the reliability, so this
+// runs in every process.
+export const startConfidenceJob = (): void => {
+    setInterval(flushDirtyPairs, CONFIDENCE_JOB_INTERVAL_MS);
+    console.log('✅ Confidence recompute job started');
+};
+
 export const updateSourceReliability = async (
     sourceId: string
 ): Promise<void> => {
     const source = await Source.findById(sourceId);
     if (!source) return;
 
-    const recentPrices = await Price.find({
-        sourceId: new Types.ObjectId(sourceId),
-        date: { $gte: new Date(Date.now() - 30 * 24 * 60 * 60 * 1000) },
-    });
-
-    const approvedCount = recentPrices.filter((p) => p.approved).length;
-    const total = recentPrices.length;
+    // 30-day approval rate from the daily counters, not a rescan of prices
+    const { approved, total } = await getSubmissionCounts(sourceId, 30);
 
     if (total > 0) {
-        const approvalRate = approvedCount / total;
+        const approvalRate = approved / total;
         // Blend with existing score for smoothing
-        source.reliabilityScore =
-            Math.round((source.reliabilityScore * 0.3 + approvalRate * 0.7) * 100) /
-            100;
+        const score = Math.round((source.reliabilityScore * 0.3 + approvalRate * 0.7) * 100) / 100;
+        // Most moderations leave the rounded score where it was; skip the save
+        // and the shared 'sources' bump that every process would react to
+        if (score === source.reliabilityScore) return;
+
+        source.reliabilityScore = score;
         await source.save();
+        cacheSource(source);
+        await markSourcePairsDirty(sourceId);
     }
 };
@@ -0,0 +1,62 @@
+import DataVersion from '../models/DataVersion';
+import { untraced } from './queryTrace';
+
+// 'reference': crops, markets. 'sources': price sources, whose reliability
+// moves with every moderation. 'prices': price rows and everything derived
+// from them (latest prices, rollups, confidence). 'alerts': price alert
+// subscriptions. 'users': token revocations.
+export type DataScope = 'reference' | 'sources' | 'prices' | 'alerts' | 'users';
+
+export interface DataVersionState {
+    version: number;
+    updatedAt: Date;
+}
+
+// Versions written by other processes are picked up within this interval;
+// conditional GETs in between cost no database round-trip.
+const REFRESH_MS = 2000;
+
+const versions: Map<DataScope, DataVersionState> = new Map();
+let loadedAt = 0;
+let loading: Promise<void> | null = null;
+
+const refresh = async (): Promise<void> => {
+    const docs = await DataVersion.find().lean();
+    for (const doc of docs) {
+        versions.set(doc._id as DataScope, { version: doc.version, updatedAt: new Date(doc.updatedAt) });
+    }
+    loadedAt = Date.now();
+};
+
+export const getDataVersion = async (scope: DataScope): Promise<DataVersionState> => {
+    if (Date.now() - loadedAt > REFRESH_MS) {
+        // Concurrent requests share one refresh; it isn't counted against the
+        // request that happened to trigger it
+        loading = loading || untraced(refresh).finally(() => {
+            loading = null;
+        });
+        await loading;
+    }
+    return versions.get(scope) || { version: 0, updatedAt: new Date(0) };
+};
+
+// Call after a write has committed. Callers normally don't await it: a failed
+// bump is logged and only means clients revalidate a little later.
+export const bumpDataVersion = (...scopes: DataScope[]): Promise<void> => {
+    const now = new Date();
+    return DataVersion.bulkWrite(
+        scopes.map((scope) => ({
+            updateOne: {
+                filter: { _id: scope },
+                update: { $inc: { version: 1 }, $set: { updatedAt: now } },
+                upsert: true,
+            },
+        })),
+        { ordered: false }
+    )
+        .then(() => {
+            // Our own writes are visible to this process immediately
+            loadedAt = 0;
+        })
+        .catch((error) => console.error('❌ Data version bump failed:', error));
+};
@@ -0,0 +1,238 @@
+import { ClientSession } from 'mongoose';
+import Price, { IPrice } from '../models/Price';
+import LatestPrice from '../models/LatestPrice';
+
+export interface LatestPriceEntry {
+    cropId: string;
+    marketId: string;
+    priceId: string;
+    price: number;
+    date: Date;
+    confidenceScore: number;
+    sourceId?: string;
+}
+
+// A change to the materialized table that should reach the in-memory mirror
+// once the surrounding transaction has committed. entry === null means the
+// crop × market pair no longer has an approved price.
+export interface LatestPriceUpdate {
+    cropId: string;
+    marketId: string;
+    entry: LatestPriceEntry | null;
+}
+
+// In-memory mirror of the LatestPrice collection, keyed by "cropId:marketId"
+const latestPrices: Map<string, LatestPriceEntry> = new Map();
+// LatestPrice _id → mirror key; change stream deletes only carry the _id
+const docKeys: Map<string, string> = new Map();
+
+const keyOf = (cropId: any, marketId: any): string => `${cropId}:${marketId}`;
+
+const toEntry = (doc: any): LatestPriceEntry => ({
+    cropId: String(doc.cropId),
+    marketId: String(doc.marketId),
+    priceId: String(doc.priceId),
+    price: doc.price,
+    date: new Date(doc.date),
+    confidenceScore: doc.confidenceScore ?? 0.5,
+    sourceId: doc.sourceId ? String(doc.sourceId) : undefined,
+});
+
+const mirrorDocument = (doc: any): LatestPriceEntry => {
+    const entry = toEntry(doc);
+    const key = keyOf(entry.cropId, entry.marketId);
+    latestPrices.set(key, entry);
+    if (doc._id) docKeys.set(String(doc._id), key);
+    return entry;
+};
+
+type PriceFields = Pick<IPrice, '_id' | 'cropId' | 'marketId' | 'price' | 'date' | 'confidenceScore' | 'sourceId'>;
+
+const fromPrice = (price: PriceFields) => ({
+    cropId: price.cropId,
+    marketId: price.marketId,
+    priceId: price._id,
+    price: price.price,
+    date: price.date,
+    confidenceScore: price.confidenceScore,
+    sourceId: price.sourceId,
+});
+
+// O(1) lookup of the latest approved price for a crop × market
+export const getLatestPriceEntry = (
+    cropId: any,
+    marketId: any
+): LatestPriceEntry | undefined => latestPrices.get(keyOf(cropId, marketId));
+
+export const applyLatestPriceUpdate = (update: LatestPriceUpdate | null | undefined): void => {
+    if (!update) return;
+    const key = keyOf(update.cropId, update.marketId);
+    if (update.entry) latestPrices.set(key, update.entry);
+    else latestPrices.delete(key);
+};
+
+// Mirror a LatestPrice document written by another process (change stream)
+export const cacheLatestPriceDocument = (doc: any): LatestPriceEntry => mirrorDocument(doc);
+
+// Drop the pair of a deleted LatestPrice document (change stream). Returns
+// false when the document isn't known here, so the caller can reload instead.
+export const evictLatestPriceDocument = (docId: string): boolean => {
+    const key = docKeys.get(docId);
+    if (!key) return false;
+    docKeys.delete(docId);
+    latestPrices.delete(key);
+    return true;
+};
+
+// Called inside the approve transaction: for each crop × market, promote the
+// newest of the approved prices if it is not older than the current latest.
+// One read and one bulkWrite however many prices are approved together.
+export const recordApprovedPrices = async (
+    prices: PriceFields[],
+    session: ClientSession | null
+): Promise<LatestPriceUpdate[]> => {
+    const newest: Map<string, PriceFields> = new Map();
+    for (const price of prices) {
+        const key = keyOf(price.cropId, price.marketId);
+        const current = newest.get(key);
+        if (!current || price.date > current.date) newest.set(key, price);
+    }
+    if (newest.size === 0) return [];
+
+    const candidates = [...newest.values()];
+    const existing = await LatestPrice.find({
+        cropId: { $in: candidates.map((p) => p.cropId) },
+        marketId: { $in: candidates.map((p) => p.marketId) },
+    })
+        .select('cropId marketId date')
+        .session(session)
+        .lean();
+    const existingDates: Map<string, Date> = new Map(
+        existing.map((e) => [keyOf(e.cropId, e.marketId), new Date(e.date)])
+    );
+
+    const promoted = candidates.filter((p) => {
+        const date = existingDates.get(keyOf(p.cropId, p.marketId));
+        return !date || date <= p.date;
+    });
+    if (promoted.length === 0) return [];
+
+    await LatestPrice.bulkWrite(
+        promoted.map((p) => ({
+            updateOne: {
+                filter: { cropId: p.cropId, marketId: p.marketId },
+                update: { $set: fromPrice(p) },
+                upsert: true,
+            },
+        })),
+        { ordered: false, session: session ?? undefined }
+    );
+
+    return promoted.map((p) => ({
+        cropId: String(p.cropId),
+        marketId: String(p.marketId),
+        entry: toEntry(fromPrice(p)),
+    }));
+};
+
+export const recordApprovedPrice = async (
+    price: IPrice,
+    session: ClientSession | null
+): Promise<LatestPriceUpdate | null> => (await recordApprovedPrices([price], session))[0] ?? null;
+
+// Called inside the reject transaction (after the delete): pairs whose latest
+// price was removed fall back to their next most recent approved price, or
+// are cleared. Costs one query per affected pair, not per removed price.
+export const recordRemovedPrices = async (
+    prices: Pick<IPrice, '_id'>[],
+    session: ClientSession | null
+): Promise<LatestPriceUpdate[]> => {
+    if (prices.length === 0) return [];
+    const affected = await LatestPrice.find({ priceId: { $in: prices.map((p) => p._id) } })
+        .select('cropId marketId')
+        .session(session)
+        .lean();
+
+    const updates: LatestPriceUpdate[] = [];
+    const ops: any[] = [];
+    for (const latest of affected) {
+        const filter = { cropId: latest.cropId, marketId: latest.marketId };
+        const next = await Price.findOne({ ...filter, approved: true })
+            .sort({ date: -1 })
+            .session(session)
+            .lean();
+
+        if (next) {
+            ops.push({ updateOne: { filter, update: { $set: fromPrice(next as PriceFields) } } });
+        } else {
+            ops.push({ deleteOne: { filter } });
+        }
+        updates.push({
+            cropId: String(latest.cropId),
+            marketId: String(latest.marketId),
+            entry: next ? toEntry(fromPrice(next as PriceFields)) : null,
+        });
+    }
+
+    if (ops.length > 0) {
+        await LatestPrice.bulkWrite(ops, { ordered: false, session: session ?? undefined });
+    }
+    return updates;
+};
+
+export const recordRemovedPrice = async (
+    price: IPrice,
+    session: ClientSession | null
+): Promise<LatestPriceUpdate | null> => (await recordRemovedPrices([price], session))[0] ?? null;
+
+// Recompute the whole table from approved prices (backfill / repair)
+export const rebuildLatestPrices = async (): Promise<number> => {
+    const rows = await Price.aggregate([
+        { $match: { approved: true } },
+        { $sort: { cropId: 1, marketId: 1, date: -1 } },
+        {
+            $group: {
+                _id: { cropId: '$cropId', marketId: '$marketId' },
+                priceId: { $first: '$_id' },
+                price: { $first: '$price' },
+                date: { $first: '$date' },
+                confidenceScore: { $first: '$confidenceScore' },
+                sourceId: { $first: '$sourceId' },
+            },
+        },
+    ]).allowDiskUse(true);
+
+    const docs = rows.map((r) => ({
+        cropId: r._id.cropId,
+        marketId: r._id.marketId,
+        priceId: r.priceId,
+        price: r.price,
+        date: r.date,
+        confidenceScore: r.confidenceScore,
+        sourceId: r.sourceId,
+    }));
+
+    await LatestPrice.deleteMany({});
+    const inserted = docs.length > 0 ? await LatestPrice.insertMany(docs) : [];
+
+    latestPrices.clear();
+    docKeys.clear();
+    for (const doc of inserted) mirrorDocument(doc);
+    return docs.length;
+};
+
+// Load the mirror at startup, backfilling the table on first run
+export const loadLatestPrices = async (quiet = false): Promise<void> => {
+    const docs = await LatestPrice.find().lean();
+
+    if (docs.length === 0 && (await Price.exists({ approved: true }))) {
+        const count = await rebuildLatestPrices();
+        console.log(`✅ Latest price table rebuilt (${count} pairs)`);
+        return;
+    }
+
+    latestPrices.clear();
+    docKeys.clear();
+    for (const doc of docs) mirrorDocument(doc);
+    if (!quiet) console.log(`✅ Latest prices loaded (${docs.length} pairs)`);
+};
@@ -0,0 +1,100 @@
+import os from 'os';
+import { Types } from 'mongoose';
+import Lease from '../models/Lease';
+
+// Scheduler leader election through a Mongo lease. Every API process (cluster
+// worker or separate instance) competes for one lease document; the holder
+// renews it every HEARTBEAT_MS and runs the scheduled jobs. If the leader dies
+// its lease lapses after LEASE_TTL_MS and the next follower heartbeat takes
+// over. Expiry is compared against the database clock ($$NOW), so clock skew
+// between hosts can't produce two leaders.
+
+const LEASE_NAME = 'scheduler';
+const LEASE_TTL_MS = 30 * 1000;
+const HEARTBEAT_MS = 10 * 1000;
+
+export type LeadershipListener = (leader: boolean) => void;
+
+const holderId = `${os.hostname()}:${process.pid}:${new Types.ObjectId()}`;
+const listeners: LeadershipListener[] = [];
+
+let leader = false;
+let renewedAt = 0;
+let timer: NodeJS.Timeout | null = null;
+
+export const isLeader = (): boolean => leader;
+
+export const onLeadershipChange = (listener: LeadershipListener): void => {
+    listeners.push(listener);
+};
+
+const setLeader = (value: boolean): void => {
+    if (value === leader) return;
+    leader = value;
+    console.log(value ? `👑 Scheduler leadership acquired (${holderId})` : `⚠️ Scheduler leadership lost (${holderId})`);
+    for (const listener of listeners) {
+        try {
+            listener(value);
+        } catch (error) {
+            console.error('❌ Leadership listener failed:', error);
+        }
+    }
+};
+
+// Take the lease if it is free or has lapsed, or extend it if we hold it. While
+// another holder's lease is live the filter misses, the upsert collides on _id
+// and we stay a follower.
+const tryAcquire = async (): Promise<boolean> => {
+    try {
+        const lease = await Lease.findOneAndUpdate(
+            {
+                _id: LEASE_NAME,
+                $or: [{ holder: holderId }, { $expr: { $lte: ['$expiresAt', '$$NOW'] } }],
+            },
+            [
+                {
+                    $set: {
+                        holder: holderId,
+                        expiresAt: { $add: ['$$NOW', LEASE_TTL_MS] },
+                        heartbeatAt: '$$NOW',
+                    },
+                },
+            ],
+            { upsert: true, new: true }
+        ).lean();
+        return lease?.holder === holderId;
+    } catch (error: any) {
+        if (error?.code === 11000) return false;
+        throw error;
+    }
+};
+
+const heartbeat = async (): Promise<void> => {
+    try {
+        const held = await tryAcquire();
+        if (held) renewedAt = Date.now();
+        setLeader(held);
+    } catch (error) {
+        console.error('❌ Scheduler lease heartbeat failed:', error);
+        // Can't renew: step down before the lease can lapse and pass to someone else
+        if (leader && Date.now() - renewedAt > LEASE_TTL_MS - HEARTBEAT_MS) setLeader(false);
+    }
+};
+
+export const startLeaderElection = (): void => {
+    if (timer) return;
+    heartbeat();
+    timer = setInterval(heartbeat, HEARTBEAT_MS);
+    console.log('✅ Scheduler leader election started');
+};
+
+// Give the lease up on shutdown so a follower takes over at its next heartbeat
+export const stopLeaderElection = async (): Promise<void> => {
+    if (timer) clearInterval(timer);
+    timer = null;
+    const wasLeader = leader;
+    setLeader(false);
+    if (wasLeader) {
+        await Lease.updateOne({ _id: LEASE_NAME, holder: holderId }, { $set: { expiresAt: new Date(0) } });
+    }
+};
@@ -0,0 +1,483 @@
+import cluster from 'cluster';
+import mongoose, { Schema } from 'mongoose';
+import { performance, monitorEventLoopDelay } from 'perf_hooks';
+import { Request, Response, NextFunction } from 'express';
+import { env } from '../config/env';
+import { traceQuery } from './queryTrace';
+
+// In-process metrics in the Prometheus text format, served at /api/metrics.
+// Series are registered once per label set and the hot paths keep direct
+// references to them, so recording is a few number increments: no label
+// strings are built and nothing is allocated per request or per query.
+// In cluster mode a scrape is answered with the sum over all workers.
+
+const DURATION_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+type MetricType = 'counter' | 'gauge' | 'histogram';
+
+export interface Series {
+    labels: string[];
+    value: number;
+    // Histograms: per-bucket (not cumulative) counts, the last one is +Inf
+    counts?: Float64Array;
+    sum: number;
+}
+
+interface Family {
+    name: string;
+    help: string;
+    type: MetricType;
+    labelNames: string[];
+    // How gauges from several workers combine
+    merge: 'sum' | 'max';
+    series: Map<string, Series>;
+}
+
+const families: Family[] = [];
+
+const family = (
+    type: MetricType,
+    name: string,
+    help: string,
+    labelNames: string[] = [],
+    merge: 'sum' | 'max' = 'sum'
+): Family => {
+    const f: Family = { name, help, type, labelNames, merge, series: new Map() };
+    families.push(f);
+    return f;
+};
+
+// Register (or find) the series for a label set; call once and keep the result
+const series = (f: Family, ...labels: string[]): Series => {
+    const key = labels.join('\u0001');
+    let s = f.series.get(key);
+    if (!s) {
+        s = {
+            labels,
+            value: 0,
+            counts: f.type === 'histogram' ? new Float64Array(DURATION_BUCKETS.length + 1) : undefined,
+            sum: 0,
+        };
+        f.series.set(key, s);
+    }
+    return s;
+};
+
+const observe = (s: Series, seconds: number): void => {
+    let i = 0;
+    while (i < DURATION_BUCKETS.length && seconds > DURATION_BUCKETS[i]) i++;
+    (s.counts as Float64Array)[i]++;
+    s.sum += seconds;
+    s.value++;
+};
+
+// HTTP
+
+const httpRequests = family('counter', 'http_requests_total', 'HTTP requests by route, method and status', [
+    'method',
+    'route',
+    'status',
+]);
+const httpDuration = family('histogram', 'http_request_duration_seconds', 'HTTP request latency', ['method', 'route']);
+
+interface RouteMetrics {
+    method: string;
+    route: string;
+    duration: Series;
+    statuses: Map<number, Series>;
+}
+
+// Keyed by Express's route object, then mount path, then method: all values
+// Express already holds, so lookups allocate nothing
+const routeMetrics: WeakMap<object, Map<string, Map<string, RouteMetrics>>> = new WeakMap();
+const unmatchedMetrics: Map<string, RouteMetrics> = new Map();
+
+const createRouteMetrics = (method: string, route: string): RouteMetrics => ({
+    method,
+    route,
+    duration: series(httpDuration, method, route),
+    statuses: new Map(),
+});
+
+const routeMetricsFor = (req: Request): RouteMetrics => {
+    const route = req.route;
+    if (!route) {
+        let m = unmatchedMetrics.get(req.method);
+        if (!m) {
+            m = createRouteMetrics(req.method, 'unmatched');
+            unmatchedMetrics.set(req.method, m);
+        }
+        return m;
+    }
+
+    let byBase = routeMetrics.get(route);
+    if (!byBase) {
+        byBase = new Map();
+        routeMetrics.set(route, byBase);
+    }
+    let byMethod = byBase.get(req.baseUrl);
+    if (!byMethod) {
+        byMethod = new Map();
+        byBase.set(req.baseUrl, byMethod);
+    }
+    let m = byMethod.get(req.method);
+    if (!m) {
+        m = createRouteMetrics(req.method, `${req.baseUrl}${route.path}`);
+        byMethod.set(req.method, m);
+    }
+    return m;
+};
+
+const REQUEST_START = Symbol('requestStart');
+
+// Shared 'finish' listener (this = res), so no closure is created per request
+function recordRequest(this: Response): void {
+    const elapsed = (performance.now() - (this as any)[REQUEST_START]) / 1000;
+    const m = routeMetricsFor(this.req);
+    observe(m.duration, elapsed);
+    let status = m.statuses.get(this.statusCode);
+    if (!status) {
+        status = series(httpRequests, m.method, m.route, String(this.statusCode));
+        m.statuses.set(this.statusCode, status);
+    }
+    status.value++;
+}
+
+export const httpMetrics = (_req: Request, res: Response, next: NextFunction): void => {
+    (res as any)[REQUEST_START] = performance.now();
+    res.on('finish', recordRequest);
+    next();
+};
+
+// MongoDB, through a Mongoose plugin registered on every schema
+
+const mongoQueries = family('counter', 'mongo_queries_total', 'MongoDB operations by model and operation', [
+    'model',
+    'op',
+]);
+const mongoDuration = family('histogram', 'mongo_query_duration_seconds', 'MongoDB operation latency', [
+    'model',
+    'op',
+]);
+
+interface QueryMetrics {
+    count: Series;
+    duration: Series;
+}
+
+const queryMetrics: Map<string, Map<string, QueryMetrics>> = new Map();
+
+const queryMetricsFor = (model: string, op: string): QueryMetrics => {
+    let byOp = queryMetrics.get(model);
+    if (!byOp) {
+        byOp = new Map();
+        queryMetrics.set(model, byOp);
+    }
+    let m = byOp.get(op);
+    if (!m) {
+        m = { count: series(mongoQueries, model, op), duration: series(mongoDuration, model, op) };
+        byOp.set(op, m);
+    }
+    return m;
+};
+
+const QUERY_START = Symbol('queryStart');
+
+const QUERY_OPS = [
+    'find',
+    'findOne',
+    'countDocuments',
+    'estimatedDocumentCount',
+    'distinct',
+    'updateOne',
+    'updateMany',
+    'replaceOne',
+    'deleteOne',
+    'deleteMany',
+    'findOneAndUpdate',
+    'findOneAndDelete',
+    'findOneAndReplace',
+] as const;
+
+const recordQuery = (target: any, model: string | undefined, op: string): void => {
+    // Subdocument hooks have no model of their own
+    const m = queryMetricsFor(model || 'subdocument', op);
+    m.count.value++;
+    const start = target[QUERY_START];
+    const ms = start !== undefined ? performance.now() - start : undefined;
+    if (ms !== undefined) observe(m.duration, ms / 1000);
+    traceQuery(target, model || 'subdocument', op, ms);
+};
+
+function startQuery(this: any): void {
+    this[QUERY_START] = performance.now();
+}
+
+export const queryMetricsPlugin = (schema: Schema): void => {
+    schema.pre(QUERY_OPS as any, startQuery);
+    schema.post(QUERY_OPS as any, function (this: any) {
+        recordQuery(this, this.model.modelName, this.op);
+    });
+    schema.post(QUERY_OPS as any, function (this: any, error: any, _res: any, next: (error?: any) => void) {
+        recordQuery(this, this.model.modelName, this.op);
+        next(error);
+    });
+
+    schema.pre('aggregate', startQuery);
+    schema.post('aggregate', function (this: any) {
+        recordQuery(this, this.model().modelName, 'aggregate');
+    });
+
+    schema.pre('save', startQuery);
+    schema.post('save', function (this: any) {
+        recordQuery(this, this.constructor.modelName, 'save');
+    });
+
+    // Model-level operations share `this` (the model) between concurrent
+    // calls, so these are counted but not timed
+    schema.post('insertMany', function (this: any) {
+        recordQuery({}, this.modelName, 'insertMany');
+    });
+    schema.post('bulkWrite' as any, function (this: any) {
+        recordQuery({}, this.modelName, 'bulkWrite');
+    });
+};
+
+// Global plugins apply to models compiled after this point, which is why
+// index.ts imports this module before anything that defines a model
+mongoose.plugin(queryMetricsPlugin);
+
+// SMS
+
+const smsMessages = family('counter', 'sms_messages_total', 'Outbound SMS by outcome', ['outcome']);
+const smsSent = series(smsMessages, 'sent');
+const smsRetried = series(smsMessages, 'retry');
+const smsDead = series(smsMessages, 'dead');
+const smsEnqueued = series(family('counter', 'sms_enqueued_total', 'SMS jobs submitted to the queue'));
+const smsCalls = series(
+    family('histogram', 'sms_provider_call_duration_seconds', 'Latency of SMS provider calls')
+);
+
+export const recordSmsOutcome = (outcome: 'sent' | 'retry' | 'dead'): void => {
+    (outcome === 'sent' ? smsSent : outcome === 'retry' ? smsRetried : smsDead).value++;
+};
+export const recordSmsEnqueued = (count: number): void => {
+    smsEnqueued.value += count;
+};
+export const observeSmsCall = (seconds: number): void => observe(smsCalls, seconds);
+
+// Alert runs
+
+const alertRuns = family('histogram', 'alert_run_duration_seconds', 'Alert job durations', ['job']);
+const alertRunSeries = {
+    sweep: series(alertRuns, 'sweep'),
+    pair: series(alertRuns, 'pair'),
+    summary: series(alertRuns, 'summary'),
+};
+
+export const observeAlertRun = (job: keyof typeof alertRunSeries, seconds: number): void =>
+    observe(alertRunSeries[job], seconds);
+
+// Process
+
+const loopDelay = monitorEventLoopDelay({ resolution: 10 });
+loopDelay.enable();
+
+const eventLoopLag = family(
+    'gauge',
+    'nodejs_eventloop_lag_seconds',
+    'Event loop delay since the previous scrape (max across workers)',
+    ['quantile'],
+    'max'
+);
+const lagP50 = series(eventLoopLag, '0.5');
+const lagP99 = series(eventLoopLag, '0.99');
+const lagMax = series(eventLoopLag, '1');
+const memory = family('gauge', 'process_memory_bytes', 'Process memory (summed across workers)', ['type']);
+const rss = series(memory, 'rss');
+const heapUsed = series(memory, 'heapUsed');
+const workers = series(family('gauge', 'api_workers', 'API processes reporting'));
+
+// Gauges are read at scrape time
+const collectGauges = (): void => {
+    lagP50.value = loopDelay.percentile(50) / 1e9;
+    lagP99.value = loopDelay.percentile(99) / 1e9;
+    lagMax.value = loopDelay.max / 1e9;
+    loopDelay.reset();
+    const usage = process.memoryUsage();
+    rss.value = usage.rss;
+    heapUsed.value = usage.heapUsed;
+    workers.value = 1;
+};
+
+// Snapshots and rendering
+
+interface FamilySnapshot {
+    name: string;
+    help: string;
+    type: MetricType;
+    labelNames: string[];
+    merge: 'sum' | 'max';
+    series: { labels: string[]; value: number; counts?: number[]; sum: number }[];
+}
+
+export const snapshotMetrics = (): FamilySnapshot[] => {
+    collectGauges();
+    return families.map((f) => ({
+        name: f.name,
+        help: f.help,
+        type: f.type,
+        labelNames: f.labelNames,
+        merge: f.merge,
+        series: [...f.series.values()].map((s) => ({
+            labels: s.labels,
+            value: s.value,
+            counts: s.counts ? Array.from(s.counts) : undefined,
+            sum: s.sum,
+        })),
+    }));
+};
+
+const mergeSnapshots = (snapshots: FamilySnapshot[][]): FamilySnapshot[] => {
+    const merged: Map<string, FamilySnapshot> = new Map();
+    for (const snapshot of snapshots) {
+        for (const f of snapshot) {
+            let target = merged.get(f.name);
+            if (!target) {
+                target = { ...f, series: [] };
+                merged.set(f.name, target);
+            }
+            for (const s of f.series) {
+                const existing = target.series.find((t) => t.labels.join('\u0001') === s.labels.join('\u0001'));
+                if (!existing) {
+                    target.series.push({ ...s, counts: s.counts ? [...s.counts] : undefined });
+                } else if (f.type === 'gauge' && f.merge === 'max') {
+                    existing.value = Math.max(existing.value, s.value);
+                } else {
+                    existing.value += s.value;
+                    existing.sum += s.sum;
+                    s.counts?.forEach((c, i) => {
+                        (existing.counts as number[])[i] += c;
+                    });
+                }
+            }
+        }
+    }
+    return [...merged.values()];
+};
+
+const escapeLabel = (value: string): string =>
+    value.replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+
+const labelText = (names: string[], values: string[], extra?: string): string => {
+    const pairs = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+    if (extra) pairs.push(extra);
+    return pairs.length > 0 ? `{${pairs.join(',')}}` : '';
+};
+
+export const renderMetrics = (snapshots: FamilySnapshot[][]): string => {
+    const lines: string[] = [];
+    for (const f of mergeSnapshots(snapshots)) {
+        lines.push(`# HELP ${f.name} ${f.help}`, `# TYPE ${f.name} ${f.type}`);
+        for (const s of f.series) {
+            if (f.type !== 'histogram') {
+                lines.push(`${f.name}${labelText(f.labelNames, s.labels)} ${s.value}`);
+                continue;
+            }
+            let cumulative = 0;
+            (s.counts as number[]).forEach((count, i) => {
+                cumulative += count;
+                const le = i < DURATION_BUCKETS.length ? String(DURATION_BUCKETS[i]) : '+Inf';
+                lines.push(`${f.name}_bucket${labelText(f.labelNames, s.labels, `le="${le}"`)} ${cumulative}`);
+            });
+            lines.push(`${f.name}_sum${labelText(f.labelNames, s.labels)} ${s.sum}`);
+            lines.push(`${f.name}_count${labelText(f.labelNames, s.labels)} ${s.value}`);
+        }
+    }
+    return `${lines.join('\n')}\n`;
+};
+
+// Cluster aggregation: the worker that receives the scrape asks the primary,
+// which gathers a snapshot from every worker and hands the set back
+
+const CLUSTER_TIMEOUT_MS = 2000;
+
+interface MetricsMessage {
+    type: 'metrics:collect' | 'metrics:snapshot' | 'metrics:reply' | 'metrics:result';
+    id: string;
+    snapshot?: FamilySnapshot[];
+    snapshots?: FamilySnapshot[][];
+}
+
+const pendingScrapes: Map<string, (snapshots: FamilySnapshot[][]) => void> = new Map();
+let scrapeSeq = 0;
+
+if (cluster.isWorker) {
+    process.on('message', (message: MetricsMessage) => {
+        if (message?.type === 'metrics:snapshot') {
+            process.send?.({ type: 'metrics:reply', id: message.id, snapshot: snapshotMetrics() });
+        } else if (message?.type === 'metrics:result') {
+            pendingScrapes.get(message.id)?.(message.snapshots || []);
+        }
+    });
+}
+
+const collectClusterSnapshots = (): Promise<FamilySnapshot[][]> =>
+    new Promise((resolve) => {
+        const id = `${process.pid}:${++scrapeSeq}`;
+        const timer = setTimeout(() => {
+            // Primary didn't answer: report this worker alone
+            pendingScrapes.delete(id);
+            resolve([snapshotMetrics()]);
+        }, CLUSTER_TIMEOUT_MS);
+        pendingScrapes.set(id, (snapshots) => {
+            clearTimeout(timer);
+            pendingScrapes.delete(id);
+            resolve(snapshots);
+        });
+        process.send?.({ type: 'metrics:collect', id });
+    });
+
+// Primary side: fan a scrape out to every worker and return what comes back in time
+export const serveClusterMetrics = (): void => {
+    const gathering: Map<string, { snapshots: FamilySnapshot[][]; waiting: number; done: () => void }> = new Map();
+
+    cluster.on('message', (worker, message: MetricsMessage) => {
+        if (message?.type === 'metrics:collect') {
+            const live = Object.values(cluster.workers || {}).filter((w) => w && w.isConnected());
+            const state = {
+                snapshots: [] as FamilySnapshot[][],
+                waiting: live.length,
+                done: () => {
+                    clearTimeout(timer);
+                    gathering.delete(message.id);
+                    if (worker.isConnected()) {
+                        worker.send({ type: 'metrics:result', id: message.id, snapshots: state.snapshots });
+                    }
+                },
+            };
+            const timer = setTimeout(state.done, CLUSTER_TIMEOUT_MS / 2);
+            gathering.set(message.id, state);
+            for (const w of live) w?.send({ type: 'metrics:snapshot', id: message.id });
+        } else if (message?.type === 'metrics:reply') {
+            const state = gathering.get(message.id);
+            if (!state || !message.snapshot) return;
+            state.snapshots.push(message.snapshot);
+            if (--state.waiting === 0) state.done();
+        }
+    });
+};
+
+// GET /api/metrics. Set METRICS_TOKEN to require "Authorization: Bearer <token>".
+export const metricsHandler = async (req: Request, res: Response): Promise<void> => {
+    try {
+        if (env.METRICS_TOKEN && req.headers.authorization !== `Bearer ${env.METRICS_TOKEN}`) {
+            res.status(401).json({ message: 'Not authorized' });
+            return;
+        }
+        const snapshots = cluster.isWorker ? await collectClusterSnapshots() : [snapshotMetrics()];
+        res.type('text/plain; version=0.0.4').send(renderMetrics(snapshots));
+    } catch (error: any) {
+        res.status(500).json({ message: error.message });
+    }
+};
@@ -0,0 +1,111 @@
+import { EventEmitter } from 'events';
+import LatestPrice from '../models/LatestPrice';
+import {
+    LatestPriceEntry,
+    cacheLatestPriceDocument,
+    evictLatestPriceDocument,
+    loadLatestPrices,
+} from './latestPriceService';
+
+// Internal bus for "a crop × market has a new latest approved price".
+// Events are emitted locally by approvePrice and, when enabled, re-emitted from
+// a MongoDB change stream on the LatestPrice collection so every process sees
+// approvals made elsewhere.
+
+export type PriceEventOrigin = 'local' | 'stream';
+export type PriceApprovedListener = (entry: LatestPriceEntry, origin: PriceEventOrigin) => void;
+
+const bus = new EventEmitter();
+
+// A local approval is also delivered by the change stream; remember recent
+// price ids so listeners see each approval once.
+const RECENT_LIMIT = 1000;
+const recentPriceIds: Set<string> = new Set();
+
+const markSeen = (priceId: string): boolean => {
+    if (recentPriceIds.has(priceId)) return false;
+    recentPriceIds.add(priceId);
+    if (recentPriceIds.size > RECENT_LIMIT) {
+        const oldest = recentPriceIds.values().next().value;
+        if (oldest !== undefined) recentPriceIds.delete(oldest);
+    }
+    return true;
+};
+
+export const emitPriceApproved = (
+    entry: LatestPriceEntry,
+    origin: PriceEventOrigin = 'local'
+): void => {
+    if (!markSeen(entry.priceId)) return;
+    bus.emit('approved', entry, origin);
+};
+
+export const onPriceApproved = (listener: PriceApprovedListener): void => {
+    bus.on('approved', listener);
+};
+
+let changeStreamActive = false;
+
+export const isPriceChangeStreamActive = (): boolean => changeStreamActive;
+
+// Updates that change the pair's price; confidence rescoring only refreshes the mirror
+const PRICE_FIELDS = ['priceId', 'price'];
+
+const touchesPrice = (change: any): boolean =>
+    Object.keys(change.updateDescription?.updatedFields || {}).some((field) => PRICE_FIELDS.includes(field));
+
+// A delete for a document this process never saw: reload the whole mirror,
+// once per burst (a rebuild elsewhere deletes every document)
+let reloadTimer: NodeJS.Timeout | null = null;
+
+const scheduleReload = (): void => {
+    if (reloadTimer) return;
+    reloadTimer = setTimeout(() => {
+        reloadTimer = null;
+        loadLatestPrices(true).catch((error) => console.error('❌ Latest price reload failed:', error));
+    }, 1000);
+};
+
+// Change streams need a replica set (Atlas); on a standalone server the stream
+// errors out and we stay on local events plus the reconciliation cron.
+export const startPriceChangeStream = (): void => {
+    const updatedField = (field: string) => ({ [`updateDescription.updatedFields.${field}`]: { $exists: true } });
+    const stream = LatestPrice.watch(
+        [
+            {
+                $match: {
+                    $or: [
+                        { operationType: { $in: ['insert', 'replace', 'delete'] } },
+                        {
+                            operationType: 'update',
+                            $or: [...PRICE_FIELDS, 'confidenceScore'].map(updatedField),
+                        },
+                    ],
+                },
+            },
+        ],
+        { fullDocument: 'updateLookup' }
+    );
+    changeStreamActive = true;
+
+    stream.on('change', (change: any) => {
+        if (change.operationType === 'delete') {
+            // The pair's last approved price was rejected elsewhere
+            if (!evictLatestPriceDocument(String(change.documentKey._id))) scheduleReload();
+            return;
+        }
+        const doc = change.fullDocument;
+        if (!doc) return;
+        const entry = cacheLatestPriceDocument(doc);
+        if (change.operationType === 'update' && !touchesPrice(change)) return;
+        emitPriceApproved(entry, 'stream');
+    });
+
+    stream.on('error', (error: any) => {
+        changeStreamActive = false;
+        console.warn('⚠️ Price change stream unavailable:', error.message);
+        stream.close().catch(() => undefined);
+    });
+
+    console.log('✅ Price change stream started');
+};
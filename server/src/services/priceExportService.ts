@@ -0,0 +1,46 @@
+import { Transform } from 'stream';
+import { getCropById, getMarketById } from './referenceCache';
+import { toCsvLine } from '../utils/csv';
+
+// Row formatting for GET /api/prices/export. Lean price documents come in
+// from a Mongo cursor, names are filled from the reference cache, and text
+// goes out; stream.pipeline supplies the backpressure.
+
+export type ExportFormat = 'csv' | 'ndjson';
+
+export const exportFields = 'cropId marketId price date approved confidenceScore';
+
+const CSV_COLUMNS = ['id', 'date', 'crop', 'unit', 'market', 'county', 'price', 'approved', 'confidence'];
+
+const toRow = (doc: any) => {
+    const crop = getCropById(doc.cropId);
+    const market = getMarketById(doc.marketId);
+    return {
+        id: String(doc._id),
+        date: new Date(doc.date).toISOString(),
+        crop: crop?.name ?? null,
+        unit: crop?.unit ?? null,
+        market: market?.name ?? null,
+        county: market?.county ?? null,
+        price: doc.price,
+        approved: doc.approved,
+        confidence: doc.confidenceScore,
+    };
+};
+
+export const createPriceExportStream = (format: ExportFormat): Transform => {
+    const stream = new Transform({
+        writableObjectMode: true,
+        transform(doc, _encoding, callback) {
+            const row = toRow(doc);
+            callback(
+                null,
+                format === 'csv'
+                    ? toCsvLine(CSV_COLUMNS.map((column) => (row as any)[column]))
+                    : `${JSON.stringify(row)}\n`
+            );
+        },
+    });
+    if (format === 'csv') stream.push(toCsvLine(CSV_COLUMNS));
+    return stream;
+};
@@ -0,0 +1,223 @@
+import { Readable } from 'stream';
+import readline from 'readline';
+import mongoose from 'mongoose';
+import Price from '../models/Price';
+import Source from '../models/Source';
+import {
+    getCropById,
+    findCropByName,
+    getMarketById,
+    findMarketByName,
+    getSourceById,
+    findSourceByName,
+} from './referenceCache';
+import { addManyToConfidenceBuckets } from './confidenceService';
+import { recordSubmissions } from './sourceStatsService';
+import { parseCsvLine } from '../utils/csv';
+import { bumpDataVersion } from './dataVersion';
+
+// Streaming bulk ingestion for POST /api/prices/bulk. Lines are parsed and
+// resolved as they arrive and inserted in chunks, so memory stays bounded by
+// the chunk size and the (capped) error report, not by the upload.
+
+export type IngestFormat = 'ndjson' | 'csv';
+
+export interface IngestRowError {
+    row: number;
+    message: string;
+}
+
+export interface IngestReport {
+    received: number;
+    inserted: number;
+    failed: number;
+    errors: IngestRowError[];
+    errorsTruncated: boolean;
+    elapsedMs: number;
+}
+
+const CHUNK_SIZE = 500;
+const MAX_REPORTED_ERRORS = 1000;
+
+interface PendingRow {
+    row: number;
+    doc: {
+        cropId: any;
+        marketId: any;
+        sourceId: any;
+        price: number;
+        date: Date;
+        notes?: string;
+        approved: boolean;
+    };
+}
+
+const resolveCrop = (value: any) =>
+    mongoose.Types.ObjectId.isValid(value) ? getCropById(value) : findCropByName(String(value));
+const resolveMarket = (value: any) =>
+    mongoose.Types.ObjectId.isValid(value) ? getMarketById(value) : findMarketByName(String(value));
+const resolveSource = (value: any) =>
+    mongoose.Types.ObjectId.isValid(value) ? getSourceById(value) : findSourceByName(String(value));
+
+// Validate one record and resolve names to ids; returns an error message on failure
+const toPriceDoc = (record: any, defaultSourceId?: string): PendingRow['doc'] | string => {
+    if (!record || typeof record !== 'object') return 'Row is not an object';
+
+    const cropRef = record.cropId ?? record.crop;
+    const marketRef = record.marketId ?? record.market;
+    const sourceRef = record.sourceId ?? record.source ?? defaultSourceId;
+    if (!cropRef) return 'crop is required';
+    if (!marketRef) return 'market is required';
+    if (!sourceRef) return 'source is required';
+
+    const crop = resolveCrop(cropRef);
+    if (!crop) return `Unknown crop: ${cropRef}`;
+    const market = resolveMarket(marketRef);
+    if (!market) return `Unknown market: ${marketRef}`;
+    const source = resolveSource(sourceRef);
+    if (!source) return `Unknown source: ${sourceRef}`;
+
+    const price = Number(record.price);
+    if (!Number.isFinite(price) || price <= 0) return 'Valid price value is required';
+
+    const date = record.date ? new Date(record.date) : new Date();
+    if (isNaN(date.getTime())) return `Invalid date: ${record.date}`;
+
+    return {
+        cropId: crop._id,
+        marketId: market._id,
+        sourceId: source._id,
+        price,
+        date,
+        notes: record.notes ? String(record.notes) : undefined,
+        approved: false, // Requires admin approval
+    };
+};
+
+// Insert one chunk; rows rejected by the database are reported individually
+const flushChunk = async (
+    pending: PendingRow[],
+    report: IngestReport,
+    addError: (error: IngestRowError) => void
+): Promise<void> => {
+    if (pending.length === 0) return;
+
+    const failedIndexes = new Set<number>();
+    try {
+        await Price.insertMany(pending.map((p) => p.doc), { ordered: false });
+    } catch (error: any) {
+        const writeErrors: any[] = error?.writeErrors;
+        if (!writeErrors) throw error;
+        for (const writeError of writeErrors) {
+            failedIndexes.add(writeError.index);
+            addError({
+                row: pending[writeError.index].row,
+                message: writeError.errmsg || writeError.err?.errmsg || 'Insert failed',
+            });
+        }
+    }
+
+    const inserted = pending.filter((_, i) => !failedIndexes.has(i)).map((p) => p.doc);
+    report.inserted += inserted.length;
+    if (inserted.length === 0) return;
+
+    // Derived state for the whole chunk: one bulkWrite per collection
+    const bySource: Map<string, { count: number; last: Date }> = new Map();
+    for (const doc of inserted) {
+        const key = String(doc.sourceId);
+        const entry = bySource.get(key);
+        if (!entry) bySource.set(key, { count: 1, last: doc.date });
+        else {
+            entry.count++;
+            if (doc.date > entry.last) entry.last = doc.date;
+        }
+    }
+
+    await Promise.all([
+        Source.bulkWrite(
+            [...bySource].map(([sourceId, { count, last }]) => ({
+                updateOne: {
+                    filter: { _id: sourceId },
+                    update: { $inc: { submissionCount: count }, $max: { lastSubmission: last } },
+                },
+            })),
+            { ordered: false }
+        ),
+        addManyToConfidenceBuckets(inserted),
+        recordSubmissions(inserted),
+    ]);
+    bumpDataVersion('prices');
+};
+
+export const ingestPrices = async (
+    input: Readable,
+    format: IngestFormat,
+    defaultSourceId?: string
+): Promise<IngestReport> => {
+    const startedAt = Date.now();
+    const report: IngestReport = {
+        received: 0,
+        inserted: 0,
+        failed: 0,
+        errors: [],
+        errorsTruncated: false,
+        elapsedMs: 0,
+    };
+    const addError = (error: IngestRowError) => {
+        report.failed++;
+        if (report.errors.length < MAX_REPORTED_ERRORS) report.errors.push(error);
+        else report.errorsTruncated = true;
+    };
+
+    const lines = readline.createInterface({ input, crlfDelay: Infinity });
+    let header: string[] | null = null;
+    let lineNumber = 0;
+    let pending: PendingRow[] = [];
+
+    for await (const line of lines) {
+        lineNumber++;
+        if (!line.trim()) continue;
+
+        let record: any;
+        if (format === 'csv') {
+            const fields = parseCsvLine(line);
+            if (!header) {
+                header = fields;
+                continue;
+            }
+            record = {};
+            header.forEach((name, i) => {
+                if (fields[i] !== undefined && fields[i] !== '') record[name] = fields[i];
+            });
+        } else {
+            try {
+                record = JSON.parse(line);
+            } catch {
+                report.received++;
+                addError({ row: lineNumber, message: 'Invalid JSON' });
+                continue;
+            }
+        }
+
+        report.received++;
+        const doc = toPriceDoc(record, defaultSourceId);
+        if (typeof doc === 'string') {
+            addError({ row: lineNumber, message: doc });
+            continue;
+        }
+
+        pending.push({ row: lineNumber, doc });
+        if (pending.length >= CHUNK_SIZE) {
+            await flushChunk(pending, report, addError);
+            pending = [];
+        }
+    }
+    await flushChunk(pending, report, addError);
+
+    report.elapsedMs = Date.now() - startedAt;
+    console.log(
+        `📥 Bulk ingest: ${report.inserted}/${report.received} rows inserted, ` +
+        `${report.failed} failed in ${report.elapsedMs}ms`
+    );
+    return report;
+};
@@ -0,0 +1,178 @@
+import { Types } from 'mongoose';
+import Price from '../models/Price';
+import { withTransaction } from '../config/db';
+import {
+    calculateConfidenceForPairs,
+    pairKey,
+    removeManyFromConfidenceBuckets,
+    updateSourceReliability,
+} from './confidenceService';
+import {
+    recordApprovedPrices,
+    recordRemovedPrices,
+    applyLatestPriceUpdate,
+    LatestPriceUpdate,
+} from './latestPriceService';
+import { addManyToRollups, removeManyFromRollups } from './rollupService';
+import { recordApprovals, recordRemovals } from './sourceStatsService';
+import { emitPriceApproved } from './priceEvents';
+import { bumpDataVersion } from './dataVersion';
+
+// Bulk approve/reject for PATCH /api/prices/bulk. Ids are processed in chunks,
+// each in one transaction with bulk writes for prices and every derived table;
+// source reliability is refreshed once per affected source at the end.
+
+export type ModerationAction = 'approve' | 'reject';
+
+export interface ModerationReport {
+    action: ModerationAction;
+    requested: number;
+    processed: number;
+    // Already approved (approve only)
+    skipped: number;
+    notFound: string[];
+    elapsedMs: number;
+}
+
+interface ChunkResult {
+    foundIds: string[];
+    processed: number;
+    sourceIds: string[];
+    updates: LatestPriceUpdate[];
+}
+
+const CHUNK_SIZE = 1000;
+const priceFields = 'cropId marketId sourceId price date approved confidenceScore';
+
+const approveChunk = (ids: Types.ObjectId[]): Promise<ChunkResult> =>
+    withTransaction(async (session) => {
+        const found = await Price.find({ _id: { $in: ids } }).select(priceFields).session(session).lean();
+        let pending = found.filter((p) => !p.approved);
+        const result: ChunkResult = {
+            foundIds: found.map((p) => String(p._id)),
+            processed: 0,
+            sourceIds: [],
+            updates: [],
+        };
+        if (pending.length === 0) return result;
+
+        // One bucket query scores every pair in the chunk
+        const scores = await calculateConfidenceForPairs(
+            [...new Map(pending.map((p) => [pairKey(p.cropId, p.marketId), p])).values()].map((p) => ({
+                cropId: String(p.cropId),
+                marketId: String(p.marketId),
+            }))
+        );
+
+        // The claim token lets us read back exactly the rows this call flipped
+        // if a concurrent approval (no transaction on a standalone server) won
+        // some of them; only those may feed the derived tables
+        const claimToken = new Types.ObjectId().toString();
+        const ops = pending.map((p) => {
+            const confidence = scores.get(pairKey(p.cropId, p.marketId))!;
+            p.approved = true;
+            p.confidenceScore = confidence.score;
+            return {
+                updateOne: {
+                    filter: { _id: p._id, approved: false },
+                    update: {
+                        $set: {
+                            approved: true,
+                            confidenceScore: confidence.score,
+                            weightedAverage: confidence.weightedAverage,
+                            submissionCount: confidence.submissionCount,
+                            claimToken,
+                        },
+                    },
+                },
+            };
+        });
+        const write = await Price.bulkWrite(ops, { ordered: false, session: session ?? undefined });
+
+        const pendingIds = pending.map((p) => p._id);
+        if (write.modifiedCount < pending.length) {
+            const won = await Price.find({ _id: { $in: pendingIds }, claimToken })
+                .select('_id')
+                .session(session)
+                .lean();
+            const wonIds = new Set(won.map((p) => String(p._id)));
+            pending = pending.filter((p) => wonIds.has(String(p._id)));
+        }
+        await Price.updateMany({ _id: { $in: pendingIds }, claimToken }, { $unset: { claimToken: 1 } })
+            .session(session);
+
+        result.processed = pending.length;
+        result.sourceIds = pending.map((p) => String(p.sourceId));
+        if (pending.length === 0) return result;
+
+        result.updates = await recordApprovedPrices(pending, session);
+        await addManyToRollups(pending, session);
+        await recordApprovals(pending, session);
+        return result;
+    });
+
+const rejectChunk = (ids: Types.ObjectId[]): Promise<ChunkResult> =>
+    withTransaction(async (session) => {
+        const found = await Price.find({ _id: { $in: ids } }).select(priceFields).session(session).lean();
+        const result: ChunkResult = {
+            foundIds: found.map((p) => String(p._id)),
+            processed: found.length,
+            sourceIds: found.map((p) => String(p.sourceId)),
+            updates: [],
+        };
+        if (found.length === 0) return result;
+
+        await Price.deleteMany({ _id: { $in: found.map((p) => p._id) } }).session(session);
+        await removeManyFromConfidenceBuckets(found, session);
+        await recordRemovals(found, session);
+
+        const approved = found.filter((p) => p.approved);
+        result.updates = await recordRemovedPrices(approved, session);
+        await removeManyFromRollups(approved, session);
+        return result;
+    });
+
+export const moderatePrices = async (
+    action: ModerationAction,
+    ids: string[]
+): Promise<ModerationReport> => {
+    const startedAt = Date.now();
+    const unique = [...new Set(ids)];
+    const report: ModerationReport = {
+        action,
+        requested: unique.length,
+        processed: 0,
+        skipped: 0,
+        notFound: [],
+        elapsedMs: 0,
+    };
+    const sourceIds: Set<string> = new Set();
+
+    for (let i = 0; i < unique.length; i += CHUNK_SIZE) {
+        const chunk = unique.slice(i, i + CHUNK_SIZE);
+        const objectIds = chunk.map((id) => new Types.ObjectId(id));
+        const result = action === 'approve' ? await approveChunk(objectIds) : await rejectChunk(objectIds);
+
+        // Mirror and events only after the chunk's transaction has committed
+        result.updates.forEach(applyLatestPriceUpdate);
+        if (result.processed > 0) bumpDataVersion('prices');
+        for (const update of result.updates) {
+            if (action === 'approve' && update.entry) emitPriceApproved(update.entry);
+        }
+
+        const found = new Set(result.foundIds);
+        report.notFound.push(...chunk.filter((id) => !found.has(id)));
+        report.processed += result.processed;
+        report.skipped += result.foundIds.length - result.processed;
+        result.sourceIds.forEach((id) => sourceIds.add(id));
+    }
+
+    for (const sourceId of sourceIds) await updateSourceReliability(sourceId);
+
+    report.elapsedMs = Date.now() - startedAt;
+    console.log(
+        `🧹 Bulk ${action}: ${report.processed}/${report.requested} prices, ` +
+        `${sourceIds.size} sources in ${report.elapsedMs}ms`
+    );
+    return report;
+};
@@ -0,0 +1,127 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import { performance } from 'perf_hooks';
+import { Request, Response, NextFunction } from 'express';
+import { env } from '../config/env';
+
+// Request-scoped MongoDB accounting. The trace middleware opens an
+// AsyncLocalStorage context per request; the Mongoose metrics plugin reports
+// every operation into it. Responses carry X-Query-Count and a Server-Timing
+// header (db time, query count, total time), a request that runs the same
+// query shape more than QUERY_REPEAT_WARN times is logged as a likely N+1, and
+// with QUERY_EXPLAIN_MS set, shapes slower than that get their explain()
+// output logged once per process.
+
+interface RequestTrace {
+    startedAt: number;
+    queries: number;
+    queryMs: number;
+    shapes: Map<string, number>;
+}
+
+const storage = new AsyncLocalStorage<RequestTrace>();
+
+// Replace values with '?' and keep keys and operators, so
+// { cropId: x, date: { $gte: d } } and { cropId: y, date: { $gte: e } } match
+const shapeOf = (value: any, depth = 0): any => {
+    if (value === null || typeof value !== 'object' || value._bsontype || value instanceof Date) return '?';
+    if (depth > 4) return '…';
+    if (Array.isArray(value)) return value.length > 0 ? [shapeOf(value[0], depth + 1)] : [];
+    const shape: Record<string, any> = {};
+    for (const key of Object.keys(value)) shape[key] = shapeOf(value[key], depth + 1);
+    return shape;
+};
+
+const describe = (target: any, model: string, op: string): string => {
+    if (op === 'aggregate' && typeof target.pipeline === 'function') {
+        const stages = target.pipeline().map((stage: any) => {
+            const name = Object.keys(stage)[0];
+            return name === '$match' ? `$match:${JSON.stringify(shapeOf(stage.$match))}` : name;
+        });
+        return `${model}.aggregate[${stages.join(',')}]`;
+    }
+    if (typeof target.getFilter === 'function') {
+        return `${model}.${op}(${JSON.stringify(shapeOf(target.getFilter()))})`;
+    }
+    return `${model}.${op}`;
+};
+
+// Shapes already explained by this process
+const explained: Set<string> = new Set();
+
+const explain = async (target: any, model: string, op: string, shape: string, ms: number): Promise<void> => {
+    explained.add(shape);
+    try {
+        let plan: any;
+        if (op === 'aggregate' && typeof target.pipeline === 'function') {
+            plan = await target.model().collection.aggregate(target.pipeline()).explain('executionStats');
+        } else if (typeof target.getFilter === 'function') {
+            // Straight through the driver so the explain isn't traced itself
+            const options = target.getOptions();
+            plan = await target.model.collection
+                .find(target.getFilter(), { sort: options.sort, projection: target.projection?.() })
+                .explain('executionStats');
+        } else {
+            return;
+        }
+        const stats = plan.executionStats || {};
+        console.warn(
+            `🐢 Slow query ${shape} took ${ms.toFixed(1)}ms ` +
+            `(docs examined ${stats.totalDocsExamined ?? '?'}, keys examined ${stats.totalKeysExamined ?? '?'}, ` +
+            `returned ${stats.nReturned ?? '?'})\n${JSON.stringify(plan.queryPlanner?.winningPlan ?? plan, null, 2)}`
+        );
+    } catch (error: any) {
+        console.warn(`⚠️ Could not explain ${shape} (${model}):`, error.message);
+    }
+};
+
+// Run fn outside any request's trace, for shared cache upkeep that merely
+// happens to be triggered by whichever request finds the cache stale
+export const untraced = <T>(fn: () => T): T => storage.exit(fn);
+
+// Called by the Mongoose metrics plugin for every completed operation
+export const traceQuery = (target: any, model: string, op: string, ms: number | undefined): void => {
+    const trace = storage.getStore();
+    const slow = env.QUERY_EXPLAIN_MS > 0 && ms !== undefined && ms >= env.QUERY_EXPLAIN_MS;
+    if (!trace && !slow) return;
+
+    const shape = describe(target, model, op);
+    if (trace) {
+        trace.queries++;
+        trace.queryMs += ms ?? 0;
+        trace.shapes.set(shape, (trace.shapes.get(shape) || 0) + 1);
+    }
+    if (slow && !explained.has(shape)) explain(target, model, op, shape, ms as number);
+};
+
+const headerValues = (trace: RequestTrace): [string, string] => [
+    String(trace.queries),
+    `db;dur=${trace.queryMs.toFixed(1)};desc="${trace.queries} queries", ` +
+    `total;dur=${(performance.now() - trace.startedAt).toFixed(1)}`,
+];
+
+const warnRepeats = (req: Request, trace: RequestTrace): void => {
+    for (const [shape, count] of trace.shapes) {
+        if (count > env.QUERY_REPEAT_WARN) {
+            console.warn(`⚠️ Possible N+1: ${req.method} ${req.originalUrl} ran ${shape} ${count} times`);
+        }
+    }
+};
+
+export const queryTrace = (req: Request, res: Response, next: NextFunction): void => {
+    const trace: RequestTrace = { startedAt: performance.now(), queries: 0, queryMs: 0, shapes: new Map() };
+
+    // Headers are stamped as they go out, so they cover every query made before
+    // the first byte of the response (all of them, for non-streaming handlers)
+    const writeHead = res.writeHead;
+    res.writeHead = function (this: Response, ...args: any[]) {
+        if (!res.headersSent) {
+            const [count, timing] = headerValues(trace);
+            res.setHeader('X-Query-Count', count);
+            res.setHeader('Server-Timing', timing);
+        }
+        return (writeHead as any).apply(this, args);
+    } as any;
+    res.on('finish', () => warnRepeats(req, trace));
+
+    storage.run(trace, next);
+};
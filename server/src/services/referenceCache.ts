@@ -0,0 +1,226 @@
+import { Types } from 'mongoose';
+import Crop from '../models/Crop';
+import Market from '../models/Market';
+import Source from '../models/Source';
+import { bumpDataVersion } from './dataVersion';
+
+// Process-wide cache of the small reference collections (crops, markets, sources).
+// Loaded once at startup and kept current by write-through calls from the CRUD
+// handlers; every write bumps the version so derived caches can detect changes.
+// Sources have their own shared scope: reliability updates on every moderation
+// must not invalidate crop and market responses, and other processes pick them
+// up by reloading only the sources updated since their last load.
+
+export interface CachedCrop {
+    _id: Types.ObjectId;
+    name: string;
+    nameSwahili: string;
+    unit: string;
+    category: string;
+}
+
+export interface CachedMarket {
+    _id: Types.ObjectId;
+    name: string;
+    county: string;
+    region: string;
+    active: boolean;
+}
+
+export interface CachedSource {
+    _id: Types.ObjectId;
+    name: string;
+    phoneNumber: string;
+    role: string;
+    reliabilityScore: number;
+    status: string;
+}
+
+interface RefIndex<T extends { _id: Types.ObjectId; name: string }> {
+    byId: Map<string, T>;
+    byName: Map<string, T>;
+    byLowerName: Map<string, T>;
+}
+
+const createIndex = <T extends { _id: Types.ObjectId; name: string }>(): RefIndex<T> => ({
+    byId: new Map(),
+    byName: new Map(),
+    byLowerName: new Map(),
+});
+
+const crops = createIndex<CachedCrop>();
+const markets = createIndex<CachedMarket>();
+const sources = createIndex<CachedSource>();
+
+let version = 0;
+
+// Latest updatedAt among the cached sources; incremental reloads read from here
+let sourcesUpdatedAt = 0;
+// Writers' clocks and in-flight saves may stamp a source slightly before a
+// newer one already read, so incremental reloads re-read this far back
+const SOURCE_RELOAD_OVERLAP_MS = 60 * 1000;
+const SOURCE_FIELDS = 'name phoneNumber role reliabilityScore status updatedAt';
+
+// Local version for in-process derived caches; the shared data version lets
+// every process's conditional GETs see the change
+const changed = (scope: 'reference' | 'sources' = 'reference'): void => {
+    version++;
+    bumpDataVersion(scope);
+};
+
+const lower = (name: string): string => name.trim().toLowerCase();
+
+const evict = <T extends { _id: Types.ObjectId; name: string }>(index: RefIndex<T>, id: string): void => {
+    const existing = index.byId.get(id);
+    if (!existing) return;
+    index.byId.delete(id);
+    if (index.byName.get(existing.name) === existing) index.byName.delete(existing.name);
+    if (index.byLowerName.get(lower(existing.name)) === existing) {
+        index.byLowerName.delete(lower(existing.name));
+    }
+};
+
+const put = <T extends { _id: Types.ObjectId; name: string }>(index: RefIndex<T>, doc: T): void => {
+    // Drop stale name keys first so renames don't leave the old name resolvable
+    evict(index, String(doc._id));
+    index.byId.set(String(doc._id), doc);
+    index.byName.set(doc.name, doc);
+    index.byLowerName.set(lower(doc.name), doc);
+};
+
+const fill = <T extends { _id: Types.ObjectId; name: string }>(index: RefIndex<T>, docs: T[]): void => {
+    index.byId.clear();
+    index.byName.clear();
+    index.byLowerName.clear();
+    for (const doc of docs) put(index, doc);
+};
+
+const toCrop = (doc: any): CachedCrop => ({
+    _id: doc._id,
+    name: doc.name,
+    nameSwahili: doc.nameSwahili,
+    unit: doc.unit,
+    category: doc.category,
+});
+
+const toMarket = (doc: any): CachedMarket => ({
+    _id: doc._id,
+    name: doc.name,
+    county: doc.county,
+    region: doc.region,
+    active: doc.active !== false,
+});
+
+const toSource = (doc: any): CachedSource => ({
+    _id: doc._id,
+    name: doc.name,
+    phoneNumber: doc.phoneNumber,
+    role: doc.role,
+    reliabilityScore: doc.reliabilityScore ?? 0.5,
+    status: doc.status,
+});
+
+const latestUpdate = (docs: any[], since: number): number =>
+    docs.reduce((latest, doc) => Math.max(latest, doc.updatedAt ? new Date(doc.updatedAt).getTime() : 0), since);
+
+// Replace the cache contents wholesale (startup load, benchmarks)
+export const primeReferenceData = (data: { crops: any[]; markets: any[]; sources: any[] }): void => {
+    fill(crops, data.crops.map(toCrop));
+    fill(markets, data.markets.map(toMarket));
+    fill(sources, data.sources.map(toSource));
+    sourcesUpdatedAt = latestUpdate(data.sources, 0);
+    version++;
+};
+
+export const loadReferenceData = async (quiet = false): Promise<void> => {
+    const [cropDocs, marketDocs, sourceDocs] = await Promise.all([
+        Crop.find().select('name nameSwahili unit category').lean(),
+        Market.find().select('name county region active').lean(),
+        Source.find().select(SOURCE_FIELDS).lean(),
+    ]);
+
+    primeReferenceData({ crops: cropDocs, markets: marketDocs, sources: sourceDocs });
+
+    if (quiet) return;
+    console.log(
+        `✅ Reference data cached (${crops.byId.size} crops, ${markets.byId.size} markets, ${sources.byId.size} sources)`
+    );
+};
+
+// Sources updated since the last load, for when just the 'sources' version
+// moved. Sources are never deleted outside a reseed, which restarts the API.
+export const loadSourceData = async (): Promise<void> => {
+    const since = new Date(sourcesUpdatedAt - SOURCE_RELOAD_OVERLAP_MS);
+    const sourceDocs = await Source.find({ updatedAt: { $gte: since } }).select(SOURCE_FIELDS).lean();
+    for (const doc of sourceDocs) put(sources, toSource(doc));
+    sourcesUpdatedAt = latestUpdate(sourceDocs, sourcesUpdatedAt);
+    version++;
+};
+
+export const getReferenceVersion = (): number => version;
+
+// Crops
+export const getCropById = (id: any): CachedCrop | undefined => crops.byId.get(String(id));
+export const getCropByName = (name: string): CachedCrop | undefined => crops.byName.get(name);
+export const findCropByName = (name: string): CachedCrop | undefined =>
+    crops.byName.get(name) || crops.byLowerName.get(lower(name));
+export const listCrops = (): CachedCrop[] => [...crops.byId.values()];
+
+export const cacheCrop = (doc: any): void => {
+    put(crops, toCrop(doc));
+    changed();
+};
+export const evictCrop = (id: any): void => {
+    evict(crops, String(id));
+    changed();
+};
+
+// Markets
+export const getMarketById = (id: any): CachedMarket | undefined => markets.byId.get(String(id));
+export const getMarketByName = (name: string): CachedMarket | undefined => markets.byName.get(name);
+export const findMarketByName = (name: string): CachedMarket | undefined =>
+    markets.byName.get(name) || markets.byLowerName.get(lower(name));
+export const listMarkets = (): CachedMarket[] => [...markets.byId.values()];
+
+// USSD menus use short labels ("Wakulima") for markets stored as "Wakulima Market"
+export const findMarketByPartialName = (fragment: string): CachedMarket | undefined => {
+    if (!fragment) return undefined;
+    const exact = findMarketByName(fragment);
+    if (exact) return exact;
+    const needle = lower(fragment);
+    for (const [name, market] of markets.byLowerName) {
+        if (name.includes(needle)) return market;
+    }
+    return undefined;
+};
+
+export const cacheMarket = (doc: any): void => {
+    put(markets, toMarket(doc));
+    changed();
+};
+export const evictMarket = (id: any): void => {
+    evict(markets, String(id));
+    changed();
+};
+
+// Sources
+export const getSourceById = (id: any): CachedSource | undefined => sources.byId.get(String(id));
+export const findSourceByName = (name: string): CachedSource | undefined =>
+    sources.byName.get(name) || sources.byLowerName.get(lower(name));
+export const listSources = (): CachedSource[] => [...sources.byId.values()];
+
+const sameSource = (a: CachedSource, b: CachedSource): boolean =>
+    a.name === b.name &&
+    a.phoneNumber === b.phoneNumber &&
+    a.role === b.role &&
+    a.reliabilityScore === b.reliabilityScore &&
+    a.status === b.status;
+
+export const cacheSource = (doc: any): void => {
+    const source = toSource(doc);
+    const existing = sources.byId.get(String(source._id));
+    put(sources, source);
+    // Every process rereads changed sources and /api/prices revalidates on a
+    // bump, so a save that changed nothing cached doesn't announce one
+    if (!existing || !sameSource(existing, source)) changed('sources');
+};
@@ -0,0 +1,220 @@
+import { ClientSession } from 'mongoose';
+import Price, { IPrice } from '../models/Price';
+import PriceDailyRollup from '../models/PriceDailyRollup';
+
+// Rollup days are UTC, matching the $dateToString grouping they replace
+export const dayKey = (date: Date): string => date.toISOString().slice(0, 10);
+
+const groupByDay = {
+    $group: {
+        _id: {
+            cropId: '$cropId',
+            marketId: '$marketId',
+            day: { $dateToString: { format: '%Y-%m-%d', date: '$date' } },
+        },
+        count: { $sum: 1 },
+        sum: { $sum: '$price' },
+        sumSq: { $sum: { $multiply: ['$price', '$price'] } },
+        min: { $min: '$price' },
+        max: { $max: '$price' },
+    },
+};
+
+// Fold a newly approved price into its day bucket
+export const addToRollup = async (
+    price: IPrice,
+    session: ClientSession | null
+): Promise<void> => {
+    await PriceDailyRollup.updateOne(
+        { cropId: price.cropId, marketId: price.marketId, day: dayKey(price.date) },
+        {
+            $inc: { count: 1, sum: price.price, sumSq: price.price * price.price },
+            $min: { min: price.price },
+            $max: { max: price.price },
+        },
+        { upsert: true }
+    ).session(session);
+};
+
+// min/max can't be decremented, so a removed price triggers a recompute of its
+// (small) day bucket from the remaining approved prices.
+export const removeFromRollup = async (
+    price: IPrice,
+    session: ClientSession | null
+): Promise<void> => {
+    const day = dayKey(price.date);
+    const start = new Date(`${day}T00:00:00.000Z`);
+    const end = new Date(start.getTime() + 24 * 60 * 60 * 1000);
+    const filter = { cropId: price.cropId, marketId: price.marketId, day };
+
+    const [bucket] = await Price.aggregate([
+        {
+            $match: {
+                cropId: price.cropId,
+                marketId: price.marketId,
+                approved: true,
+                date: { $gte: start, $lt: end },
+            },
+        },
+        groupByDay,
+    ]).session(session);
+
+    if (!bucket) {
+        await PriceDailyRollup.deleteOne(filter).session(session);
+        return;
+    }
+
+    await PriceDailyRollup.updateOne(
+        filter,
+        { $set: { count: bucket.count, sum: bucket.sum, sumSq: bucket.sumSq, min: bucket.min, max: bucket.max } },
+        { upsert: true }
+    ).session(session);
+};
+
+// Bulk variant for moderation: one upserting bulkWrite for a batch of newly
+// approved prices, pre-aggregated per day bucket
+export const addManyToRollups = async (
+    prices: Pick<IPrice, 'cropId' | 'marketId' | 'price' | 'date'>[],
+    session: ClientSession | null
+): Promise<void> => {
+    const buckets: Map<string, { filter: any; count: number; sum: number; sumSq: number; min: number; max: number }> =
+        new Map();
+    for (const p of prices) {
+        const day = dayKey(p.date);
+        const key = `${p.cropId}:${p.marketId}:${day}`;
+        const bucket = buckets.get(key);
+        if (!bucket) {
+            buckets.set(key, {
+                filter: { cropId: p.cropId, marketId: p.marketId, day },
+                count: 1,
+                sum: p.price,
+                sumSq: p.price * p.price,
+                min: p.price,
+                max: p.price,
+            });
+            continue;
+        }
+        bucket.count++;
+        bucket.sum += p.price;
+        bucket.sumSq += p.price * p.price;
+        bucket.min = Math.min(bucket.min, p.price);
+        bucket.max = Math.max(bucket.max, p.price);
+    }
+    if (buckets.size === 0) return;
+
+    await PriceDailyRollup.bulkWrite(
+        [...buckets.values()].map((b) => ({
+            updateOne: {
+                filter: b.filter,
+                update: {
+                    $inc: { count: b.count, sum: b.sum, sumSq: b.sumSq },
+                    $min: { min: b.min },
+                    $max: { max: b.max },
+                },
+                upsert: true,
+            },
+        })),
+        { ordered: false, session: session ?? undefined }
+    );
+};
+
+// Bulk variant of removeFromRollup: recompute every affected day bucket with
+// one aggregation and one bulkWrite
+export const removeManyFromRollups = async (
+    prices: Pick<IPrice, 'cropId' | 'marketId' | 'date'>[],
+    session: ClientSession | null
+): Promise<void> => {
+    const affected: Map<string, { cropId: any; marketId: any; day: string }> = new Map();
+    for (const p of prices) {
+        const day = dayKey(p.date);
+        affected.set(`${p.cropId}:${p.marketId}:${day}`, { cropId: p.cropId, marketId: p.marketId, day });
+    }
+    if (affected.size === 0) return;
+
+    const rows = await Price.aggregate([
+        {
+            $match: {
+                approved: true,
+                $or: [...affected.values()].map((a) => {
+                    const start = new Date(`${a.day}T00:00:00.000Z`);
+                    return {
+                        cropId: a.cropId,
+                        marketId: a.marketId,
+                        date: { $gte: start, $lt: new Date(start.getTime() + 24 * 60 * 60 * 1000) },
+                    };
+                }),
+            },
+        },
+        groupByDay,
+    ]).session(session);
+
+    const rebuilt: Map<string, any> = new Map(
+        rows.map((r) => [`${r._id.cropId}:${r._id.marketId}:${r._id.day}`, r])
+    );
+
+    await PriceDailyRollup.bulkWrite(
+        [...affected].map(([key, a]) => {
+            const filter = { cropId: a.cropId, marketId: a.marketId, day: a.day };
+            const bucket = rebuilt.get(key);
+            return bucket
+                ? {
+                    updateOne: {
+                        filter,
+                        update: {
+                            $set: {
+                                count: bucket.count,
+                                sum: bucket.sum,
+                                sumSq: bucket.sumSq,
+                                min: bucket.min,
+                                max: bucket.max,
+                            },
+                        },
+                        upsert: true,
+                    },
+                }
+                : { deleteOne: { filter } };
+        }),
+        { ordered: false, session: session ?? undefined }
+    );
+};
+
+// Backfill the rollups collection from the full approved price history
+export const rebuildRollups = async (): Promise<number> => {
+    // $merge needs the unique (cropId, marketId, day) index to exist
+    await PriceDailyRollup.init();
+    await PriceDailyRollup.deleteMany({});
+    await Price.aggregate([
+        { $match: { approved: true } },
+        groupByDay,
+        {
+            $project: {
+                _id: 0,
+                cropId: '$_id.cropId',
+                marketId: '$_id.marketId',
+                day: '$_id.day',
+                count: 1,
+                sum: 1,
+                sumSq: 1,
+                min: 1,
+                max: 1,
+            },
+        },
+        {
+            $merge: {
+                into: PriceDailyRollup.collection.collectionName,
+                on: ['cropId', 'marketId', 'day'],
+                whenMatched: 'replace',
+                whenNotMatched: 'insert',
+            },
+        },
+    ]).allowDiskUse(true);
+    return PriceDailyRollup.countDocuments();
+};
+
+// Backfill on first start against an existing database
+export const ensureRollups = async (): Promise<void> => {
+    if (await PriceDailyRollup.exists({})) return;
+    if (!(await Price.exists({ approved: true }))) return;
+    const count = await rebuildRollups();
+    console.log(`✅ Daily price rollups rebuilt (${count} buckets)`);
+};
@@ -0,0 +1,94 @@
+import { compileArraySerializer, compileSerializer, field, Schema } from '../utils/serializer';
+import { getCropById, getMarketById, getSourceById } from './referenceCache';
+
+// Response serializers for the high-volume read endpoints. Handlers query lean
+// rows with the projections below; references are filled from the reference
+// cache instead of populate, and the schema virtuals (id, status, crop code)
+// are computed here, so responses keep the shape toJSON used to produce.
+
+export const priceFields =
+    'cropId marketId price date confidenceScore weightedAverage submissionCount approved sourceId notes createdAt updatedAt';
+export const cropFields = 'name nameSwahili unit category createdAt updatedAt';
+
+const id = field('string', { get: (doc) => String(doc._id) });
+
+// Mirrors the Crop 'code' virtual
+export const cropCode = (name?: string): string | undefined => name?.toLowerCase().replace(/\s+/g, '_');
+
+// Mirrors the Price 'status' virtual
+export const priceStatus = (approved: boolean): 'approved' | 'pending' => (approved ? 'approved' : 'pending');
+
+const cropRef: Schema = {
+    _id: 'id',
+    name: 'string',
+    unit: 'string',
+    code: field('string', { get: (crop) => cropCode(crop.name) }),
+    id,
+};
+
+const marketRef: Schema = {
+    _id: 'id',
+    name: 'string',
+    county: 'string',
+};
+
+const sourceRef: Schema = {
+    _id: 'id',
+    name: 'string',
+    role: 'string',
+    reliabilityScore: 'number',
+};
+
+const priceRow = (withSource: boolean): Schema => ({
+    _id: 'id',
+    cropId: field(cropRef, { get: (price) => getCropById(price.cropId) ?? null }),
+    marketId: field(marketRef, { get: (price) => getMarketById(price.marketId) ?? null }),
+    price: 'number',
+    date: 'date',
+    confidenceScore: 'number',
+    weightedAverage: field('number', { optional: true }),
+    submissionCount: field('number', { optional: true }),
+    approved: 'boolean',
+    sourceId: withSource ? field(sourceRef, { get: (price) => getSourceById(price.sourceId) ?? null }) : 'id',
+    notes: field('string', { optional: true }),
+    createdAt: 'date',
+    updatedAt: 'date',
+    status: field('string', { get: (price) => priceStatus(price.approved) }),
+    id,
+});
+
+const listRow = priceRow(true);
+
+// GET /api/prices?cursor=
+export const serializePriceCursorPage = compileSerializer({
+    prices: [listRow],
+    nextCursor: 'string',
+    total: field('number', { optional: true }),
+});
+
+// GET /api/prices?page=
+export const serializePricePage = compileSerializer({
+    prices: [listRow],
+    total: 'number',
+    page: 'number',
+    pages: 'number',
+});
+
+// GET /api/prices/history/:cropId/:marketId
+export const serializePriceHistory = compileArraySerializer(priceRow(false));
+
+const cropRow: Schema = {
+    _id: 'id',
+    name: 'string',
+    nameSwahili: 'string',
+    unit: 'string',
+    category: 'string',
+    createdAt: 'date',
+    updatedAt: 'date',
+    code: field('string', { get: (crop) => cropCode(crop.name) }),
+    id,
+};
+
+// GET /api/crops
+export const serializeCrops = compileArraySerializer(cropRow);
+export const serializeCrop = compileSerializer(cropRow);
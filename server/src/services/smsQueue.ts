@@ -0,0 +1,254 @@
+import { performance } from 'perf_hooks';
+import { Types } from 'mongoose';
+import { env } from '../config/env';
+import OutboundMessage, { IOutboundMessage } from '../models/OutboundMessage';
+import { sendSMSBatch, formatPriceSMS, SMSResult } from './smsService';
+import { observeSmsCall, recordSmsEnqueued, recordSmsOutcome } from './metrics';
+import { sanitizePhone } from '../middleware/validate';
+
+// Durable outbound SMS queue. Callers enqueue and return immediately; a worker
+// loop claims due jobs in batches, coalesces identical bodies into
+// multi-recipient provider calls, makes at most SMS_RATE_PER_SEC calls per
+// second with SMS_CONCURRENCY in flight, retries failures with exponential
+// backoff and dead-letters jobs that exhaust SMS_MAX_ATTEMPTS or fail permanently.
+
+export interface QueuedSMS {
+    to: string;
+    message: string;
+    // Enqueuing the same key twice is a no-op, so retries by callers are safe
+    idempotencyKey?: string;
+}
+
+const LOCK_MS = 5 * 60 * 1000;
+const BACKOFF_BASE_MS = 5 * 1000;
+const BACKOFF_MAX_MS = 30 * 60 * 1000;
+const IDLE_POLL_MS = 1000;
+
+const isDuplicateKey = (error: any): boolean => {
+    if (error?.code === 11000) return true;
+    const writeErrors: any[] = error?.writeErrors || [];
+    return writeErrors.length > 0 && writeErrors.every((e) => e.code === 11000);
+};
+
+export const enqueueSMS = async (to: string, message: string, idempotencyKey?: string): Promise<void> => {
+    recordSmsEnqueued(1);
+    try {
+        await OutboundMessage.create({
+            to: sanitizePhone(to),
+            message,
+            idempotencyKey,
+            maxAttempts: env.SMS_MAX_ATTEMPTS,
+        });
+    } catch (error: any) {
+        if (!isDuplicateKey(error)) throw error;
+    }
+};
+
+export const enqueuePriceSMS = (
+    to: string,
+    cropName: string,
+    marketName: string,
+    price: number,
+    unit: string,
+    confidence: string,
+    idempotencyKey?: string
+): Promise<void> =>
+    enqueueSMS(to, formatPriceSMS(cropName, marketName, price, unit, confidence), idempotencyKey);
+
+// Enqueue many messages in one round-trip; duplicates (by key) are skipped
+export const enqueueBulkSMS = async (messages: QueuedSMS[]): Promise<void> => {
+    if (messages.length === 0) return;
+    recordSmsEnqueued(messages.length);
+    try {
+        await OutboundMessage.insertMany(
+            messages.map((m) => ({ ...m, to: sanitizePhone(m.to), maxAttempts: env.SMS_MAX_ATTEMPTS })),
+            { ordered: false }
+        );
+    } catch (error: any) {
+        if (!isDuplicateKey(error)) throw error;
+    }
+};
+
+const backoffMs = (attempts: number): number => {
+    const delay = Math.min(BACKOFF_BASE_MS * 2 ** (attempts - 1), BACKOFF_MAX_MS);
+    // ±20% jitter so a failed burst doesn't retry in lockstep
+    return Math.round(delay * (0.8 + Math.random() * 0.4));
+};
+
+// Claim up to `limit` due jobs. The claim token lets us read back exactly the
+// jobs this worker won if another worker raced for the same ids.
+const claimBatch = async (limit: number): Promise<IOutboundMessage[]> => {
+    const now = new Date();
+    const due = await OutboundMessage.find({ status: 'pending', nextAttemptAt: { $lte: now } })
+        .sort({ nextAttemptAt: 1 })
+        .limit(limit)
+        .select('_id')
+        .lean();
+    if (due.length === 0) return [];
+
+    const claimToken = new Types.ObjectId().toString();
+    await OutboundMessage.updateMany(
+        { _id: { $in: due.map((d) => d._id) }, status: 'pending' },
+        {
+            $set: { status: 'sending', claimToken, lockedUntil: new Date(now.getTime() + LOCK_MS) },
+            $inc: { attempts: 1 },
+        }
+    );
+    return OutboundMessage.find({ claimToken, status: 'sending' });
+};
+
+// Jobs left in 'sending' by a crashed worker become pending again
+const releaseExpiredLocks = async (): Promise<void> => {
+    await OutboundMessage.updateMany(
+        { status: 'sending', lockedUntil: { $lt: new Date() } },
+        {
+            $set: { status: 'pending', nextAttemptAt: new Date() },
+            $unset: { lockedUntil: 1, claimToken: 1 },
+        }
+    );
+};
+
+// Group identical bodies so each provider call carries up to SMS_MAX_RECIPIENTS numbers
+const coalesce = (jobs: IOutboundMessage[]): IOutboundMessage[][] => {
+    const byMessage: Map<string, IOutboundMessage[]> = new Map();
+    for (const job of jobs) {
+        const group = byMessage.get(job.message);
+        if (group) group.push(job);
+        else byMessage.set(job.message, [job]);
+    }
+
+    const chunks: IOutboundMessage[][] = [];
+    for (const group of byMessage.values()) {
+        for (let i = 0; i < group.length; i += env.SMS_MAX_RECIPIENTS) {
+            chunks.push(group.slice(i, i + env.SMS_MAX_RECIPIENTS));
+        }
+    }
+    return chunks;
+};
+
+const outcomeUpdate = (job: IOutboundMessage, result: SMSResult): any => {
+    if (result.success) {
+        recordSmsOutcome('sent');
+        return {
+            $set: { status: 'sent', sentAt: new Date(), providerMessageId: result.messageId },
+            $unset: { lockedUntil: 1, claimToken: 1, lastError: 1 },
+        };
+    }
+
+    const exhausted = job.attempts >= job.maxAttempts || result.retryable === false;
+    recordSmsOutcome(exhausted ? 'dead' : 'retry');
+    if (exhausted) console.error(`☠️ SMS to ${job.to} dead-lettered: ${result.error}`);
+    return {
+        $set: exhausted
+            ? { status: 'dead', lastError: result.error }
+            : {
+                status: 'pending',
+                lastError: result.error,
+                nextAttemptAt: new Date(Date.now() + backoffMs(job.attempts)),
+            },
+        $unset: { lockedUntil: 1, claimToken: 1 },
+    };
+};
+
+// Send one coalesced chunk (same body) and record every recipient's outcome
+export const deliverBatch = async (jobs: IOutboundMessage[]): Promise<void> => {
+    const startedAt = performance.now();
+    const results = await sendSMSBatch(jobs.map((j) => j.to), jobs[0].message);
+    observeSmsCall((performance.now() - startedAt) / 1000);
+    await OutboundMessage.bulkWrite(
+        jobs.map((job, i) => ({
+            updateOne: {
+                // Only if our claim still stands (a lock may have expired meanwhile)
+                filter: { _id: job._id, claimToken: job.claimToken },
+                update: outcomeUpdate(job, results[i]),
+            },
+        })),
+        { ordered: false }
+    );
+};
+
+let running = false;
+let loopTimer: NodeJS.Timeout | null = null;
+let lockTimer: NodeJS.Timeout | null = null;
+let inFlight = 0;
+let tokens = 0;
+let lastRefill = Date.now();
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const refillTokens = (): void => {
+    const now = Date.now();
+    const rate = env.SMS_RATE_PER_SEC;
+    tokens = Math.min(rate, tokens + ((now - lastRefill) / 1000) * rate);
+    lastRefill = now;
+};
+
+// Wait for both a rate-limit token (one per provider call) and a concurrency slot
+const acquireSlot = async (): Promise<void> => {
+    for (;;) {
+        refillTokens();
+        if (tokens >= 1 && inFlight < env.SMS_CONCURRENCY) {
+            tokens -= 1;
+            inFlight++;
+            return;
+        }
+        await sleep(Math.ceil(1000 / env.SMS_RATE_PER_SEC));
+    }
+};
+
+// One worker step: claim a batch, coalesce it and deliver it within the rate
+// and concurrency limits. Resolves to the number of jobs processed.
+// Exported so tests can drive the worker step by step against a fake AT server.
+export const runSmsWorkerOnce = async (): Promise<number> => {
+    // At most ~30s of provider calls per claim, well inside the lock window
+    const jobs = await claimBatch(Math.max(1, env.SMS_RATE_PER_SEC * 30));
+    const deliveries: Promise<void>[] = [];
+
+    for (const chunk of coalesce(jobs)) {
+        await acquireSlot();
+        deliveries.push(
+            deliverBatch(chunk)
+                .catch((error) => console.error('❌ SMS delivery error:', error))
+                .finally(() => {
+                    inFlight--;
+                })
+        );
+    }
+
+    await Promise.all(deliveries);
+    return jobs.length;
+};
+
+const loop = async (): Promise<void> => {
+    if (!running) return;
+    let processed = 0;
+    try {
+        processed = await runSmsWorkerOnce();
+    } catch (error) {
+        console.error('❌ SMS worker error:', error);
+    }
+    // Go straight on while there is work, back off when the queue is idle
+    loopTimer = setTimeout(loop, processed > 0 ? 0 : IDLE_POLL_MS);
+};
+
+export const startSmsWorker = (): void => {
+    if (running) return;
+    running = true;
+    lastRefill = Date.now();
+    releaseExpiredLocks().catch((error) => console.error('❌ SMS lock release failed:', error));
+    lockTimer = setInterval(() => {
+        releaseExpiredLocks().catch((error) => console.error('❌ SMS lock release failed:', error));
+    }, LOCK_MS);
+    loop();
+    console.log(
+        `✅ SMS worker started (${env.SMS_RATE_PER_SEC}/s, concurrency ${env.SMS_CONCURRENCY})`
+    );
+};
+
+export const stopSmsWorker = (): void => {
+    running = false;
+    if (loopTimer) clearTimeout(loopTimer);
+    if (lockTimer) clearInterval(lockTimer);
+    loopTimer = null;
+    lockTimer = null;
+};
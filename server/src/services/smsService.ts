@@ -1,14 +1,23 @@
 import { env } from '../config/env';
+import { sanitizePhone } from '../middleware/validate';
 
 // Africa's Talking SMS service wrapper
-// In sandbox mode, messages are simulated
+// In sandbox mode, messages are simulated. Setting AT_SMS_URL posts straight to
+// that endpoint instead of going through the SDK (e.g. a local fake AT server).
 
-interface SMSResult {
+export interface SMSResult {
     success: boolean;
     messageId?: string;
     error?: string;
+    // false when retrying cannot help (invalid number, blacklisted, ...)
+    retryable?: boolean;
 }
 
+// AT recipient status codes: 100 Processed, 101 Success, 102 Queued
+const SUCCESS_CODES = [100, 101, 102];
+// 403 InvalidPhoneNumber, 404 UnsupportedNumberType, 406 UserInBlacklist
+const PERMANENT_FAILURE_CODES = [403, 404, 406];
+
 let smsClient: any = null;
 
 const getClient = () => {
@@ -28,35 +37,128 @@ const getClient = () => {
     return smsClient;
 };
 
-export const sendSMS = async (
-    to: string,
+const postMessage = async (to: string[], message: string): Promise<any> => {
+    if (env.AT_SMS_URL) {
+        const response = await fetch(env.AT_SMS_URL, {
+            method: 'POST',
+            headers: {
+                apiKey: env.AT_API_KEY,
+                Accept: 'application/json',
+                'Content-Type': 'application/x-www-form-urlencoded',
+            },
+            body: new URLSearchParams({
+                username: env.AT_USERNAME,
+                to: to.join(','),
+                message,
+                from: env.AT_SENDER_ID,
+            }).toString(),
+            // Aborting rejects, which sendSMSBatch records as a retryable failure
+            signal: AbortSignal.timeout(env.AT_TIMEOUT_MS),
+        });
+        if (!response.ok) throw new Error(`Africa's Talking responded ${response.status}`);
+        return response.json();
+    }
+
+    // The SDK takes no abort signal; stop waiting on it instead
+    let timer: NodeJS.Timeout | undefined;
+    const timeout = new Promise<never>((_resolve, reject) => {
+        timer = setTimeout(
+            () => reject(new Error(`Africa's Talking timed out after ${env.AT_TIMEOUT_MS}ms`)),
+            env.AT_TIMEOUT_MS
+        );
+    });
+    try {
+        return await Promise.race([
+            getClient().send({
+                to,
+                message,
+                from: env.AT_SENDER_ID,
+            }),
+            timeout,
+        ]);
+    } finally {
+        clearTimeout(timer);
+    }
+};
+
+const toResult = (recipient: any): SMSResult => {
+    if (!recipient) return { success: false, error: 'No recipient status returned', retryable: true };
+    if (SUCCESS_CODES.includes(recipient.statusCode)) {
+        return { success: true, messageId: recipient.messageId };
+    }
+    return {
+        success: false,
+        error: recipient.status,
+        retryable: !PERMANENT_FAILURE_CODES.includes(recipient.statusCode),
+    };
+};
+
+// Send one message body to many recipients in a single API call (up to the
+// provider's recipient cap) and map AT's per-recipient statuses back onto the
+// input order.
+export const sendSMSBatch = async (
+    recipients: string[],
     message: string
-): Promise<SMSResult> => {
-    const client = getClient();
+): Promise<SMSResult[]> => {
+    if (recipients.length === 0) return [];
 
-    if (!client) {
-        console.log(`📱 [SMS SIMULATED] To: ${to}\n${message}`);
-        return { success: true, messageId: 'simulated' };
+    if (!env.AT_SMS_URL && !getClient()) {
+        console.log(`📱 [SMS SIMULATED] To: ${recipients.join(', ')}\n${message}`);
+        return recipients.map(() => ({ success: true, messageId: 'simulated' }));
     }
 
     try {
-        const result = await client.send({
-            to: [to],
-            message,
-            from: env.AT_SENDER_ID,
+        const result = await postMessage(recipients, message);
+        const statuses: any[] = result.SMSMessageData?.Recipients || [];
+
+        // A number may appear twice in one batch; hand out its statuses in order.
+        // AT reports numbers in +254 form whatever form we sent them in.
+        const byNumber: Map<string, any[]> = new Map();
+        for (const status of statuses) {
+            const number = sanitizePhone(String(status.number));
+            const list = byNumber.get(number);
+            if (list) list.push(status);
+            else byNumber.set(number, [status]);
+        }
+
+        const results = recipients.map((to): SMSResult => {
+            const recipient =
+                byNumber.get(sanitizePhone(to))?.shift() ?? (recipients.length === 1 ? statuses[0] : undefined);
+            // Older SDK responses omit statusCode; treat a returned recipient as sent
+            return recipient && recipient.statusCode === undefined
+                ? { success: true, messageId: recipient.messageId }
+                : toResult(recipient);
         });
 
-        console.log(`📱 SMS sent to ${to}`);
-        return {
-            success: true,
-            messageId: result.SMSMessageData?.Recipients?.[0]?.messageId,
-        };
+        const sent = results.filter((r) => r.success).length;
+        console.log(`📱 SMS sent to ${sent}/${recipients.length} recipient(s)`);
+        return results;
     } catch (error: any) {
-        console.error(`❌ SMS failed to ${to}:`, error.message);
-        return { success: false, error: error.message };
+        console.error(`❌ SMS failed to ${recipients.length} recipient(s):`, error.message);
+        return recipients.map(() => ({ success: false, error: error.message, retryable: true }));
     }
 };
 
+export const sendSMS = async (
+    to: string,
+    message: string
+): Promise<SMSResult> => {
+    const [result] = await sendSMSBatch([to], message);
+    return result;
+};
+
+export const formatPriceSMS = (
+    cropName: string,
+    marketName: string,
+    price: number,
+    unit: string,
+    confidence: string
+): string =>
+    `SokoPrice: ${cropName} at ${marketName} Market\n` +
+    `KSh ${price.toLocaleString('en-KE')} per ${unit}\n` +
+    `Confidence: ${confidence}\n` +
+    `Reply STOP to unsubscribe`;
+
 export const sendPriceSMS = async (
     to: string,
     cropName: string,
@@ -65,28 +167,18 @@ export const sendPriceSMS = async (
     unit: string,
     confidence: string
 ): Promise<SMSResult> => {
-    const message =
-        `SokoPrice: ${cropName} at ${marketName} Market\n` +
-        `KSh ${price.toLocaleString('en-KE')} per ${unit}\n` +
-        `Confidence: ${confidence}\n` +
-        `Reply STOP to unsubscribe`;
-
-    return sendSMS(to, message);
+    return sendSMS(to, formatPriceSMS(cropName, marketName, price, unit, confidence));
 };
 
+// One API call per SMS_MAX_RECIPIENTS recipients instead of one per number
 export const sendBulkSMS = async (
     recipients: string[],
     message: string
 ): Promise<SMSResult[]> => {
     const results: SMSResult[] = [];
-    // Batch in groups of 100 for efficiency
-    const batchSize = 100;
-    for (let i = 0; i < recipients.length; i += batchSize) {
-        const batch = recipients.slice(i, i + batchSize);
-        const batchResults = await Promise.all(
-            batch.map((to) => sendSMS(to, message))
-        );
-        results.push(...batchResults);
+    for (let i = 0; i < recipients.length; i += env.SMS_MAX_RECIPIENTS) {
+        const batch = recipients.slice(i, i + env.SMS_MAX_RECIPIENTS);
+        results.push(...(await sendSMSBatch(batch, message)));
     }
     return results;
 };
@@ -0,0 +1,151 @@
+import { ClientSession, Types } from 'mongoose';
+import Price, { IPrice } from '../models/Price';
+import SourceDailyStat, { SOURCE_STAT_RETENTION_DAYS } from '../models/SourceDailyStat';
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const dayStart = (date: Date): Date => new Date(Math.floor(date.getTime() / DAY_MS) * DAY_MS);
+
+const bump = async (
+    price: IPrice,
+    inc: { total?: number; approved?: number },
+    session: ClientSession | null
+): Promise<void> => {
+    await SourceDailyStat.updateOne(
+        { sourceId: price.sourceId, day: dayStart(price.date) },
+        { $inc: inc },
+        { upsert: true }
+    ).session(session);
+};
+
+// A price was submitted (web or USSD)
+export const recordSubmission = (price: IPrice, session: ClientSession | null = null) =>
+    bump(price, { total: 1 }, session);
+
+// A pending price was approved for the first time
+export const recordApproval = (price: IPrice, session: ClientSession | null = null) =>
+    bump(price, { approved: 1 }, session);
+
+// A price was rejected (deleted); it no longer counts towards either total
+export const recordRemoval = (price: IPrice, session: ClientSession | null = null) =>
+    bump(price, { total: -1, approved: price.approved ? -1 : 0 }, session);
+
+// Bulk variants for ingestion and moderation: counters pre-aggregated per
+// source × day and written with one bulkWrite
+const bumpMany = async (
+    prices: Pick<IPrice, 'sourceId' | 'date' | 'approved'>[],
+    incFor: (price: Pick<IPrice, 'approved'>) => { total: number; approved: number },
+    session: ClientSession | null
+): Promise<void> => {
+    const counts: Map<string, { sourceId: any; day: Date; total: number; approved: number }> = new Map();
+    for (const price of prices) {
+        const day = dayStart(price.date);
+        const key = `${price.sourceId}:${day.getTime()}`;
+        const inc = incFor(price);
+        const entry = counts.get(key);
+        if (entry) {
+            entry.total += inc.total;
+            entry.approved += inc.approved;
+        } else {
+            counts.set(key, { sourceId: price.sourceId, day, ...inc });
+        }
+    }
+    if (counts.size === 0) return;
+
+    await SourceDailyStat.bulkWrite(
+        [...counts.values()].map(({ sourceId, day, total, approved }) => ({
+            updateOne: {
+                filter: { sourceId, day },
+                update: { $inc: { total, approved } },
+                upsert: true,
+            },
+        })),
+        { ordered: false, session: session ?? undefined }
+    );
+};
+
+export const recordSubmissions = (
+    prices: Pick<IPrice, 'sourceId' | 'date' | 'approved'>[],
+    session: ClientSession | null = null
+) => bumpMany(prices, () => ({ total: 1, approved: 0 }), session);
+
+export const recordApprovals = (
+    prices: Pick<IPrice, 'sourceId' | 'date' | 'approved'>[],
+    session: ClientSession | null = null
+) => bumpMany(prices, () => ({ total: 0, approved: 1 }), session);
+
+export const recordRemovals = (
+    prices: Pick<IPrice, 'sourceId' | 'date' | 'approved'>[],
+    session: ClientSession | null = null
+) => bumpMany(prices, (p) => ({ total: -1, approved: p.approved ? -1 : 0 }), session);
+
+// Approved and total submissions over the last `days` days, summed from at
+// most `days + 1` daily buckets
+export const getSubmissionCounts = async (
+    sourceId: string,
+    days: number = 30
+): Promise<{ approved: number; total: number }> => {
+    const since = dayStart(new Date(Date.now() - Math.min(days, SOURCE_STAT_RETENTION_DAYS - 1) * DAY_MS));
+    const buckets = await SourceDailyStat.find({
+        sourceId: new Types.ObjectId(sourceId),
+        day: { $gte: since },
+    })
+        .select('approved total')
+        .lean();
+
+    let approved = 0;
+    let total = 0;
+    for (const bucket of buckets) {
+        approved += bucket.approved;
+        total += bucket.total;
+    }
+    return { approved, total };
+};
+
+// Backfill the counters for the retention window from raw prices
+export const rebuildSourceStats = async (): Promise<number> => {
+    // $merge needs the unique (sourceId, day) index to exist
+    await SourceDailyStat.init();
+    await SourceDailyStat.deleteMany({});
+
+    const since = dayStart(new Date(Date.now() - (SOURCE_STAT_RETENTION_DAYS - 1) * DAY_MS));
+    await Price.aggregate([
+        { $match: { date: { $gte: since } } },
+        {
+            $group: {
+                _id: {
+                    sourceId: '$sourceId',
+                    day: { $subtract: ['$date', { $mod: [{ $toLong: '$date' }, DAY_MS] }] },
+                },
+                total: { $sum: 1 },
+                approved: { $sum: { $cond: ['$approved', 1, 0] } },
+            },
+        },
+        {
+            $project: {
+                _id: 0,
+                sourceId: '$_id.sourceId',
+                day: '$_id.day',
+                total: 1,
+                approved: 1,
+            },
+        },
+        {
+            $merge: {
+                into: SourceDailyStat.collection.collectionName,
+                on: ['sourceId', 'day'],
+                whenMatched: 'replace',
+                whenNotMatched: 'insert',
+            },
+        },
+    ]).allowDiskUse(true);
+    return SourceDailyStat.countDocuments();
+};
+
+// Backfill on first start against an existing database
+export const ensureSourceStats = async (): Promise<void> => {
+    if (await SourceDailyStat.exists({})) return;
+    if (!(await Price.exists({}))) return;
+    const count = await rebuildSourceStats();
+    console.log(`✅ Source daily stats rebuilt (${count} buckets)`);
+};
@@ -0,0 +1,129 @@
+import cluster from 'cluster';
+import { Types } from 'mongoose';
+import User from '../models/User';
+import { env } from '../config/env';
+import { bumpDataVersion } from './dataVersion';
+
+// Small per-process TTL/LRU cache of the user records `protect` needs, so
+// authenticated requests don't cost a User.findById each. Entries live for
+// USER_CACHE_TTL_SEC; the least recently used go first past USER_CACHE_MAX.
+// Revoking a user's tokens bumps tokenVersion in Mongo and evicts the user
+// everywhere: sibling cluster workers at once through the primary, other
+// instances when cacheSync sees the shared 'users' version move.
+
+export interface AuthUser {
+    _id: Types.ObjectId;
+    name: string;
+    email: string;
+    phoneNumber?: string;
+    role: 'Farmer' | 'Admin' | 'Buyer';
+    language: 'en' | 'sw';
+    active: boolean;
+    tokenVersion: number;
+}
+
+interface Entry {
+    user: AuthUser;
+    expiresAt: number;
+}
+
+const USER_FIELDS = 'name email phoneNumber role language active tokenVersion';
+
+// Map iteration order is insertion order, so re-inserting on a hit keeps the
+// least recently used entry first
+const entries: Map<string, Entry> = new Map();
+// Concurrent misses for the same user share one query
+const loading: Map<string, Promise<AuthUser | null>> = new Map();
+
+const toAuthUser = (doc: any): AuthUser => ({
+    _id: doc._id,
+    name: doc.name,
+    email: doc.email,
+    phoneNumber: doc.phoneNumber,
+    role: doc.role,
+    language: doc.language,
+    active: doc.active !== false,
+    tokenVersion: doc.tokenVersion ?? 0,
+});
+
+const store = (id: string, user: AuthUser): void => {
+    entries.delete(id);
+    entries.set(id, { user, expiresAt: Date.now() + env.USER_CACHE_TTL_SEC * 1000 });
+    while (entries.size > env.USER_CACHE_MAX) {
+        entries.delete(entries.keys().next().value as string);
+    }
+};
+
+export const getAuthUser = async (id: string): Promise<AuthUser | null> => {
+    const entry = entries.get(id);
+    if (entry && entry.expiresAt > Date.now()) {
+        entries.delete(id);
+        entries.set(id, entry);
+        return entry.user;
+    }
+    if (entry) entries.delete(id);
+
+    let pending = loading.get(id);
+    if (!pending) {
+        const load: Promise<AuthUser | null> = User.findById(id)
+            .select(USER_FIELDS)
+            .lean()
+            .then((doc) => {
+                if (!doc) return null;
+                const user = toAuthUser(doc);
+                // A revocation while we were loading may have made this read stale
+                if (loading.get(id) === load) store(id, user);
+                return user;
+            })
+            .finally(() => {
+                if (loading.get(id) === load) loading.delete(id);
+            });
+        loading.set(id, load);
+        pending = load;
+    }
+    return pending;
+};
+
+// Write-through for handlers that already hold a fresh user document
+export const cacheUser = (doc: any): void => {
+    store(String(doc._id), toAuthUser(doc));
+};
+
+export const evictUser = (id: any): void => {
+    entries.delete(String(id));
+    loading.delete(String(id));
+};
+
+export const clearUserCache = (): void => {
+    entries.clear();
+    loading.clear();
+};
+
+interface UserEvictMessage {
+    type: 'users:evict';
+    id: string;
+}
+
+if (cluster.isWorker) {
+    process.on('message', (message: UserEvictMessage) => {
+        if (message?.type === 'users:evict') evictUser(message.id);
+    });
+}
+
+// Primary side: relay evictions to every other worker
+export const serveClusterUserEvictions = (): void => {
+    cluster.on('message', (worker, message: UserEvictMessage) => {
+        if (message?.type !== 'users:evict') return;
+        for (const other of Object.values(cluster.workers || {})) {
+            if (other && other !== worker && other.isConnected()) other.send(message);
+        }
+    });
+};
+
+// Invalidate every token issued to the user so far
+export const revokeUserTokens = async (id: any): Promise<void> => {
+    await User.updateOne({ _id: id }, { $inc: { tokenVersion: 1 } });
+    evictUser(id);
+    process.send?.({ type: 'users:evict', id: String(id) });
+    bumpDataVersion('users');
+};
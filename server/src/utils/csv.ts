@@ -0,0 +1,39 @@
+// Minimal RFC 4180 field handling for single-line records: quoted fields may
+// contain commas and doubled quotes, but not line breaks.
+export const parseCsvLine = (line: string): string[] => {
+    const fields: string[] = [];
+    let field = '';
+    let quoted = false;
+
+    for (let i = 0; i < line.length; i++) {
+        const ch = line[i];
+        if (quoted) {
+            if (ch === '"' && line[i + 1] === '"') {
+                field += '"';
+                i++;
+            } else if (ch === '"') {
+                quoted = false;
+            } else {
+                field += ch;
+            }
+        } else if (ch === '"') {
+            quoted = true;
+        } else if (ch === ',') {
+            fields.push(field);
+            field = '';
+        } else {
+            field += ch;
+        }
+    }
+    fields.push(field);
+    return fields.map((f) => f.trim());
+};
+
+// Quote a field when it contains a delimiter, quote or line break
+export const csvField = (value: unknown): string => {
+    if (value === null || value === undefined) return '';
+    const text = String(value);
+    return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+export const toCsvLine = (values: unknown[]): string => `${values.map(csvField).join(',')}\n`;
@@ -1,4 +1,4 @@
-type Language = 'en' | 'sw';
+export type Language = 'en' | 'sw';
 
 interface Messages {
     [key: string]: {
@@ -72,6 +72,10 @@ const messages: Messages = {
         en: 'per',
         sw: 'kwa',
     },
+    dailySummary: {
+        en: 'SokoPrice Daily Summary:',
+        sw: 'Muhtasari wa Bei wa Leo - SokoPrice:',
+    },
 };
 
 export const t = (key: string, lang: Language = 'en'): string => {
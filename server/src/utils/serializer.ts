@@ -0,0 +1,109 @@
+import { Response } from 'express';
+
+// Schema-compiled JSON serializers for high-volume responses. A schema lists
+// the fields of a response object and their types; compileSerializer turns it
+// into a function that writes the JSON with the keys and separators inlined,
+// so the hot path never walks the object generically the way JSON.stringify does.
+//
+// Field types:
+//   'string' | 'number' | 'boolean' | 'date' | 'id' (ObjectId or hex string) | 'any'
+//   a nested schema object, or a one-element array [type] for arrays
+//   field(type, { get?, optional? }) — `get` computes the value from the
+//   parent (virtuals on lean rows); optional fields are omitted when undefined.
+// Null and undefined serialize as null unless the field is optional.
+
+export type FieldType = 'string' | 'number' | 'boolean' | 'date' | 'id' | 'any' | Schema | [FieldType];
+
+export interface FieldOptions {
+    get?: (parent: any) => any;
+    optional?: boolean;
+}
+
+export class FieldSpec {
+    constructor(readonly type: FieldType, readonly options: FieldOptions = {}) {}
+}
+
+export const field = (type: FieldType, options: FieldOptions = {}): FieldSpec => new FieldSpec(type, options);
+
+export interface Schema {
+    [key: string]: FieldType | FieldSpec;
+}
+
+export type Serializer = (value: any) => string;
+
+// Strings that need escaping (or may hold lone surrogates) fall back to JSON.stringify
+const NEEDS_ESCAPE = /["\\\u0000-\u001f\ud800-\udfff]/;
+
+const encoders = {
+    string: (v: any): string => {
+        if (v == null) return 'null';
+        const s = typeof v === 'string' ? v : String(v);
+        return NEEDS_ESCAPE.test(s) ? JSON.stringify(s) : `"${s}"`;
+    },
+    number: (v: any): string => (typeof v === 'number' && isFinite(v) ? String(v) : 'null'),
+    boolean: (v: any): string => (v == null ? 'null' : v ? 'true' : 'false'),
+    date: (v: any): string => {
+        if (v == null) return 'null';
+        const d = v instanceof Date ? v : new Date(v);
+        return isNaN(d.getTime()) ? 'null' : `"${d.toISOString()}"`;
+    },
+    // ObjectId hex strings never need escaping
+    id: (v: any): string => (v == null ? 'null' : `"${String(v)}"`),
+    any: (v: any): string => (v === undefined ? 'null' : JSON.stringify(v) ?? 'null'),
+};
+
+const compileType = (type: FieldType): Serializer => {
+    if (typeof type === 'string') return encoders[type];
+    if (Array.isArray(type)) return compileArray(compileType(type[0]));
+    return compileObject(type);
+};
+
+const compileArray = (item: Serializer): Serializer => (values: any) => {
+    if (values == null) return 'null';
+    let out = '[';
+    for (let i = 0; i < values.length; i++) {
+        if (i > 0) out += ',';
+        out += item(values[i]);
+    }
+    return `${out}]`;
+};
+
+const compileObject = (schema: Schema): Serializer => {
+    const encode: Serializer[] = [];
+    const getters: ((parent: any) => any)[] = [];
+    const lines: string[] = [];
+    // Once a required field has been written every later field needs a leading
+    // comma, so the separator is only decided at runtime before that point
+    let separatorKnown = false;
+
+    Object.entries(schema).forEach(([key, value], i) => {
+        const spec = value instanceof FieldSpec ? value : field(value);
+        encode.push(compileType(spec.type));
+        getters.push(spec.options.get || ((parent: any) => parent[key]));
+
+        // Key literals are emitted as JS string literals of their JSON form
+        const first = JSON.stringify(`${JSON.stringify(key)}:`);
+        const next = JSON.stringify(`,${JSON.stringify(key)}:`);
+        const prefix = separatorKnown ? next : `(c?${next}:${first})`;
+        lines.push(`v=g[${i}](o);`);
+        if (spec.options.optional) {
+            lines.push(`if(v!==undefined){s+=${prefix}+e[${i}](v);c=true;}`);
+        } else {
+            lines.push(`s+=${prefix}+e[${i}](v);c=true;`);
+            separatorKnown = true;
+        }
+    });
+
+    const body = `if(o==null)return 'null';var s='{',c=false,v;${lines.join('')}return s+'}';`;
+    // eslint-disable-next-line no-new-func
+    return new Function('e', 'g', `return function(o){${body}}`)(encode, getters) as Serializer;
+};
+
+export const compileSerializer = (schema: Schema): Serializer => compileObject(schema);
+
+export const compileArraySerializer = (schema: Schema): Serializer => compileArray(compileObject(schema));
+
+// Send a pre-serialized JSON body
+export const sendJson = (res: Response, json: string, status = 200): void => {
+    res.status(status).type('application/json').send(json);
+};
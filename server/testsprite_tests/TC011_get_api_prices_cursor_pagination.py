@@ -0,0 +1,47 @@
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def test_get_api_prices_cursor_pagination():
+    url = f"{BASE_URL}/api/prices"
+    limit = 5
+
+    # First page: empty cursor switches to keyset mode
+    try:
+        response = requests.get(url, params={"cursor": "", "limit": limit}, timeout=TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        assert False, f"Request failed for first cursor page: {e}"
+    first = response.json()
+    assert isinstance(first, dict), "Response should be a JSON object"
+    assert "prices" in first, "Response missing 'prices'"
+    assert "nextCursor" in first, "Response missing 'nextCursor'"
+    assert isinstance(first["prices"], list), "'prices' should be a list"
+    assert len(first["prices"]) <= limit, "Page larger than requested limit"
+    # Unfiltered listings always carry an (estimated) total
+    assert isinstance(first.get("total"), int), "'total' should be int without filters"
+
+    if not first["nextCursor"]:
+        return
+
+    # Second page must continue strictly after the first, with no overlap
+    try:
+        response = requests.get(
+            url, params={"cursor": first["nextCursor"], "limit": limit}, timeout=TIMEOUT
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        assert False, f"Request failed for second cursor page: {e}"
+    second = response.json()
+    first_ids = {p.get("_id") or p.get("id") for p in first["prices"]}
+    second_ids = {p.get("_id") or p.get("id") for p in second["prices"]}
+    assert not first_ids & second_ids, "Cursor pages overlap"
+    if second["prices"]:
+        assert second["prices"][0]["date"] <= first["prices"][-1]["date"], "Cursor pages out of order"
+
+    # Malformed cursors are rejected
+    response = requests.get(url, params={"cursor": "not-a-cursor"}, timeout=TIMEOUT)
+    assert response.status_code == 400, f"Expected 400 for invalid cursor, got {response.status_code}"
+
+test_get_api_prices_cursor_pagination()
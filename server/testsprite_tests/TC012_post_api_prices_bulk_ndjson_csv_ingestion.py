@@ -0,0 +1,77 @@
+import json
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+ADMIN_EMAIL = "admin@sokoprice.co.ke"
+ADMIN_PASSWORD = "Admin@123456"
+
+def test_post_api_prices_bulk_ndjson_csv_ingestion():
+    login_resp = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+        timeout=TIMEOUT,
+    )
+    assert login_resp.status_code == 200, f"Admin login failed with status {login_resp.status_code}"
+    token = login_resp.json().get("token")
+    assert token, "Admin token missing in login response"
+    auth = {"Authorization": f"Bearer {token}"}
+
+    sources_resp = requests.get(f"{BASE_URL}/api/sources", headers=auth, timeout=TIMEOUT)
+    assert sources_resp.status_code == 200, "Failed to list sources"
+    sources = sources_resp.json()
+    assert isinstance(sources, list) and sources, "No sources found"
+    source_id = sources[0].get("_id") or sources[0].get("id")
+
+    # NDJSON: names resolve case-insensitively; bad rows are reported, not fatal
+    rows = [
+        {"crop": "maize", "market": "wakulima market", "price": 4100, "sourceId": source_id},
+        {"crop": "Beans", "market": "Eldoret Market", "price": 9000, "sourceId": source_id},
+        {"crop": "Unobtainium", "market": "Eldoret Market", "price": 1, "sourceId": source_id},
+        {"crop": "Maize", "market": "Eldoret Market", "price": -5, "sourceId": source_id},
+    ]
+    body = "\n".join(json.dumps(r) for r in rows) + "\n{not json\n"
+    resp = requests.post(
+        f"{BASE_URL}/api/prices/bulk",
+        data=body.encode(),
+        headers={**auth, "Content-Type": "application/x-ndjson"},
+        timeout=TIMEOUT,
+    )
+    assert resp.status_code == 201, f"Expected 201, got {resp.status_code}: {resp.text}"
+    report = resp.json()
+    assert report["received"] == 5, f"Expected 5 rows received, got {report['received']}"
+    assert report["inserted"] == 2, f"Expected 2 rows inserted, got {report['inserted']}"
+    assert report["failed"] == 3, f"Expected 3 failed rows, got {report['failed']}"
+    failed_rows = sorted(e["row"] for e in report["errors"])
+    assert failed_rows == [3, 4, 5], f"Unexpected failed rows: {failed_rows}"
+
+    # CSV with a header row; ?sourceId= fills in the source
+    csv_body = 'crop,market,price,notes\nRice,Kisumu Market,7800,"bulk, csv"\nWheat,Nakuru Market,4500,\n'
+    resp = requests.post(
+        f"{BASE_URL}/api/prices/bulk",
+        params={"sourceId": source_id},
+        data=csv_body.encode(),
+        headers={**auth, "Content-Type": "text/csv"},
+        timeout=TIMEOUT,
+    )
+    assert resp.status_code == 201, f"Expected 201, got {resp.status_code}: {resp.text}"
+    report = resp.json()
+    assert report["inserted"] == 2 and report["failed"] == 0, f"Unexpected CSV report: {report}"
+
+    # Unsupported content types are refused
+    resp = requests.post(
+        f"{BASE_URL}/api/prices/bulk", json=rows, headers=auth, timeout=TIMEOUT
+    )
+    assert resp.status_code == 415, f"Expected 415 for JSON body, got {resp.status_code}"
+
+    # Authentication is required
+    resp = requests.post(
+        f"{BASE_URL}/api/prices/bulk",
+        data=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+        timeout=TIMEOUT,
+    )
+    assert resp.status_code == 401, f"Expected 401 without token, got {resp.status_code}"
+
+test_post_api_prices_bulk_ndjson_csv_ingestion()
@@ -0,0 +1,76 @@
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+ADMIN_EMAIL = "admin@sokoprice.co.ke"
+ADMIN_PASSWORD = "Admin@123456"
+
+def test_patch_api_prices_bulk_approve_reject():
+    login_resp = requests.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+        timeout=TIMEOUT,
+    )
+    assert login_resp.status_code == 200, f"Admin login failed with status {login_resp.status_code}"
+    auth = {"Authorization": f"Bearer {login_resp.json()['token']}"}
+
+    crops = requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT).json()
+    markets = requests.get(f"{BASE_URL}/api/markets", timeout=TIMEOUT).json()
+    assert crops and markets, "Crops and markets are required"
+    crop_id = crops[0].get("_id") or crops[0].get("id")
+    market_id = markets[0].get("_id") or markets[0].get("id")
+
+    # Three pending prices to moderate
+    ids = []
+    for value in (5100, 5200, 5300):
+        resp = requests.post(
+            f"{BASE_URL}/api/prices",
+            json={"cropId": crop_id, "marketId": market_id, "price": value},
+            timeout=TIMEOUT,
+        )
+        assert resp.status_code == 201, f"Price creation failed: {resp.text}"
+        ids.append(resp.json()["_id"])
+
+    missing_id = "000000000000000000000000"
+    url = f"{BASE_URL}/api/prices/bulk"
+
+    # Approve two plus an id that doesn't exist
+    resp = requests.patch(
+        url, json={"action": "approve", "ids": ids[:2] + [missing_id]}, headers=auth, timeout=TIMEOUT
+    )
+    assert resp.status_code == 200, f"Bulk approve failed: {resp.status_code} {resp.text}"
+    report = resp.json()
+    assert report["processed"] == 2, f"Expected 2 approved, got {report}"
+    assert report["notFound"] == [missing_id], f"Unexpected notFound: {report['notFound']}"
+
+    # The newest approved price is now the pair's latest, with a persisted score
+    latest = requests.get(f"{BASE_URL}/api/prices/latest/{crop_id}/{market_id}", timeout=TIMEOUT)
+    assert latest.status_code == 200, "Latest price lookup failed"
+    latest_price = latest.json()["price"]
+    assert latest_price["_id"] == ids[1], "Latest price should be the newest approved one"
+    assert 0 <= latest.json()["confidence"] <= 1, "Confidence out of range"
+
+    # Re-approving is a no-op
+    resp = requests.patch(url, json={"action": "approve", "ids": ids[:2]}, headers=auth, timeout=TIMEOUT)
+    assert resp.json()["processed"] == 0 and resp.json()["skipped"] == 2, f"Unexpected re-approve report: {resp.json()}"
+
+    # Reject the pending one and one approved one
+    resp = requests.patch(url, json={"action": "reject", "ids": [ids[1], ids[2]]}, headers=auth, timeout=TIMEOUT)
+    assert resp.status_code == 200, f"Bulk reject failed: {resp.status_code} {resp.text}"
+    assert resp.json()["processed"] == 2, f"Expected 2 rejected, got {resp.json()}"
+
+    # The latest price falls back to the remaining approved one
+    latest = requests.get(f"{BASE_URL}/api/prices/latest/{crop_id}/{market_id}", timeout=TIMEOUT)
+    assert latest.status_code == 200, "Latest price lookup failed after reject"
+    assert latest.json()["price"]["_id"] != ids[1], "Rejected price is still the latest"
+
+    # Validation
+    resp = requests.patch(url, json={"action": "publish", "ids": ids}, headers=auth, timeout=TIMEOUT)
+    assert resp.status_code == 400, "Unknown action should be rejected"
+    resp = requests.patch(url, json={"action": "approve", "ids": ["nope"]}, headers=auth, timeout=TIMEOUT)
+    assert resp.status_code == 400, "Invalid ids should be rejected"
+    resp = requests.patch(url, json={"action": "approve", "ids": ids}, timeout=TIMEOUT)
+    assert resp.status_code == 401, "Authentication is required"
+
+test_patch_api_prices_bulk_approve_reject()
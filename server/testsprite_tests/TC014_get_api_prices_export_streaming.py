@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 60
+
+def test_get_api_prices_export_streaming():
+    url = f"{BASE_URL}/api/prices/export"
+
+    # CSV: header row plus one row per approved price, streamed
+    with requests.get(url, params={"format": "csv", "approved": "true"}, stream=True, timeout=TIMEOUT) as resp:
+        assert resp.status_code == 200, f"CSV export failed: {resp.status_code}"
+        assert resp.headers.get("Content-Type", "").startswith("text/csv"), "Wrong CSV content type"
+        assert "attachment" in resp.headers.get("Content-Disposition", ""), "Export should be an attachment"
+        rows = list(csv.reader(io.StringIO(resp.content.decode("utf-8"))))
+    assert rows, "CSV export is empty"
+    assert rows[0] == ["id", "date", "crop", "unit", "market", "county", "price", "approved", "confidence"], \
+        f"Unexpected CSV header: {rows[0]}"
+    assert all(r[7] == "true" for r in rows[1:]), "approved filter not applied"
+    dates = [r[1] for r in rows[1:]]
+    assert dates == sorted(dates, reverse=True), "Export should be newest first"
+
+    # NDJSON with a date range
+    crops = requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT).json()
+    crop_id = crops[0].get("_id") or crops[0].get("id")
+    params = {"format": "ndjson", "cropId": crop_id, "from": "2000-01-01", "to": "2100-01-01"}
+    with requests.get(url, params=params, stream=True, timeout=TIMEOUT) as resp:
+        assert resp.status_code == 200, f"NDJSON export failed: {resp.status_code}"
+        records = [json.loads(line) for line in resp.iter_lines() if line]
+    assert all(r["crop"] == crops[0]["name"] for r in records), "cropId filter not applied"
+
+    # Validation
+    assert requests.get(url, params={"format": "xml"}, timeout=TIMEOUT).status_code == 400
+    assert requests.get(url, params={"cropId": "nope"}, timeout=TIMEOUT).status_code == 400
+    assert requests.get(url, params={"from": "yesterday-ish"}, timeout=TIMEOUT).status_code == 400
+
+test_get_api_prices_export_streaming()
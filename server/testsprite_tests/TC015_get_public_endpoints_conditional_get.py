@@ -0,0 +1,65 @@
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+PUBLIC_PATHS = [
+    "/api/crops",
+    "/api/markets",
+    "/api/prices?limit=5",
+    "/api/analytics/public/trends?days=7",
+]
+
+def test_get_public_endpoints_conditional_get():
+    crops = requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT).json()
+    assert isinstance(crops, list) and crops, "No crops to compare"
+    crop_id = crops[0].get("_id") or crops[0].get("id")
+
+    for path in PUBLIC_PATHS + [f"/api/analytics/public/compare?cropId={crop_id}"]:
+        first = requests.get(f"{BASE_URL}{path}", timeout=TIMEOUT)
+        assert first.status_code == 200, f"{path}: expected 200, got {first.status_code}"
+        etag = first.headers.get("ETag")
+        assert etag, f"{path}: missing ETag"
+        assert first.headers.get("Last-Modified"), f"{path}: missing Last-Modified"
+        cache_control = first.headers.get("Cache-Control", "")
+        assert "public" in cache_control and "stale-while-revalidate" in cache_control, \
+            f"{path}: unexpected Cache-Control {cache_control!r}"
+        # Browsers always revalidate; only shared caches may reuse the response
+        assert "no-cache" in cache_control and " max-age=" not in f" {cache_control}", \
+            f"{path}: browsers may serve a stale copy: {cache_control!r}"
+
+        # Revalidation with the current ETag is answered with an empty 304
+        second = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag}, timeout=TIMEOUT)
+        assert second.status_code == 304, f"{path}: expected 304, got {second.status_code}"
+        assert not second.content, f"{path}: 304 must not carry a body"
+
+        # A stale ETag gets the full response
+        stale = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": 'W/"stale"'}, timeout=TIMEOUT)
+        assert stale.status_code == 200, f"{path}: stale ETag should get 200, got {stale.status_code}"
+
+    # Errors are neither validated nor shared
+    invalid = requests.get(f"{BASE_URL}/api/analytics/public/compare", timeout=TIMEOUT)
+    assert invalid.status_code == 400, f"compare without a crop: expected 400, got {invalid.status_code}"
+    assert "public" not in invalid.headers.get("Cache-Control", ""), "an error response was made cacheable"
+    assert not invalid.headers.get("ETag", "").startswith('W/"p'), "an error response carries the data ETag"
+
+    # A price write changes the prices ETag
+    before = requests.get(f"{BASE_URL}/api/prices?limit=5", timeout=TIMEOUT).headers["ETag"]
+    markets = requests.get(f"{BASE_URL}/api/markets", timeout=TIMEOUT).json()
+    created = requests.post(
+        f"{BASE_URL}/api/prices",
+        json={
+            "cropId": crop_id,
+            "marketId": markets[0].get("_id") or markets[0].get("id"),
+            "price": 4321,
+        },
+        timeout=TIMEOUT,
+    )
+    assert created.status_code == 201, f"Price creation failed: {created.text}"
+    after = requests.get(
+        f"{BASE_URL}/api/prices?limit=5", headers={"If-None-Match": before}, timeout=TIMEOUT
+    )
+    assert after.status_code == 200, "ETag should change after a price is submitted"
+    assert after.headers["ETag"] != before, "ETag did not change after a price write"
+
+test_get_public_endpoints_conditional_get()
@@ -0,0 +1,57 @@
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def test_get_api_prices_crops_response_shape():
+    # Crops keep the id and code virtuals
+    crops_resp = requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT)
+    assert crops_resp.status_code == 200, f"GET /api/crops failed: {crops_resp.status_code}"
+    assert crops_resp.headers.get("Content-Type", "").startswith("application/json")
+    crops = crops_resp.json()
+    assert isinstance(crops, list) and crops, "Expected a non-empty crop list"
+    for crop in crops:
+        assert crop["id"] == crop["_id"], "Crop id virtual missing or wrong"
+        assert crop["code"] == crop["name"].lower().replace(" ", "_"), "Crop code virtual missing or wrong"
+        for key in ("name", "nameSwahili", "unit", "category"):
+            assert key in crop, f"Crop missing {key}"
+
+    # Price rows keep populated refs and the status virtual
+    prices_resp = requests.get(f"{BASE_URL}/api/prices", params={"limit": 20}, timeout=TIMEOUT)
+    assert prices_resp.status_code == 200, f"GET /api/prices failed: {prices_resp.status_code}"
+    body = prices_resp.json()
+    for key in ("prices", "total", "page", "pages"):
+        assert key in body, f"Price page missing {key}"
+    for price in body["prices"]:
+        assert price["id"] == price["_id"], "Price id virtual missing or wrong"
+        assert price["status"] == ("approved" if price["approved"] else "pending"), "Status virtual wrong"
+        assert isinstance(price["price"], (int, float))
+        if price["cropId"] is not None:
+            assert {"_id", "name", "unit"} <= set(price["cropId"]), "Crop ref not populated"
+        if price["marketId"] is not None:
+            assert {"_id", "name", "county"} <= set(price["marketId"]), "Market ref not populated"
+        if price["sourceId"] is not None:
+            assert {"_id", "name", "role", "reliabilityScore"} <= set(price["sourceId"]), "Source ref not populated"
+
+    cursor_resp = requests.get(f"{BASE_URL}/api/prices", params={"limit": 5, "cursor": ""}, timeout=TIMEOUT)
+    assert cursor_resp.status_code == 200
+    assert "nextCursor" in cursor_resp.json(), "Cursor page missing nextCursor"
+
+    # History rows populate crop and market only
+    approved = [p for p in body["prices"] if p["approved"] and p["cropId"] and p["marketId"]]
+    if approved:
+        sample = approved[0]
+        history_resp = requests.get(
+            f"{BASE_URL}/api/prices/history/{sample['cropId']['_id']}/{sample['marketId']['_id']}",
+            params={"days": 3650},
+            timeout=TIMEOUT,
+        )
+        assert history_resp.status_code == 200
+        history = history_resp.json()
+        assert isinstance(history, list) and history, "Expected history rows"
+        for row in history:
+            assert row["status"] == "approved"
+            assert row["cropId"]["_id"] == sample["cropId"]["_id"]
+            assert isinstance(row["sourceId"], str), "History sourceId should stay an id"
+
+test_get_api_prices_crops_response_shape()
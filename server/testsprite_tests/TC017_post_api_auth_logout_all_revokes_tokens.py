@@ -0,0 +1,59 @@
+import base64
+import json
+import uuid
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def decode_claims(token):
+    payload = token.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload))
+
+def test_post_api_auth_logout_all_revokes_tokens():
+    email = f"tc017_{uuid.uuid4().hex[:8]}@example.com"
+    password = "TestPass123!"
+
+    reg = requests.post(
+        f"{BASE_URL}/api/auth/register",
+        json={"name": "TC017 User", "email": email, "password": password, "role": "Buyer"},
+        timeout=TIMEOUT,
+    )
+    assert reg.status_code == 201, f"Registration failed: {reg.text}"
+    first_token = reg.json()["token"]
+
+    # Identity, role and token version are carried as claims
+    claims = decode_claims(first_token)
+    assert claims.get("id") == reg.json()["user"]["id"], "id claim missing"
+    assert claims.get("role") == "Buyer", "role claim missing"
+    assert claims.get("tv") == 0, "token version claim missing"
+
+    login = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password}, timeout=TIMEOUT)
+    assert login.status_code == 200, f"Login failed: {login.text}"
+    second_token = login.json()["token"]
+
+    for token in (first_token, second_token):
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers={"Authorization": f"Bearer {token}"}, timeout=TIMEOUT)
+        assert me.status_code == 200, f"Profile request failed: {me.text}"
+        assert me.json()["user"]["email"] == email
+
+    # Signing out everywhere revokes every token issued so far
+    out = requests.post(
+        f"{BASE_URL}/api/auth/logout-all", headers={"Authorization": f"Bearer {second_token}"}, timeout=TIMEOUT
+    )
+    assert out.status_code == 200, f"logout-all failed: {out.text}"
+
+    for token in (first_token, second_token):
+        me = requests.get(f"{BASE_URL}/api/auth/me", headers={"Authorization": f"Bearer {token}"}, timeout=TIMEOUT)
+        assert me.status_code == 401, f"Revoked token still accepted: {me.status_code}"
+
+    # A fresh login carries the new token version and works again
+    relogin = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password}, timeout=TIMEOUT)
+    assert relogin.status_code == 200
+    fresh = relogin.json()["token"]
+    assert decode_claims(fresh).get("tv") == 1, "token version was not bumped"
+    me = requests.get(f"{BASE_URL}/api/auth/me", headers={"Authorization": f"Bearer {fresh}"}, timeout=TIMEOUT)
+    assert me.status_code == 200, f"Fresh token rejected: {me.text}"
+
+test_post_api_auth_logout_all_revokes_tokens()
@@ -0,0 +1,34 @@
+import random
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+USSD_LIMIT = 60
+
+def random_phone():
+    return "+2547" + "".join(random.choice("0123456789") for _ in range(8))
+
+def dial(phone, session):
+    return requests.post(
+        f"{BASE_URL}/api/ussd",
+        json={"sessionId": session, "serviceCode": "*789#", "phoneNumber": phone, "text": ""},
+        timeout=TIMEOUT,
+    )
+
+def test_post_api_ussd_rate_limited_per_phone():
+    busy_phone = random_phone()
+
+    statuses = [dial(busy_phone, f"tc018-{i}").status_code for i in range(USSD_LIMIT + 1)]
+    assert all(code == 200 for code in statuses[:USSD_LIMIT]), f"Requests within the limit were refused: {statuses}"
+    assert statuses[USSD_LIMIT] == 429, f"Expected 429 past the per-phone limit, got {statuses[USSD_LIMIT]}"
+
+    # The limit is per subscriber: another phone behind the same gateway IP still gets through
+    other = dial(random_phone(), "tc018-other")
+    assert other.status_code == 200, f"Another phone was limited too: {other.status_code}"
+    assert other.headers.get("RateLimit-Limit") == str(USSD_LIMIT), "Missing standard RateLimit headers"
+
+    # USSD traffic doesn't count against the general API limit
+    health = requests.get(f"{BASE_URL}/api/health", timeout=TIMEOUT)
+    assert health.status_code == 200
+
+test_post_api_ussd_rate_limited_per_phone()
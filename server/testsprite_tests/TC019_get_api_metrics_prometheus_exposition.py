@@ -0,0 +1,49 @@
+import re
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def scrape():
+    resp = requests.get(f"{BASE_URL}/api/metrics", timeout=TIMEOUT)
+    assert resp.status_code == 200, f"GET /api/metrics failed: {resp.status_code}"
+    assert resp.headers.get("Content-Type", "").startswith("text/plain"), "Metrics must be text/plain"
+    return resp.text
+
+def sample(text, name, labels):
+    pattern = re.escape(name) + r"\{" + r",".join(f'{k}="{re.escape(v)}"' for k, v in labels.items()) + r"\} (\S+)"
+    match = re.search(pattern, text)
+    return float(match.group(1)) if match else 0.0
+
+def test_get_api_metrics_prometheus_exposition():
+    before = scrape()
+    for family in (
+        "http_requests_total",
+        "http_request_duration_seconds",
+        "mongo_queries_total",
+        "mongo_query_duration_seconds",
+        "sms_messages_total",
+        "sms_provider_call_duration_seconds",
+        "alert_run_duration_seconds",
+        "nodejs_eventloop_lag_seconds",
+    ):
+        assert f"# TYPE {family} " in before, f"Missing metric family {family}"
+
+    labels = {"method": "GET", "route": "/api/crops/", "status": "200"}
+    start = sample(before, "http_requests_total", labels)
+    for _ in range(3):
+        assert requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT).status_code == 200
+
+    after = scrape()
+    assert sample(after, "http_requests_total", labels) >= start + 3, "Route request counter did not advance"
+
+    # Histogram buckets are cumulative and end in +Inf == _count
+    hist = {"method": "GET", "route": "/api/crops/"}
+    count = sample(after, "http_request_duration_seconds_count", hist)
+    inf = sample(after, "http_request_duration_seconds_bucket", {**hist, "le": "+Inf"})
+    assert count >= 3 and inf == count, "Latency histogram is inconsistent"
+
+    # The crop list reads the Crop collection through the Mongoose plugin
+    assert sample(after, "mongo_queries_total", {"model": "Crop", "op": "find"}) >= 3, "Crop queries not counted"
+
+test_get_api_metrics_prometheus_exposition()
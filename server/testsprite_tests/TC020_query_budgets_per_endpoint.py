@@ -0,0 +1,58 @@
+import re
+import uuid
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def query_count(resp):
+    assert "X-Query-Count" in resp.headers, f"X-Query-Count header missing on {resp.url}"
+    timing = resp.headers.get("Server-Timing", "")
+    assert re.search(r"db;dur=[\d.]+", timing), f"Server-Timing has no db entry: {timing!r}"
+    assert re.search(r"total;dur=[\d.]+", timing), f"Server-Timing has no total entry: {timing!r}"
+    return int(resp.headers["X-Query-Count"])
+
+def assert_budget(resp, budget):
+    assert resp.status_code == 200, f"{resp.url} failed: {resp.status_code} {resp.text}"
+    count = query_count(resp)
+    assert count <= budget, f"{resp.url} ran {count} queries, budget is {budget}"
+    return count
+
+def test_query_budgets_per_endpoint():
+    crops = requests.get(f"{BASE_URL}/api/crops", timeout=TIMEOUT)
+    assert_budget(crops, 1)
+    crop_list = crops.json()
+    assert isinstance(crop_list, list) and crop_list, "No crops to query against"
+    crop_id = crop_list[0]["_id"]
+
+    # One page query plus at most one count, whatever the page size
+    assert_budget(requests.get(f"{BASE_URL}/api/prices", params={"limit": 5}, timeout=TIMEOUT), 2)
+    assert_budget(requests.get(f"{BASE_URL}/api/prices", params={"limit": 100}, timeout=TIMEOUT), 2)
+
+    # Trends read the daily rollups in a single query
+    assert_budget(
+        requests.get(f"{BASE_URL}/api/analytics/public/trends", params={"cropId": crop_id}, timeout=TIMEOUT), 1
+    )
+
+    # Market comparison is answered from the in-memory latest-price mirror
+    assert_budget(
+        requests.get(f"{BASE_URL}/api/analytics/public/compare", params={"cropId": crop_id}, timeout=TIMEOUT), 0
+    )
+    ids = ",".join(c["_id"] for c in crop_list[:5])
+    assert_budget(
+        requests.get(f"{BASE_URL}/api/analytics/public/compare", params={"cropIds": ids}, timeout=TIMEOUT), 0
+    )
+
+    # Authenticated requests come from the user cache once it is warm
+    email = f"tc020_{uuid.uuid4().hex[:8]}@example.com"
+    reg = requests.post(
+        f"{BASE_URL}/api/auth/register",
+        json={"name": "TC020 User", "email": email, "password": "TestPass123!", "role": "Buyer"},
+        timeout=TIMEOUT,
+    )
+    assert reg.status_code == 201, f"Registration failed: {reg.text}"
+    headers = {"Authorization": f"Bearer {reg.json()['token']}"}
+    requests.get(f"{BASE_URL}/api/auth/me", headers=headers, timeout=TIMEOUT)
+    assert_budget(requests.get(f"{BASE_URL}/api/auth/me", headers=headers, timeout=TIMEOUT), 0)
+
+test_query_budgets_per_endpoint()
@@ -0,0 +1,30 @@
+import random
+import requests
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+def ussd(phone, session, text):
+    resp = requests.post(
+        f"{BASE_URL}/api/ussd",
+        json={"sessionId": session, "serviceCode": "*789#", "phoneNumber": phone, "text": text},
+        timeout=TIMEOUT,
+    )
+    assert resp.status_code == 200, f"USSD request failed: {resp.status_code} {resp.text}"
+    return resp.text
+
+def test_post_api_ussd_language_persists_across_requests():
+    local = "07" + "".join(random.choice("0123456789") for _ in range(8))
+
+    assert ussd(local, "tc021-set", "3*2").startswith("END Lugha imewekwa"), "Swahili was not selected"
+
+    # Later sessions may be served by any worker; the choice must follow the
+    # subscriber, whichever form the gateway sends their number in
+    for i, phone in enumerate([local, local, "+254" + local[1:], "254" + local[1:]]):
+        menu = ussd(phone, f"tc021-{i}", "")
+        assert menu.startswith("CON Karibu"), f"Session {i} lost the language choice: {menu!r}"
+
+    assert ussd(local, "tc021-reset", "3*1").startswith("END Language set to English")
+    assert ussd(local, "tc021-after", "").startswith("CON Welcome"), "English was not restored"
+
+test_post_api_ussd_language_persists_across_requests()
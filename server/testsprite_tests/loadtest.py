@@ -0,0 +1,354 @@
+"""Load test for the API, built on the TestSprite scenarios.
+
+The TCxxx files check correctness one blocking request at a time. This script
+replays the same calls from many concurrent virtual users over one pooled
+aiohttp session, then reports latency percentiles and throughput per endpoint
+as JSON. Run it against a local server and Mongo:
+
+    pip install aiohttp
+    API_RATE_LIMIT_MAX=1000000 USSD_IP_RATE_LIMIT_MAX=1000000 npm run dev   # in server/
+    python testsprite_tests/loadtest.py --concurrency 50 --duration 30 -o after.json
+    python testsprite_tests/loadtest.py --baseline before.json -o after.json
+
+Without raised rate limits most requests come back 429; these are
+reported as errors. With --baseline, every endpoint also gets its change
+against an earlier report, so two builds can be compared before deploying.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    import aiohttp
+except ImportError:
+    sys.exit("loadtest.py needs aiohttp: pip install aiohttp")
+
+BASE_URL = "http://localhost:5000"
+TIMEOUT = 30
+
+# Each virtual user picks scenarios with these weights
+SCENARIO_WEIGHTS = {
+    "prices": 4,
+    "prices_cursor": 2,
+    "trends": 2,
+    "compare": 2,
+    "crops": 1,
+    "ussd": 3,
+    "me": 1,
+}
+
+
+class Recorder:
+    """Collects per-endpoint latencies, status codes and query counts."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.enabled = False
+
+    def record(self, label, ms, status, headers=None, error=None):
+        if not self.enabled:
+            return
+        stats = self.endpoints.setdefault(
+            label, {"latencies": [], "statuses": {}, "errors": 0, "queries": [], "dbMs": []}
+        )
+        stats["latencies"].append(ms)
+        key = str(status) if status is not None else "error"
+        stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+        if error is not None or status is None or status >= 400:
+            stats["errors"] += 1
+        if headers is not None:
+            # Request-scoped Mongo accounting from the server, when it sends it
+            if "X-Query-Count" in headers:
+                stats["queries"].append(int(headers["X-Query-Count"]))
+            for entry in headers.get("Server-Timing", "").split(","):
+                parts = entry.strip().split(";")
+                if parts[0] == "db":
+                    for part in parts[1:]:
+                        if part.startswith("dur="):
+                            stats["dbMs"].append(float(part[4:]))
+
+
+class Client:
+    """Thin timing wrapper over a shared aiohttp session."""
+
+    def __init__(self, session, base_url, recorder):
+        self.session = session
+        self.base_url = base_url
+        self.recorder = recorder
+
+    async def request(self, label, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as resp:
+                body = await resp.read()
+                ms = (time.perf_counter() - start) * 1000
+                self.recorder.record(label, ms, resp.status, resp.headers)
+                return resp.status, body
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.recorder.record(label, (time.perf_counter() - start) * 1000, None, error=e)
+            return None, None
+
+    async def get_json(self, label, path, **kwargs):
+        status, body = await self.request(label, "GET", path, **kwargs)
+        return json.loads(body) if status == 200 else None
+
+
+def random_phone():
+    return "+2547" + "".join(random.choice("0123456789") for _ in range(8))
+
+
+# Scenarios. Each takes the client and the fixtures gathered during setup and
+# mirrors the requests of the TestSprite case named in its comment.
+
+async def scenario_prices(client, fx):
+    # TC005: filtered and unfiltered listings
+    params = {"limit": 20}
+    if random.random() < 0.5:
+        params["cropId"] = random.choice(fx["crop_ids"])
+    await client.request("GET /api/prices", "GET", "/api/prices", params=params)
+
+
+async def scenario_prices_cursor(client, fx):
+    # TC011: first keyset page, then the next one
+    first = await client.get_json("GET /api/prices?cursor", "/api/prices", params={"cursor": "", "limit": 20})
+    if first and first.get("nextCursor"):
+        await client.request(
+            "GET /api/prices?cursor", "GET", "/api/prices", params={"cursor": first["nextCursor"], "limit": 20}
+        )
+
+
+async def scenario_trends(client, fx):
+    # TC015 / TC020: public trends, with and without a crop filter
+    params = {"days": random.choice([7, 30, 90])}
+    if random.random() < 0.5:
+        params["cropId"] = random.choice(fx["crop_ids"])
+    await client.request("GET /api/analytics/public/trends", "GET", "/api/analytics/public/trends", params=params)
+
+
+async def scenario_compare(client, fx):
+    # TC020: market comparison for one crop
+    await client.request(
+        "GET /api/analytics/public/compare",
+        "GET",
+        "/api/analytics/public/compare",
+        params={"cropId": random.choice(fx["crop_ids"])},
+    )
+
+
+async def scenario_crops(client, fx):
+    # TC010
+    await client.request("GET /api/crops", "GET", "/api/crops")
+
+
+async def scenario_ussd(client, fx):
+    # TC004 / TC018: one subscriber walking the check-price menu, each step
+    # resending the whole input so far the way the carrier gateway does
+    phone = random_phone()
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    for text in ("", "1", "1*1", "1*1*1"):
+        status, body = await client.request(
+            "POST /api/ussd",
+            "POST",
+            "/api/ussd",
+            json={"sessionId": session_id, "serviceCode": "*789#", "phoneNumber": phone, "text": text},
+        )
+        if status != 200 or not body.startswith(b"CON"):
+            break
+
+
+async def scenario_me(client, fx):
+    # TC003: authenticated profile
+    await client.request("GET /api/auth/me", "GET", "/api/auth/me", headers={"Authorization": f"Bearer {fx['token']}"})
+
+
+SCENARIOS = {
+    "prices": scenario_prices,
+    "prices_cursor": scenario_prices_cursor,
+    "trends": scenario_trends,
+    "compare": scenario_compare,
+    "crops": scenario_crops,
+    "ussd": scenario_ussd,
+    "me": scenario_me,
+}
+
+
+async def setup(client):
+    crops = await client.get_json("setup", "/api/crops")
+    if not crops:
+        sys.exit("No crops returned by /api/crops; seed the database first (npm run seed)")
+    fx = {"crop_ids": [c["_id"] for c in crops]}
+
+    # One account shared by every virtual user (registration is rate limited)
+    status, body = await client.request(
+        "setup",
+        "POST",
+        "/api/auth/register",
+        json={
+            "name": "Load Test",
+            "email": f"loadtest_{uuid.uuid4().hex[:8]}@example.com",
+            "password": "TestPass123!",
+            "role": "Buyer",
+        },
+    )
+    if status == 201:
+        fx["token"] = json.loads(body)["token"]
+    else:
+        print(f"⚠️ Could not register a user ({status}); skipping /api/auth/me", file=sys.stderr)
+    return fx
+
+
+async def virtual_user(client, fx, names, weights, deadline):
+    while time.monotonic() < deadline:
+        name = random.choices(names, weights)[0]
+        await SCENARIOS[name](client, fx)
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return round(sorted_values[int(rank) - 1], 2)
+
+
+def summarize(stats, elapsed):
+    latencies = sorted(stats["latencies"])
+    summary = {
+        "requests": len(latencies),
+        "errors": stats["errors"],
+        "statusCodes": stats["statuses"],
+        "throughputRps": round(len(latencies) / elapsed, 2),
+        "latencyMs": {
+            "min": round(latencies[0], 2),
+            "mean": round(sum(latencies) / len(latencies), 2),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(latencies[-1], 2),
+        },
+    }
+    if stats["queries"]:
+        summary["queriesPerRequest"] = round(sum(stats["queries"]) / len(stats["queries"]), 2)
+    if stats["dbMs"]:
+        summary["dbMsMean"] = round(sum(stats["dbMs"]) / len(stats["dbMs"]), 2)
+    return summary
+
+
+def change(now, before):
+    if now is None or not before:
+        return None
+    return round((now - before) / before * 100, 1)
+
+
+def compare_to(report, baseline):
+    """Percent change per endpoint against an earlier report."""
+    diff = {}
+    for label, now in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before:
+            continue
+        diff[label] = {
+            "p50Pct": change(now["latencyMs"]["p50"], before["latencyMs"]["p50"]),
+            "p95Pct": change(now["latencyMs"]["p95"], before["latencyMs"]["p95"]),
+            "p99Pct": change(now["latencyMs"]["p99"], before["latencyMs"]["p99"]),
+            "throughputPct": change(now["throughputRps"], before["throughputRps"]),
+        }
+    return diff
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args):
+    names = [n for n in args.scenarios.split(",") if n]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+    if not names:
+        sys.exit(f"No scenarios given (available: {', '.join(SCENARIOS)})")
+
+    recorder = Recorder()
+    connector = aiohttp.TCPConnector(limit=args.concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        client = Client(session, args.base_url.rstrip("/"), recorder)
+        fx = await setup(client)
+        if "token" not in fx:
+            names = [n for n in names if n != "me"]
+            if not names:
+                sys.exit("No scenarios left to run: 'me' needs a registered user and registration failed")
+        weights = [SCENARIO_WEIGHTS[n] for n in names]
+
+        if args.warmup > 0:
+            print(f"🔥 Warming up for {args.warmup}s", file=sys.stderr)
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*(virtual_user(client, fx, names, weights, deadline) for _ in range(args.concurrency)))
+
+        print(f"🚀 {args.concurrency} virtual users for {args.duration}s against {args.base_url}", file=sys.stderr)
+        recorder.enabled = True
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(virtual_user(client, fx, names, weights, deadline) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+        recorder.enabled = False
+
+    endpoints = {label: summarize(stats, elapsed) for label, stats in sorted(recorder.endpoints.items())}
+    total = sum(e["requests"] for e in endpoints.values())
+    report = {
+        "meta": {
+            "baseUrl": args.base_url,
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "gitRevision": git_revision(),
+            "concurrency": args.concurrency,
+            "durationSec": round(elapsed, 2),
+            "scenarios": names,
+        },
+        "total": {
+            "requests": total,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "throughputRps": round(total / elapsed, 2),
+        },
+        "endpoints": endpoints,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"] = {"file": args.baseline, "changes": compare_to(report, json.load(f))}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test over the TestSprite scenarios")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("-c", "--concurrency", type=int, default=20, help="virtual users (and pooled connections)")
+    parser.add_argument("-d", "--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ {report['total']['requests']} requests, report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()